@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Archives an experiment directory to the archive root (the NAS) replacing the
+two rsync calls of listener.sh.
+
+  - files are streamed and compressed on the fly with multi-threaded zstd
+    (<name>.zst); already-compressed files (png, zst, gz, ...) are copied as is
+  - ue0.log is stored in the seekable frame format of seekable_log.py
+    (ue0.log.frames), so time windows can be re-read without a full scan
+  - every file is verified: the archived copy is read back, decompressed and
+    its SHA-256 compared with the source
+  - an index (.archive_index.json) in the destination keeps the hash of each
+    archived file, so unchanged files are skipped on the next run
+  - files are processed in parallel by a thread pool
+
+Usage: archiver.py <src_dir> <dest_dir> [--workers N] [--level L] [--no-compress]
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import seekable_log
+
+INDEX_NAME = ".archive_index.json"
+CHUNK_SIZE = 4 << 20
+RAW_EXTENSIONS = (".zst", ".gz", ".xz", ".bz2", ".zip", ".png", ".jpg", ".frames", ".npz")
+FRAMED_LOGS = ("ue0.log",)
+
+
+def sha256_file(path, compressed=False, framed=False):
+    """
+    SHA-256 of a file's content (of the decompressed content if compressed
+    with zstd or stored in the seekable frame format).
+    """
+    h = hashlib.sha256()
+    if framed:
+        with seekable_log.FramedLogReader(path) as reader:
+            for i in range(len(reader.index)):
+                h.update(reader.read_frame(i))
+        return h.hexdigest()
+    with open(path, "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f) if compressed else f
+        while True:
+            chunk = reader.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_hashed(src, dst, compress, level):
+    """Streams src into dst (compressing if asked) and returns the source hash."""
+    h = hashlib.sha256()
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        if compress:
+            cctx = zstandard.ZstdCompressor(level=level, threads=-1)
+            writer = cctx.stream_writer(fout, closefd=False)
+        else:
+            writer = fout
+        while True:
+            chunk = fin.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+            writer.write(chunk)
+        if compress:
+            writer.close()
+    return h.hexdigest()
+
+
+def archive_file(src, rel_path, dest_dir, previous, compress=True, level=3):
+    """
+    Archives one file. previous is its entry in the destination index (or
+    None). Returns (rel_path, entry, action) with action in
+    "skipped", "archived".
+    """
+    st = os.stat(src)
+    stored_as = rel_path
+    framed = compress and os.path.basename(rel_path) in FRAMED_LOGS
+    use_zstd = (compress and not framed and zstandard is not None
+                and not rel_path.lower().endswith(RAW_EXTENSIONS))
+    if framed:
+        stored_as += ".frames"
+    elif use_zstd:
+        stored_as += ".zst"
+    dst = os.path.join(dest_dir, stored_as)
+
+    if previous and os.path.exists(os.path.join(dest_dir, previous["stored_as"])):
+        # Comprobación rápida (como rsync): mismo tamaño y mtime
+        if previous["size"] == st.st_size and previous["mtime"] == st.st_mtime:
+            return rel_path, previous, "skipped"
+        src_hash = sha256_file(src)
+        if src_hash == previous["sha256"]:
+            return rel_path, dict(previous, mtime=st.st_mtime), "skipped"
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + ".part"
+    if framed:
+        src_hash = sha256_file(src)
+        seekable_log.compress_log(src, tmp, level=level)
+        tmp_hash = sha256_file(tmp, framed=True)
+    else:
+        src_hash = _copy_hashed(src, tmp, use_zstd, level)
+        tmp_hash = sha256_file(tmp, compressed=use_zstd)
+    if tmp_hash != src_hash:
+        os.remove(tmp)
+        raise IOError(f"verification failed for '{rel_path}'")
+    os.replace(tmp, dst)
+
+    if previous and previous["stored_as"] != stored_as:
+        old = os.path.join(dest_dir, previous["stored_as"])
+        if os.path.exists(old):
+            os.remove(old)
+
+    entry = {"sha256": src_hash, "size": st.st_size, "mtime": st.st_mtime,
+             "stored_as": stored_as, "stored_size": os.path.getsize(dst)}
+    return rel_path, entry, "archived"
+
+
+def load_index(dest_dir):
+    path = os.path.join(dest_dir, INDEX_NAME)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_index(dest_dir, index):
+    path = os.path.join(dest_dir, INDEX_NAME)
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def archive_directory(src_dir, dest_dir, workers=4, compress=True, level=3):
+    """
+    Archives every file under src_dir into dest_dir. Returns a dict with the
+    number of archived and skipped files and bytes read/written.
+    """
+    if compress and zstandard is None:
+        print("Warning: zstandard not installed, archiving without compression")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    index = load_index(dest_dir)
+
+    files = []
+    for root, _, names in os.walk(src_dir):
+        for name in names:
+            src = os.path.join(root, name)
+            rel_path = os.path.relpath(src, src_dir)
+            if name == INDEX_NAME or name.endswith(".part"):
+                continue
+            files.append((src, rel_path))
+
+    summary = {"archived": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(archive_file, src, rel_path, dest_dir,
+                               index.get(rel_path), compress, level)
+                   for src, rel_path in files]
+        try:
+            for future in futures:
+                rel_path, entry, action = future.result()
+                index[rel_path] = entry
+                summary[action] += 1
+                if action == "archived":
+                    summary["bytes_in"] += entry["size"]
+                    summary["bytes_out"] += entry["stored_size"]
+        finally:
+            # Guardar lo ya archivado aunque falle algún fichero
+            save_index(dest_dir, index)
+    return summary
+
+
+def restore_file(dest_dir, rel_path, out_path):
+    """Restores one archived file (decompressing it if needed) to out_path."""
+    entry = load_index(dest_dir)[rel_path]
+    stored = os.path.join(dest_dir, entry["stored_as"])
+    if entry["stored_as"].endswith(".frames") and not rel_path.endswith(".frames"):
+        seekable_log.decompress_log(stored, out_path)
+        return
+    with open(stored, "rb") as fin, open(out_path, "wb") as fout:
+        if entry["stored_as"].endswith(".zst") and not rel_path.endswith(".zst"):
+            zstandard.ZstdDecompressor().copy_stream(fin, fout)
+        else:
+            shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive an experiment directory")
+    parser.add_argument("src_dir")
+    parser.add_argument("dest_dir")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--level", type=int, default=3, help="zstd compression level")
+    parser.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.src_dir):
+        print(f"Error: source directory '{args.src_dir}' not found.")
+        sys.exit(1)
+
+    try:
+        summary = archive_directory(args.src_dir, args.dest_dir, workers=args.workers,
+                                    compress=not args.no_compress, level=args.level)
+    except (IOError, OSError) as e:
+        print(f"Error archiving '{args.src_dir}': {e}")
+        sys.exit(1)
+
+    print(f"Archived {summary['archived']} file(s), skipped {summary['skipped']} unchanged; "
+          f"{summary['bytes_in']} bytes -> {summary['bytes_out']} bytes in {args.dest_dir}")
+
+
+if __name__ == "__main__":
+    main()
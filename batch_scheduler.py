@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Batching of compatible requests into a single multi-UE lteue run.
+
+Requests with identical radio_config, channel_sim/channel_params and
+schedule options only differ in their commands, so they can share one
+lteue launch (one SDR init, cell search and attach phase): their commands
+are concatenated into one request, each becoming a UE with its own UE ID
+and IMSI.
+
+After the run the results are split back by flow: every iperf3 command
+identifies its flow by the destination (server ip, port), so a CSV row
+belongs to the request whose flow matches its destination (uplink) or
+source (downlink, -R) address, and an iperf3 -J report to the request
+whose server it connected to. Requests whose flows share a server
+ip:port cannot be told apart and are never merged, and neither are
+requests with a command that is not an iperf3 client (-s servers, ping,
+...): its results could not be attributed, so it always runs alone.
+
+batch.json in the batch directory records the members and their flows.
+
+Usage:
+  batch_scheduler.py plan [--max-ues N] <request.json> [<request.json> ...]
+  batch_scheduler.py split <batch_dir>
+"""
+import os
+import sys
+import csv
+import json
+import shutil
+import argparse
+
+from request_validator import parse_iperf_command
+from resource_allocator import UE_IDS_PER_SLOT
+
+BATCH_NAME = "batch.json"
+BATCH_KEY_FIELDS = ("radio_config", "channel_sim", "channel_params", "schedule")
+
+
+def batch_key(data):
+    """Requests with the same key can share one lteue run."""
+    return json.dumps({k: data.get(k) for k in BATCH_KEY_FIELDS}, sort_keys=True)
+
+
+def request_flows(data):
+    """(server ip, port) of every iperf3 client command of a request."""
+    flows = []
+    for entry in data.get("commands", []):
+        command = entry.get("command", "")
+        if command.split()[:1] == ["iperf3"]:
+            opts = parse_iperf_command(command)
+            if opts["client"]:
+                flows.append((opts["client"], opts["port"]))
+    return flows
+
+
+def splittable(data):
+    """True if every command of a request maps to a flow of request_flows()."""
+    return len(request_flows(data)) == len(data.get("commands", []))
+
+
+def compatible(batch, data, max_ues=UE_IDS_PER_SLOT):
+    """True if data can join batch (a list of request dicts)."""
+    if batch_key(batch[0]) != batch_key(data):
+        return False
+    if not all(splittable(d) for d in batch + [data]):
+        return False
+    if sum(len(d.get("commands", [])) for d in batch) + len(data.get("commands", [])) > max_ues:
+        return False
+    used = {flow for d in batch for flow in request_flows(d)}
+    flows = request_flows(data)
+    return len(set(flows)) == len(flows) and not used.intersection(flows)
+
+
+def plan_batches(requests, max_ues=UE_IDS_PER_SLOT):
+    """
+    Groups requests (in queue order) into batches, first fit: a request
+    joins the first open batch it is compatible with.
+    """
+    batches = []
+    for data in requests:
+        for batch in batches:
+            if compatible(batch, data, max_ues):
+                batch.append(data)
+                break
+        else:
+            batches.append([data])
+    return batches
+
+
+def merge_requests(batch_id, requests):
+    """One request running the commands of all the batch members."""
+    merged = {k: requests[0][k] for k in BATCH_KEY_FIELDS if k in requests[0]}
+    merged["id"] = batch_id
+    merged["commands"] = [entry for data in requests for entry in data["commands"]]
+    return merged
+
+
+def save_batch(batch_dir, batch_id, members):
+    """members: list of (exp_dir, exp_id, request data)."""
+    info = {"id": batch_id, "members": []}
+    first = 0
+    for exp_dir, exp_id, data in members:
+        n = len(data["commands"])
+        info["members"].append({"id": exp_id, "exp_dir": os.path.abspath(exp_dir),
+                                "commands": [first, first + n],
+                                "flows": [list(flow) for flow in request_flows(data)]})
+        first += n
+    with open(os.path.join(batch_dir, BATCH_NAME), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def load_batch(batch_dir):
+    with open(os.path.join(batch_dir, BATCH_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_batch_dir(run_dir):
+    """True if run_dir holds a batched run (its batch.json lists the members)."""
+    return os.path.isfile(os.path.join(run_dir, BATCH_NAME)) and "members" in load_batch(run_dir)
+
+
+def member_batch_dir(exp_dir):
+    """Batch directory a member's results were split from, or None if exp_dir is not a member."""
+    if not os.path.isfile(os.path.join(exp_dir, BATCH_NAME)):
+        return None
+    return load_batch(exp_dir).get("batch_dir")
+
+
+def _owner_map(info):
+    owners = {}
+    for i, member in enumerate(info["members"]):
+        for ip, port in member["flows"]:
+            owners[(ip, str(port))] = i
+    return owners
+
+
+def split_results(batch_dir, info=None):
+    """
+    Writes each member's <id>.csv, <id>.sketches.json and json.log from the
+    batch results and links the shared raw logs. Returns the number of CSV
+    rows per member; rows that match no member's flow are left in the batch
+    only.
+    """
+    info = info or load_batch(batch_dir)
+    owners = _owner_map(info)
+    members = info["members"]
+    for member in members:
+        os.makedirs(member["exp_dir"], exist_ok=True)
+
+    # CSV del extractor: la fila pertenece al flujo de su destino (UL) o de su origen (DL)
+    counts = [0] * len(members)
+    batch_csv = os.path.join(batch_dir, f"{info['id']}.csv")
+    if os.path.exists(batch_csv):
+        outs = [open(os.path.join(m["exp_dir"], f"{m['id']}.csv"), "w", newline="", encoding="utf-8")
+                for m in members]
+        try:
+            writers = [csv.writer(f) for f in outs]
+            with open(batch_csv, "r", newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header:
+                    for w in writers:
+                        w.writerow(header)
+                    src_ip, dst_ip = header.index("Source IP"), header.index("Destination IP")
+                    src_port, dst_port = header.index("Source Port"), header.index("Destination Port")
+                    for row in reader:
+                        owner = owners.get((row[dst_ip], row[dst_port]))
+                        if owner is None:
+                            owner = owners.get((row[src_ip], row[src_port]))
+                        if owner is not None:
+                            writers[owner].writerow(row)
+                            counts[owner] += 1
+        finally:
+            for f in outs:
+                f.close()
+
+    # Informes iperf3 -J: por el servidor al que se conectó
+    batch_json = os.path.join(batch_dir, "json.log")
+    if os.path.exists(batch_json):
+        with open(batch_json, "r", encoding="utf-8") as f:
+            reports = json.load(f)
+        per_member = [[] for _ in members]
+        for report in reports:
+            to = report.get("start", {}).get("connecting_to", {}) if isinstance(report, dict) else {}
+            owner = owners.get((to.get("host"), str(to.get("port"))))
+            if owner is not None:
+                per_member[owner].append(report)
+        for member, member_reports in zip(members, per_member):
+            with open(os.path.join(member["exp_dir"], "json.log"), "w", encoding="utf-8") as f:
+                json.dump(member_reports, f, indent=2, ensure_ascii=False)
+
+    # Sketches por flujo: mismo criterio que las filas del CSV
+    batch_sketches = os.path.join(batch_dir, f"{info['id']}.sketches.json")
+    if os.path.exists(batch_sketches):
+        with open(batch_sketches, "r", encoding="utf-8") as f:
+            sketches = json.load(f)
+        per_member = [[] for _ in members]
+        for flow in sketches.get("flows", []):
+            owner = owners.get((flow["dst_ip"], str(flow["dst_port"])))
+            if owner is None:
+                owner = owners.get((flow["src_ip"], str(flow["src_port"])))
+            if owner is not None:
+                per_member[owner].append(flow)
+        for member, flows in zip(members, per_member):
+            with open(os.path.join(member["exp_dir"], f"{member['id']}.sketches.json"), "w",
+                      encoding="utf-8") as f:
+                json.dump({**sketches, "flows": flows}, f)
+
+    # La traza y el ue0.log son comunes: se referencian, no se copian
+    for member in members:
+        with open(os.path.join(member["exp_dir"], BATCH_NAME), "w", encoding="utf-8") as f:
+            json.dump({"batch_id": info["id"], "batch_dir": os.path.abspath(batch_dir),
+                       "commands": member["commands"]}, f, indent=2)
+        schedule = os.path.join(batch_dir, "schedule.json")
+        if os.path.exists(schedule):
+            shutil.copy(schedule, member["exp_dir"])
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch compatible requests into one lteue run")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("plan", help="show how requests would be batched")
+    p.add_argument("requests", nargs="+")
+    p.add_argument("--max-ues", type=int, default=UE_IDS_PER_SLOT)
+    p = sub.add_parser("split", help="split the results of a finished batch")
+    p.add_argument("batch_dir")
+    args = parser.parse_args()
+
+    if args.cmd == "split":
+        if not os.path.isfile(os.path.join(args.batch_dir, BATCH_NAME)):
+            print(f"Error: '{args.batch_dir}' is not a batch directory.")
+            sys.exit(1)
+        info = load_batch(args.batch_dir)
+        for member, n in zip(info["members"], split_results(args.batch_dir, info)):
+            print(f"{member['id']}: {n} row(s) -> {member['exp_dir']}")
+        return
+
+    requests = []
+    for path in args.requests:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                requests.append(json.load(f))
+        except Exception as e:
+            print(f"Error loading JSON file '{path}': {e}")
+            sys.exit(1)
+    for i, batch in enumerate(plan_batches(requests, args.max_ues), start=1):
+        ues = sum(len(d.get("commands", [])) for d in batch)
+        print(f"batch {i}: {ues} UE(s): " + ", ".join(d.get("id", "?") for d in batch))
+
+
+if __name__ == "__main__":
+    main()
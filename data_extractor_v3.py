@@ -5,32 +5,10 @@ import sys
 import os
 import json
 
-if len(sys.argv) < 3:
-    print("Usage: python3 data_extractor_v2.py <output_dir> <json_file>")
-    sys.exit(1)
-
-# Get command-line parameters
-output_dir = sys.argv[1]
-json_file_path = sys.argv[2]
-
-# Read the JSON and extract the id (if needed)
-try:
-    with open(json_file_path, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
-except Exception as e:
-    print(f"Error reading JSON file: {e}")
-    sys.exit(1)
-
-id_value = json_data.get("id", "id_value_missing")
-
-# Create the output directory if it doesn't exist
-os.makedirs(output_dir, exist_ok=True)
-
-# Set output CSV filename as <ID>.csv in the provided output directory
-output_csv = os.path.join(output_dir, f"{id_value}.csv")
-
-# Set the log filename (adjust if needed)
-log_filename = "/root/Desktop/OUTPUT/ue0.log"  # Change as needed
+from seekable_log import FramedLogReader, TimestampTracker, parse_time
+from throughput_check import (DEFAULT_TOLERANCE, ThroughputCheck, check_path,
+                              save_report, summary_lines)
+from quantile_sketch import FlowSketches, save_sketches, sketch_path
 
 # Regular expressions for parsing
 mcs_line_pattern = re.compile(r"^\s*mcs=(\d+)", re.IGNORECASE)
@@ -39,6 +17,14 @@ ip_line_pattern = re.compile(
 )
 hex_line_pattern = re.compile(r"^\s*([0-9a-fA-F]{4}):\s*(.*)")
 
+CSV_HEADER = [
+    "Timestamp_log", "Source IP", "Destination IP",
+    "IP_ID_hex", "IP_ID_dec", "IP_Checksum_hex", "IP_Checksum_dec",
+    "Source Port", "Destination Port", "UDP_Checksum_hex", "UDP_Checksum_dec",
+    "MCS", "Timestamp_iperf", "Timestamp_iperf_hex", "Sequence_num_iperf", "Sequence_num_iperf_hex",
+    "IP_Total_Length"
+]
+
 def format_hex_bytes(hex_str):
     """Format a hex string into groups of two characters separated by a space."""
     return " ".join([hex_str[i:i+2] for i in range(0, len(hex_str), 2)])
@@ -66,6 +52,23 @@ def extract_ip_id_from_line(line):
         ip_id_dec = ""
     return format_hex_bytes(ip_id_hex), ip_id_dec
 
+def extract_ip_total_length_from_line(line):
+    """
+    Given a hex dump line starting with "0000:", extract the IP Total Length
+    field (bytes 2-3, positions 4 to 8 in the hex string): the size of the
+    datagram in bytes, IP header included.
+    """
+    m = hex_line_pattern.match(line)
+    if not m:
+        return ""
+    hex_data = m.group(2).replace(" ", "")
+    if len(hex_data) < 8:
+        return ""
+    try:
+        return int(hex_data[4:8], 16)
+    except ValueError:
+        return ""
+
 def extract_ip_checksum_from_line(line):
     """
     Given a hex dump line starting with "0000:", extract the IP header checksum.
@@ -150,13 +153,16 @@ def extract_iperf_header_from_lines(hex_lines):
                 return timestamp_num, seq_num, timestamp_formatted, seq_formatted
     return None, None, None, None
 
-def parse_amarisoft_log(log_file, output_csv):
-    last_mcs = None
+def parse_amarisoft_lines(lines, initial_mcs=None, check=None, sketches=None):
+    """
+    Parses a list of ue0.log lines into CSV rows. initial_mcs is the MCS in
+    force before the first line (used when parsing a time window). check
+    (ThroughputCheck) and sketches (FlowSketches) are optional accumulators
+    fed with every packet as it is parsed.
+    """
+    last_mcs = initial_mcs
     parsed_data = []
-    
-    with open(log_file, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-    
+
     i = 0
     while i < len(lines):
         line = lines[i]
@@ -192,9 +198,11 @@ def parse_amarisoft_log(log_file, output_csv):
             # Extract IP Identification and IP Checksum from hex_line_0000
             ip_id_hex, ip_id_dec = ("", "")
             ip_checksum_hex, ip_checksum_dec = ("", "")
+            ip_total_length = ""
             if hex_line_0000:
                 ip_id_hex, ip_id_dec = extract_ip_id_from_line(hex_line_0000)
                 ip_checksum_hex, ip_checksum_dec = extract_ip_checksum_from_line(hex_line_0000)
+                ip_total_length = extract_ip_total_length_from_line(hex_line_0000)
             
             # Extract UDP checksum from hex_line_0010
             udp_checksum_hex, udp_checksum_dec = ("", "")
@@ -208,6 +216,11 @@ def parse_amarisoft_log(log_file, output_csv):
                 hex_lines.append(lines[k])
                 k += 1
             timestamp_iperf_num, seq_num_num, timestamp_iperf_hex, seq_num_hex = extract_iperf_header_from_lines(hex_lines)
+            if check is not None:
+                check.add(timestamp_log, src_ip, src_port, dst_ip, dst_port, ip_total_length)
+            if sketches is not None:
+                sketches.add(timestamp_log, src_ip, src_port, dst_ip, dst_port,
+                             ip_total_length, timestamp_iperf_num)
             
             # Order the columns: primero datos IP, luego UDP, luego payload
             parsed_data.append([
@@ -226,22 +239,123 @@ def parse_amarisoft_log(log_file, output_csv):
                 timestamp_iperf_num, # Timestamp_iperf (numeric)
                 timestamp_iperf_hex, # Timestamp_iperf (hex)
                 seq_num_num,         # Sequence_num_iperf (numeric)
-                seq_num_hex          # Sequence_num_iperf (hex)
+                seq_num_hex,         # Sequence_num_iperf (hex)
+                ip_total_length      # IP_Total_Length (bytes), al final para no mover columnas
             ])
             i = k
             continue
         
         i += 1
 
+    return parsed_data
+
+def read_log_lines(log_file, window=None):
+    """
+    Returns (initial_mcs, lines) for a plain ue0.log or a seekable .frames
+    archive. window is an optional (start, end) pair of "HH:MM:SS[.mmm]"
+    strings; with a .frames archive only the frames covering it are read.
+    """
+    if log_file.endswith(".frames"):
+        with FramedLogReader(log_file) as reader:
+            if window:
+                return reader.read_window(parse_time(window[0]), parse_time(window[1]))
+            lines = [l.decode('utf-8', errors='replace') for l in reader.iter_lines()]
+        return None, lines
+
+    with open(log_file, 'r', encoding='utf-8') as file:
+        lines = file.readlines()
+    if window:
+        start_ms, end_ms = parse_time(window[0]), parse_time(window[1])
+        tracker = TimestampTracker()
+        initial_mcs = None
+        selected = []
+        in_window = False
+        for line in lines:
+            ts = tracker.update(line.encode('utf-8'))
+            if ts is not None:
+                if ts > end_ms:
+                    break
+                in_window = ts >= start_ms
+            if in_window:
+                selected.append(line)
+            else:
+                mcs_match = mcs_line_pattern.search(line)
+                if mcs_match:
+                    initial_mcs = int(mcs_match.group(1))
+        return initial_mcs, selected
+    return None, lines
+
+def parse_amarisoft_log(log_file, output_csv, window=None, check=None, sketches=None):
+    initial_mcs, lines = read_log_lines(log_file, window)
+    parsed_data = parse_amarisoft_lines(lines, initial_mcs, check, sketches)
+
     with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow([
-            "Timestamp_log", "Source IP", "Destination IP", 
-            "IP_ID_hex", "IP_ID_dec", "IP_Checksum_hex", "IP_Checksum_dec",
-            "Source Port", "Destination Port", "UDP_Checksum_hex", "UDP_Checksum_dec",
-            "MCS", "Timestamp_iperf", "Timestamp_iperf_hex", "Sequence_num_iperf", "Sequence_num_iperf_hex"
-        ])
+        writer.writerow(CSV_HEADER)
         writer.writerows(parsed_data)
 
-parse_amarisoft_log(log_filename, output_csv)
-print(f"Data extracted and saved in {output_csv}")
+def main():
+    # --tolerance FRACTION: margen del veredicto requested vs achieved
+    args = sys.argv[1:]
+    tolerance = DEFAULT_TOLERANCE
+    if "--tolerance" in args:
+        i = args.index("--tolerance")
+        try:
+            tolerance = float(args[i + 1])
+        except (IndexError, ValueError):
+            print("Error: --tolerance expects a fraction, e.g. 0.1")
+            sys.exit(1)
+        del args[i:i + 2]
+
+    if len(args) not in (2, 3, 5):
+        print("Usage: python3 data_extractor_v3.py <output_dir> <json_file> [log_file [start_time end_time]] [--tolerance FRACTION]")
+        print("  log_file may be a ue0.log or a seekable ue0.log.frames archive;")
+        print("  start_time/end_time (HH:MM:SS[.mmm]) restrict extraction to a time window;")
+        print("  --tolerance sets the requested-vs-achieved verdict margin (default 0.1)")
+        sys.exit(1)
+
+    # Get command-line parameters
+    output_dir = args[0]
+    json_file_path = args[1]
+
+    # Read the JSON and extract the id (if needed)
+    try:
+        with open(json_file_path, 'r', encoding='utf-8') as f:
+            json_data = json.load(f)
+    except Exception as e:
+        print(f"Error reading JSON file: {e}")
+        sys.exit(1)
+
+    id_value = json_data.get("id", "id_value_missing")
+
+    # Create the output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Set output CSV filename as <ID>.csv in the provided output directory
+    output_csv = os.path.join(output_dir, f"{id_value}.csv")
+
+    # Set the log filename (optional third argument, e.g. a per-experiment snapshot)
+    log_filename = args[2] if len(args) > 2 else "/root/Desktop/OUTPUT/ue0.log"
+    window = (args[3], args[4]) if len(args) > 3 else None
+
+    # Throughput pedido vs conseguido, acumulado mientras se extrae
+    try:
+        check = ThroughputCheck.from_request(json_data, tolerance)
+    except ValueError as e:
+        print(f"Throughput check disabled: {e}")
+        check = None
+
+    # Sketches de latencia y throughput por flujo (<ID>.sketches.json)
+    sketches = FlowSketches()
+
+    parse_amarisoft_log(log_filename, output_csv, window, check, sketches)
+    print(f"Data extracted and saved in {output_csv}")
+    save_sketches(sketch_path(output_csv), sketches)
+    if check is not None:
+        report = check.report()
+        save_report(check_path(output_csv), report)
+        print("\n".join(summary_lines(report)))
+
+if __name__ == "__main__":
+    main()
+
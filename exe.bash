@@ -1,6 +1,7 @@
 #!/bin/bash
-OUTFILE="posiciones.log"
-while true; do
-  echo -n "t" | nc -u -w1 localhost 9002
-  sleep 0.1
-done >> "$OUTFILE"
+# Muestreo de posiciones/estadísticas de los UE por el puerto CLI de lteue:
+# un único socket UDP persistente, volcado periódico a un fichero columnar
+# (leer con: python3 stats_poller.py dump posiciones.cols)
+OUTFILE="posiciones.cols"
+RATE="${RATE:-10}"
+exec python3 "$(dirname "$0")/stats_poller.py" poll --host localhost --port 9002 --rate "$RATE" "$OUTFILE"
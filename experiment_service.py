@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service that queues experiment requests and runs them.
+
+  POST /jobs                          -> validate + queue a request (same JSON as listener.sh)
+  GET  /jobs                          -> list jobs
+  GET  /jobs/<id>                     -> job status
+  GET  /jobs/<id>/artifacts           -> files in the experiment directory
+  GET  /jobs/<id>/artifacts/<name>    -> download one file
+
+Jobs are executed by a PipelinedRunner: one radio worker per SDR device
+(--devices) runs generate -> lteue with its own com port, UE IDs and log
+path; post-processing of the finished run (split, dedupe, extract, index,
+archive) goes to a separate thread pool so the next experiment starts
+straight away. With --batch, queued requests sharing the radio
+configuration run together as one multi-UE lteue launch; with --warm,
+lteue is kept running between experiments with the same radio config.
+
+Use --lteue to point at a stub binary for testing.
+"""
+import os
+import json
+import uuid
+import argparse
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pipeline_stages as stages
+from pipelined_runner import PipelinedRunner, QUEUED, DONE, FAILED, ACTIVE_STATES
+from resource_allocator import ResourceAllocator, parse_devices
+from request_validator import validate_request, load_cell_database
+
+
+class ExperimentService:
+    def __init__(self, output_dir=stages.BASE_OUTPUT_DIR,
+                 generated_dir=stages.GENERATED_DIR,
+                 lteue_bin=stages.LTEUE_BIN,
+                 archive_dir=stages.ARCHIVE_DIR,
+                 margin=stages.DEFAULT_MARGIN,
+                 post_workers=2,
+                 max_pending=4,
+                 cell_database_path=os.path.join(stages.SCRIPTS_DIR, "cell_database.json"),
+                 devices=None,
+                 batching=False,
+                 warm=False):
+        self.output_dir = output_dir
+        self.cell_database_path = cell_database_path
+
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.runner = PipelinedRunner(generated_dir=generated_dir,
+                                      lteue_bin=lteue_bin,
+                                      archive_dir=archive_dir,
+                                      margin=margin,
+                                      post_workers=post_workers,
+                                      max_pending=max_pending,
+                                      on_update=self._on_update,
+                                      allocator=ResourceAllocator(devices),
+                                      batching=batching,
+                                      warm=warm)
+
+    # -------------- Job bookkeeping --------------
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+
+    def get_job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self):
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def submit(self, data):
+        """
+        Validates and queues a request. Returns (job, errors); job is None
+        when the request was rejected.
+        """
+        errors = validate_request(data, load_cell_database(self.cell_database_path))
+        if errors:
+            return None, errors
+
+        data = dict(data)
+        data.setdefault("id", str(uuid.uuid4()))
+        job_id = data["id"]
+        if "/" in job_id or job_id in (".", ".."):
+            return None, ["id: must not contain '/'"]
+
+        with self.lock:
+            existing = self.jobs.get(job_id)
+            if existing and existing["status"] in ACTIVE_STATES:
+                return None, [f"id: job '{job_id}' is already {existing['status']}"]
+            exp_dir = os.path.join(self.output_dir, job_id)
+            self.jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "stage": None,
+                "error": None,
+                "device": None,
+                "exp_dir": exp_dir,
+                "submitted": datetime.now().isoformat(timespec="seconds"),
+                "started": None,
+                "finished": None,
+            }
+
+        stages.save_request(exp_dir, data)
+        self.runner.submit(exp_dir, job_id)
+        return self.get_job(job_id), []
+
+    def _on_update(self, job_id, **fields):
+        now = datetime.now().isoformat(timespec="seconds")
+        if fields.get("stage") == "generate":
+            fields["started"] = now
+        if fields.get("status") in (DONE, FAILED):
+            fields["finished"] = now
+        self._update(job_id, **fields)
+
+    # -------------- Artifacts --------------
+    def list_artifacts(self, job_id):
+        job = self.get_job(job_id)
+        if job is None or not os.path.isdir(job["exp_dir"]):
+            return None
+        return sorted(name for name in os.listdir(job["exp_dir"])
+                      if os.path.isfile(os.path.join(job["exp_dir"], name)))
+
+    def artifact_path(self, job_id, name):
+        artifacts = self.list_artifacts(job_id)
+        if artifacts is None or name not in artifacts:
+            return None
+        return os.path.join(self.jobs[job_id]["exp_dir"], name)
+
+    def shutdown(self):
+        self.runner.shutdown()
+
+
+# -------------- HTTP --------------
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, code, payload):
+            body = json.dumps(payload, indent=2).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _parts(self):
+            return [p for p in self.path.split("?")[0].split("/") if p]
+
+        def do_POST(self):
+            if self._parts() != ["jobs"]:
+                return self._send_json(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                data = json.loads(self.rfile.read(length) or b"null")
+            except ValueError as e:
+                return self._send_json(400, {"errors": [f"invalid JSON: {e}"]})
+            job, errors = service.submit(data)
+            if job is None:
+                return self._send_json(400, {"errors": errors})
+            self._send_json(202, job)
+
+        def do_GET(self):
+            parts = self._parts()
+            if parts == ["jobs"]:
+                return self._send_json(200, service.list_jobs())
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = service.get_job(parts[1])
+                if job is None:
+                    return self._send_json(404, {"error": "unknown job"})
+                return self._send_json(200, job)
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "artifacts":
+                artifacts = service.list_artifacts(parts[1])
+                if artifacts is None:
+                    return self._send_json(404, {"error": "unknown job"})
+                return self._send_json(200, artifacts)
+            if len(parts) == 4 and parts[0] == "jobs" and parts[2] == "artifacts":
+                path = service.artifact_path(parts[1], parts[3])
+                if path is None:
+                    return self._send_json(404, {"error": "unknown artifact"})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(os.path.getsize(path)))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    while True:
+                        chunk = f.read(1 << 20)
+                        if not chunk:
+                            break
+                        self.wfile.write(chunk)
+                return
+            self._send_json(404, {"error": "not found"})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Amarisoft experiment service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--output-dir", default=stages.BASE_OUTPUT_DIR)
+    parser.add_argument("--generated-dir", default=stages.GENERATED_DIR)
+    parser.add_argument("--lteue", default=stages.LTEUE_BIN,
+                        help="lteue binary (or a stub for testing)")
+    parser.add_argument("--devices", default="",
+                        help="comma-separated SDR devices, one experiment each (default: /dev/sdr*)")
+    parser.add_argument("--archive-dir", default=stages.ARCHIVE_DIR,
+                        help="archive root; empty string disables archiving")
+    parser.add_argument("--margin", type=int, default=stages.DEFAULT_MARGIN)
+    parser.add_argument("--post-workers", type=int, default=2)
+    parser.add_argument("--batch", action="store_true",
+                        help="merge queued requests with the same radio config into one lteue run")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep lteue running between experiments with the same radio config")
+    parser.add_argument("--max-pending", type=int, default=4,
+                        help="finished runs allowed to wait for post-processing")
+    args = parser.parse_args()
+
+    service = ExperimentService(output_dir=args.output_dir,
+                                generated_dir=args.generated_dir,
+                                lteue_bin=args.lteue,
+                                archive_dir=args.archive_dir,
+                                margin=args.margin,
+                                post_workers=args.post_workers,
+                                max_pending=args.max_pending,
+                                devices=parse_devices(args.devices),
+                                batching=args.batch,
+                                warm=args.warm)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,13 +17,21 @@ OUTPUT_DIR_LOG="$BASE_OUTPUT_DIR/$ID"
 mkdir -p "$OUTPUT_DIR_LOG"
 
 LOG_FILE="$OUTPUT_DIR_LOG/lteue_execution.log"
-EXPECT_LOG="$OUTPUT_DIR_LOG/expect_trace.log"
+RUNNER_TRACE="$OUTPUT_DIR_LOG/expect_trace.log"  # salida de lteue y milestones de pty_runner.py
 
 # Función de logging (con tee al log principal)
 log() {
     echo "$(date '+%Y-%m-%d %H:%M:%S') - $1" | tee -a "$LOG_FILE"
 }
 
+# Ejecuta una etapa registrando tiempos, CPU, RSS y E/S en timeline.json
+# Uso: timed <etapa> <comando> [args...]
+timed() {
+    local stage="$1"
+    shift
+    python3 /root/Desktop/timeline.py exec "$OUTPUT_DIR_LOG" "$stage" -- "$@"
+}
+
 # --------------------------------------------------
 # Guardar y mostrar JSON de petición
 # --------------------------------------------------
@@ -33,85 +41,114 @@ log "JSON de petición guardado en $REQUEST_JSON_FILE"
 log "Contenido de JSON:"
 cat "$REQUEST_JSON_FILE" | tee -a "$LOG_FILE"
 
+# --------------------------------------------------
+# Validar petición antes de tocar la radio
+# --------------------------------------------------
+log "Validando petición..."
+if ! python3 /root/Desktop/request_validator.py "$REQUEST_JSON_FILE" >> "$LOG_FILE" 2>&1; then
+    log "Error: petición inválida (ver $LOG_FILE)."
+    exit 1
+fi
+
 # --------------------------------------------------
 # Procesar JSON con Python
 # --------------------------------------------------
 log "Ejecutando process_json_v2.py..."
-python3 /root/Desktop/process_json_v2.py "$REQUEST_JSON_FILE" >> "$LOG_FILE" 2>&1
-if [ $? -ne 0 ]; then
+GENERATOR_OUTPUT=$(timed generate python3 /root/Desktop/process_json_v2.py "$REQUEST_JSON_FILE" 2>&1)
+GENERATOR_STATUS=$?
+echo "$GENERATOR_OUTPUT" >> "$LOG_FILE"
+if [ $GENERATOR_STATUS -ne 0 ]; then
     log "Error: process_json_v2.py falló."
     exit 1
 fi
 
 # --------------------------------------------------
-# Localizar la carpeta generada
+# Carpeta generada (la devuelve process_json_v2.py)
 # --------------------------------------------------
-sleep 2
-OUTPUT_DIR="/root/lteue-linux-2024-06-14/config/erc/generated"
-LATEST_DIR=$(ls -td "$OUTPUT_DIR"/* | head -1)
-if [ -z "$LATEST_DIR" ]; then
+LATEST_DIR=$(echo "$GENERATOR_OUTPUT" | sed -n 's/^OUTPUT_DIR=//p' | tail -1)
+if [ -z "$LATEST_DIR" ] || [ ! -d "$LATEST_DIR" ]; then
     log "Error: no se encontró directorio generado."
     exit 1
 fi
 log "Directorio generado: $LATEST_DIR"
 
 # --------------------------------------------------
-# Validar JSON y extraer duración máxima
+# Extraer duración máxima (la petición ya fue validada)
 # --------------------------------------------------
-if ! echo "$JSON_STRING" | jq empty; then
-    log "Error: JSON inválido."
-    exit 1
-fi
-
-if ! echo "$JSON_STRING" | jq '.commands[].duration' > /dev/null 2>&1; then
-    log "Error: No se encontraron comandos con duration."
-    exit 1
-fi
-
 DURACION_MAXIMA=$(jq '[.commands[].duration] | max' "$REQUEST_JSON_FILE")
 log "Duración máxima de comandos: $DURACION_MAXIMA s"
 
+# Duración total calculada por el planificador de sim_events (sim_scheduler.py)
+SCHEDULE_FILE="$LATEST_DIR/schedule.json"
+if [ -f "$SCHEDULE_FILE" ]; then
+    DURACION_EJECUCION=$(jq -r '.run_length | ceil' "$SCHEDULE_FILE")
+    NUM_APPS=$(jq -r '.ext_app_count // -1' "$SCHEDULE_FILE")
+    FIN_EVENTOS_INTERNOS=$(jq -r '.internal_end_time // 0' "$SCHEDULE_FILE")
+else
+    DURACION_EJECUCION=$DURACION_MAXIMA
+    NUM_APPS=-1
+    FIN_EVENTOS_INTERNOS=0
+fi
+log "Duración total planificada: $DURACION_EJECUCION s"
+
 # --------------------------------------------------
-# Ejecutar lteue con expect + kill automático
+# Ejecutar lteue en un pty + kill al terminar el tráfico
+# (la traza se separa en traces.log/json.log/ue_stats.csv mientras corre)
 # --------------------------------------------------
-EXPECT_SCRIPT="/root/Desktop/amari_trace_no_fork.exp"
+LTEUE_BIN="/root/lteue-linux-2024-06-14/lteue"
+MARGEN_SEGURIDAD=40
 
-log "Iniciando lteue con trace y kill tras $((DURACION_MAXIMA+40)) s..."
-expect "$EXPECT_SCRIPT" \
+log "Iniciando lteue con trace; kill al terminar $NUM_APPS app(s) o como máximo tras $((DURACION_EJECUCION+MARGEN_SEGURIDAD)) s..."
+timed run python3 /root/Desktop/pty_runner.py \
     "$LATEST_DIR/nr-erc.cfg" \
-    "$EXPECT_LOG" \
-    "$DURACION_MAXIMA" \
-    "40"
+    "$OUTPUT_DIR_LOG" \
+    "$DURACION_EJECUCION" \
+    "$MARGEN_SEGURIDAD" \
+    --lteue "$LTEUE_BIN" \
+    --n-apps "$NUM_APPS" \
+    --min-end "$FIN_EVENTOS_INTERNOS" >> "$LOG_FILE" 2>&1
 
-log "Trace completo y kill registrado en $EXPECT_LOG"
+log "pty_runner.py terminó; salida de lteue y kill registrados en $RUNNER_TRACE"
 
 JSON_LOG="$OUTPUT_DIR_LOG/json.log"
 TRACE_LOG="$OUTPUT_DIR_LOG/traces.log"
 
-log "Copiando source Amari log"
-DEST_DIR="/mnt/qnap/AmariDT/OUTPUT/$ID"
-mkdir -p $DEST_DIR
-rsync -ah --progress $BASE_OUTPUT_DIR/ue0.log $DEST_DIR/ue0.log  >> "$LOG_FILE" 2>&1
-log "Copia finalizada."
+# Snapshot del log de Amari en la carpeta del experimento: a partir de aquí
+# lteue queda libre para el siguiente experimento (ver pipelined_runner.py)
+AMARI_LOG="$OUTPUT_DIR_LOG/ue0.log"
+mv "$BASE_OUTPUT_DIR/ue0.log" "$AMARI_LOG"
+log "Log de Amari movido a $AMARI_LOG"
 
-log "Ejecutando parser.py..."
-python3 /root/Desktop/parserv2.py $EXPECT_LOG $TRACE_LOG $JSON_LOG >> "$LOG_FILE" 2>&1
-log "Parseo finalizado."
+log "Trace separado durante la ejecución en $TRACE_LOG y $JSON_LOG"
 
 log "Limpiando logs de json"
-python3 /root/Desktop/dedupe.py $JSON_LOG >> "$LOG_FILE" 2>&1
+timed dedupe python3 /root/Desktop/dedupe.py $JSON_LOG >> "$LOG_FILE" 2>&1
 log "Limpieza finalizado."
 
 # --------------------------------------------------
 # Extracción de datos
 # --------------------------------------------------
 log "Ejecutando data_extractor_v3.py..."
-python3 /root/Desktop/data_extractor_v3.py "$OUTPUT_DIR_LOG" "$REQUEST_JSON_FILE" >> "$LOG_FILE" 2>&1
+timed extract python3 /root/Desktop/data_extractor_v3.py "$OUTPUT_DIR_LOG" "$REQUEST_JSON_FILE" "$AMARI_LOG" >> "$LOG_FILE" 2>&1
 log "Extracción de datos finalizada."
 
-log "Copiando output del experimento"
-rsync -ah --progress $OUTPUT_DIR_LOG/* $DEST_DIR >> "$LOG_FILE" 2>&1
-log "Copia finalizada."
+# Agregados por flujo a 1 ms, 10 ms, 100 ms, 1 s y 10 s (<ID>.rollups.npz)
+log "Calculando rollups..."
+timed rollup python3 /root/Desktop/validation_tests/rollups.py build "$OUTPUT_DIR_LOG/$ID.csv" >> "$LOG_FILE" 2>&1
+
+# Throughput del log frente a los intervalos de iperf3 (<ID>.iperf_crosscheck.csv)
+log "Comparando con los informes de iperf3..."
+timed crosscheck python3 /root/Desktop/validation_tests/iperf_crosscheck.py "$OUTPUT_DIR_LOG/$ID.csv" >> "$LOG_FILE" 2>&1
+
+# Índice de ue0.log ([IP] por flujo y tiempo, checkpoints de mcs)
+log "Indexando ue0.log..."
+timed index python3 /root/Desktop/log_index.py build "$AMARI_LOG" >> "$LOG_FILE" 2>&1
+
+# Archivado en segundo plano (zstd + verificación por hash, omite ficheros
+# sin cambios): no bloquea el siguiente experimento
+DEST_DIR="/mnt/qnap/AmariDT/OUTPUT/$ID"
+log "Archivando output del experimento en $DEST_DIR (en segundo plano)"
+nohup python3 /root/Desktop/timeline.py exec "$OUTPUT_DIR_LOG" archive -- python3 /root/Desktop/archiver.py "$OUTPUT_DIR_LOG" "$DEST_DIR" >> "$LOG_FILE" 2>&1 &
 
 # --------------------------------------------------
 # Fin de script
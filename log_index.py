@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Sidecar index for ue0.log ("<log>.idx.npz"), built in one pass.
+
+  records      one entry per [IP] record: timestamp (ms, monotonic across
+               midnight), byte offset of the record in the uncompressed log
+               and flow ID
+  flows        flow ID -> 5-tuple (src ip, src port, dst ip, dst port, proto)
+  checkpoints  byte offset and value of every "mcs=" line
+
+Records are stored in log order, so the records of a time window are found
+by binary search on the timestamp column; every record is then read with a
+single seek. The offsets are those of the uncompressed log, so the same
+index also serves the seekable ue0.log.frames archive (seekable_log.py).
+
+Usage:
+  log_index.py build <ue0.log>
+  log_index.py flows <ue0.log | ue0.log.frames>
+  log_index.py query <ue0.log | ue0.log.frames> <flow_id | dst_ip:dst_port> <HH:MM:SS> <HH:MM:SS> [out.csv]
+"""
+import os
+import re
+import sys
+import csv
+import socket
+
+import numpy as np
+
+from seekable_log import FramedLogReader, TimestampTracker, parse_time
+
+RECORD_DTYPE = np.dtype([("ts_ms", "<i8"), ("offset", "<u8"), ("flow", "<u4")])
+FLOW_DTYPE = np.dtype([("src_ip", "<u4"), ("src_port", "<u2"),
+                       ("dst_ip", "<u4"), ("dst_port", "<u2"), ("proto", "u1")])
+CHECKPOINT_DTYPE = np.dtype([("offset", "<u8"), ("mcs", "<i2")])
+
+PROTO_NAMES = {1: "ICMP", 6: "TCP", 17: "UDP"}
+
+ip_line_pattern = re.compile(
+    rb"^\d{2}:\d{2}:\d{2}\.\d{3}.*\[IP\].*? (\d+\.\d+\.\d+\.\d+):(\d+) > (\d+\.\d+\.\d+\.\d+):(\d+)"
+)
+hex_0000_pattern = re.compile(rb"^\s*0000:\s*(.*)")
+mcs_line_pattern = re.compile(rb"^\s*mcs=(\d+)", re.IGNORECASE)
+timestamp_pattern = re.compile(rb"^\d{2}:\d{2}:\d{2}\.\d{3}")
+
+
+def index_path(log_file):
+    """ue0.log and ue0.log.frames share the same index file."""
+    if log_file.endswith(".frames"):
+        log_file = log_file[:-len(".frames")]
+    return log_file + ".idx.npz"
+
+
+def _ip_to_int(ip):
+    return int.from_bytes(socket.inet_aton(ip.decode("ascii")), "big")
+
+
+def _int_to_ip(value):
+    return socket.inet_ntoa(int(value).to_bytes(4, "big"))
+
+
+def _iter_log(log_file):
+    """Yields the lines (bytes) of a plain or .frames log."""
+    if log_file.endswith(".frames"):
+        with FramedLogReader(log_file) as reader:
+            yield from reader.iter_lines()
+    else:
+        with open(log_file, "rb") as f:
+            yield from f
+
+
+def build_index(log_file, out_path=None):
+    """Scans the log once and writes its index. Returns the index path."""
+    tracker = TimestampTracker()
+    flow_ids = {}
+    records = []
+    checkpoints = []
+    pending = None  # [ts, offset, key] de un [IP] a la espera de su línea 0000:
+    offset = 0
+
+    def close_pending(proto=0):
+        src_ip, src_port, dst_ip, dst_port = pending[2]
+        key = (src_ip, src_port, dst_ip, dst_port, proto)
+        flow = flow_ids.setdefault(key, len(flow_ids))
+        records.append((pending[0], pending[1], flow))
+
+    for line in _iter_log(log_file):
+        ts = tracker.update(line)
+        if ts is not None:
+            if pending:
+                close_pending()
+                pending = None
+            m = ip_line_pattern.match(line)
+            if m:
+                src_ip, src_port, dst_ip, dst_port = m.groups()
+                pending = [ts, offset, (_ip_to_int(src_ip), int(src_port),
+                                        _ip_to_int(dst_ip), int(dst_port))]
+        elif pending:
+            m = hex_0000_pattern.match(line)
+            if m:
+                # Byte 9 de la cabecera IP: protocolo
+                hex_data = m.group(1).replace(b" ", b"")
+                close_pending(int(hex_data[18:20], 16) if len(hex_data) >= 20 else 0)
+                pending = None
+        else:
+            m = mcs_line_pattern.match(line)
+            if m:
+                checkpoints.append((offset, int(m.group(1))))
+        offset += len(line)
+    if pending:
+        close_pending()
+
+    flows = sorted(flow_ids.items(), key=lambda item: item[1])
+    out_path = out_path or index_path(log_file)
+    tmp = out_path + ".part.npz"
+    np.savez_compressed(tmp,
+                        records=np.array(records, dtype=RECORD_DTYPE),
+                        flows=np.array([key for key, _ in flows], dtype=FLOW_DTYPE),
+                        checkpoints=np.array(checkpoints, dtype=CHECKPOINT_DTYPE),
+                        log_size=np.array(offset, dtype="<u8"))
+    os.replace(tmp, out_path)
+    return out_path
+
+
+class LogIndex:
+    """
+    Random access to the [IP] records of a ue0.log (or ue0.log.frames)
+    through its sidecar index.
+    """
+    def __init__(self, log_file, index_file=None):
+        self.log_file = log_file
+        with np.load(index_file or index_path(log_file)) as data:
+            self.records = data["records"]
+            self.flows = data["flows"]
+            self.checkpoints = data["checkpoints"]
+            log_size = int(data["log_size"])
+
+        self.framed = log_file.endswith(".frames")
+        if self.framed:
+            self.reader = FramedLogReader(log_file)
+            self.frame_offsets = np.array([e[3] for e in self.reader.index], dtype="<u8")
+            size = sum(e[6] for e in self.reader.index)
+            self._frame = (None, b"")
+        else:
+            self.reader = open(log_file, "rb")
+            size = os.path.getsize(log_file)
+        if size != log_size:
+            self.close()
+            raise ValueError(f"index of '{log_file}' is stale, rebuild it")
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------- Flows --------------
+    def flow_tuple(self, flow):
+        f = self.flows[flow]
+        return (_int_to_ip(f["src_ip"]), int(f["src_port"]),
+                _int_to_ip(f["dst_ip"]), int(f["dst_port"]),
+                PROTO_NAMES.get(int(f["proto"]), str(int(f["proto"]))))
+
+    def find_flows(self, dst_ip=None, dst_port=None, src_ip=None, src_port=None):
+        """Flow IDs matching the given (partial) 5-tuple."""
+        mask = np.ones(len(self.flows), dtype=bool)
+        if dst_ip is not None:
+            mask &= self.flows["dst_ip"] == _ip_to_int(dst_ip.encode())
+        if dst_port is not None:
+            mask &= self.flows["dst_port"] == int(dst_port)
+        if src_ip is not None:
+            mask &= self.flows["src_ip"] == _ip_to_int(src_ip.encode())
+        if src_port is not None:
+            mask &= self.flows["src_port"] == int(src_port)
+        return np.flatnonzero(mask).tolist()
+
+    def flow_counts(self):
+        return np.bincount(self.records["flow"], minlength=len(self.flows))
+
+    # -------------- Records --------------
+    def record_range(self, start_ms=None, end_ms=None):
+        """[lo, hi) slice of the records between start_ms and end_ms (inclusive)."""
+        ts = self.records["ts_ms"]
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        return lo, hi
+
+    def mcs_at(self, offset):
+        """MCS in force at a byte offset of the log (None before the first mcs= line)."""
+        i = int(np.searchsorted(self.checkpoints["offset"], offset, side="right")) - 1
+        return int(self.checkpoints["mcs"][i]) if i >= 0 else None
+
+    def _frame_lines(self, offset):
+        """Lines of the uncompressed log starting at offset, within its frame."""
+        i = int(np.searchsorted(self.frame_offsets, offset, side="right")) - 1
+        if self._frame[0] != i:
+            self._frame = (i, self.reader.read_frame(i))
+        start = offset - int(self.frame_offsets[i])
+        return self._frame[1][start:].splitlines(keepends=True)
+
+    def read_record(self, offset):
+        """The [IP] line at offset plus its hex dump lines, as str."""
+        if self.framed:
+            lines = iter(self._frame_lines(offset))
+        else:
+            self.reader.seek(offset)
+            lines = self.reader
+        record = [next(lines)]
+        for line in lines:
+            if timestamp_pattern.match(line) or mcs_line_pattern.match(line):
+                break
+            record.append(line)
+        return [line.decode("utf-8", errors="replace") for line in record]
+
+    def packets(self, flows, start_ms=None, end_ms=None):
+        """
+        Extractor rows (same columns as data_extractor_v3.py) of the packets
+        of one flow ID (or a list of them) between start_ms and end_ms, in
+        log order.
+        """
+        from data_extractor_v3 import parse_amarisoft_lines
+
+        lo, hi = self.record_range(start_ms, end_ms)
+        window = self.records[lo:hi]
+        rows = []
+        for offset in window["offset"][np.isin(window["flow"], flows)]:
+            offset = int(offset)
+            rows.extend(parse_amarisoft_lines(self.read_record(offset), self.mcs_at(offset)))
+        return rows
+
+
+def load_or_build(log_file):
+    """Opens the index of log_file, (re)building it if missing or stale."""
+    if not os.path.exists(index_path(log_file)):
+        build_index(log_file)
+    try:
+        return LogIndex(log_file)
+    except ValueError:
+        build_index(log_file)
+        return LogIndex(log_file)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("build", "flows", "query"):
+        print("Usage: log_index.py build <ue0.log>\n"
+              "       log_index.py flows <ue0.log | ue0.log.frames>\n"
+              "       log_index.py query <log> <flow_id | dst_ip:dst_port> <start HH:MM:SS> <end HH:MM:SS> [out.csv]")
+        sys.exit(1)
+
+    cmd, log_file = sys.argv[1], sys.argv[2]
+    if not os.path.isfile(log_file):
+        print(f"Error: log file '{log_file}' not found.")
+        sys.exit(1)
+
+    if cmd == "build":
+        out = build_index(log_file)
+        print(f"Index written to {out}")
+        return
+
+    with load_or_build(log_file) as idx:
+        if cmd == "flows":
+            for flow, count in enumerate(idx.flow_counts()):
+                src_ip, src_port, dst_ip, dst_port, proto = idx.flow_tuple(flow)
+                print(f"{flow}\t{src_ip}:{src_port} > {dst_ip}:{dst_port} {proto}\t{count} packets")
+            return
+
+        if len(sys.argv) not in (6, 7):
+            print("Usage: log_index.py query <log> <flow_id | dst_ip:dst_port> <start> <end> [out.csv]")
+            sys.exit(1)
+        selector = sys.argv[3]
+        if ":" in selector:
+            dst_ip, dst_port = selector.rsplit(":", 1)
+            flows = idx.find_flows(dst_ip=dst_ip, dst_port=dst_port)
+        else:
+            flows = [int(selector)] if int(selector) < len(idx.flows) else []
+        if not flows:
+            print(f"Error: no flow matches '{selector}'.")
+            sys.exit(1)
+
+        rows = idx.packets(flows, parse_time(sys.argv[4]), parse_time(sys.argv[5]))
+
+    out = open(sys.argv[6], "w", newline="", encoding="utf-8") if len(sys.argv) == 7 else sys.stdout
+    writer = csv.writer(out)
+    from data_extractor_v3 import CSV_HEADER
+    writer.writerow(CSV_HEADER)
+    writer.writerows(rows)
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the lteue binary, for exercising the pipeline without an SDR.
+
+Usage: lteue_stub.py <nr-erc.cfg>
+
+It mimics the parts of lteue the pipeline relies on:
+  - prints the start-up banner, "/dev/sdr0 initialized" and "(ue) Cell 0: SIB found"
+  - after receiving 't' prints the UE stats table once per second
+  - runs the ext_app sim_events of users-scenario.cfg: prints the
+    "[N][iperf3 ...]" start line, writes [IP] records with hex dumps to the
+    log_filename of the config and, for commands with -J, prints an iperf3
+    -J report at end_time
+  - serves a mock remote API on the com_addr port (mock_remote_api.py):
+    UEs added with ue_add start their sim_events relative to the time they
+    were added, ue_del stops them; this is what warm_lteue.py drives
+  - answers 't' sent by UDP to the com_addr port with the stats table, like
+    the lteue CLI (stats_poller.py)
+  - keeps running until it receives SIGTERM/SIGINT, like the real binary
+
+LTEUE_STUB_TIME_SCALE (default 1.0) scales wall-clock time, e.g. 0.1 runs
+the scenario ten times faster. LTEUE_STUB_MAX_PPS caps the packets written
+per UE and simulated second (default 50).
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import select
+import signal
+import threading
+from datetime import datetime, timedelta
+
+from request_validator import parse_iperf_command
+from mock_remote_api import MockRemoteAPI
+
+STATS_HEADER = (
+    "----------------------Hz---ppm----dB----dBm-----------------------DL---------- ---------------------UL-\n"
+    "UE_ID  RAT CL RNTI   CFO   SRO  SINR   RSRP  mcs retx rxko rxok brate     #its  mcs  ta retx   tx brate"
+)
+PACKET_SIZE = 1470
+
+
+def load_config(cfg_path):
+    with open(cfg_path, "r", encoding="utf-8") as f:
+        cfg = f.read()
+    m = re.search(r'log_filename:\s*"([^"]+)"', cfg)
+    log_filename = m.group(1) if m else "/tmp/ue0.log"
+    m = re.search(r'com_addr:\s*"[^"]*:(\d+)"', cfg)
+    com_port = int(m.group(1)) if m else None
+    scenario = os.path.join(os.path.dirname(cfg_path), "users-scenario.cfg")
+    with open(scenario, "r", encoding="utf-8") as f:
+        ue_list = json.load(f)["ue_list"]
+    return log_filename, com_port, ue_list
+
+
+def stats_table(ues):
+    rows = [f"{ue['ue_id']:5d}   NR 00 {0x5500 + ue['ue_id']:4x}   400   0.1  33.4  -95.8 "
+            f"20.0    0    0    1  477k  1/1.0/1 12.8  84    1    7 4.29M"
+            for ue in ues]
+    return "\n".join([STATS_HEADER] + rows)
+
+
+def serve_udp_stats(sock, ues, lock):
+    while True:
+        try:
+            data, addr = sock.recvfrom(64)
+        except OSError:
+            return
+        if data.strip() == b"t":
+            with lock:
+                table = stats_table(list(ues.values()))
+            sock.sendto((table + "\n").encode(), addr)
+
+
+def ue_apps(ue, offset, max_pps):
+    """The ext_app sim_events of a UE, with times shifted by offset."""
+    apps = []
+    for ev in ue.get("sim_events", []):
+        if ev.get("event") != "ext_app":
+            continue
+        cmd = " ".join(ev["args"])
+        opts = parse_iperf_command(cmd)
+        rate = opts["bitrate_bps"] or 1e6
+        apps.append({"ue_id": ue["ue_id"], "cmd": cmd, "opts": opts,
+                     "start": offset + ev["start_time"], "end": offset + ev["end_time"],
+                     "pps": min(max_pps, max(1, int(rate / (PACKET_SIZE * 8)))),
+                     "state": "pending", "packets": [], "seq": 0})
+    return apps
+
+
+def hex_dump(packet):
+    lines = []
+    for off in range(0, min(len(packet), 48), 16):
+        chunk = packet[off:off + 16]
+        left = " ".join(f"{b:02x}" for b in chunk[:8])
+        right = " ".join(f"{b:02x}" for b in chunk[8:])
+        lines.append(f"          {off:04x}:  {left}  {right}")
+    return "\n".join(lines)
+
+
+def build_packet(ip_id, src, dst, sport, dport, seq, now):
+    header = bytes([0x45, 0x00]) + PACKET_SIZE.to_bytes(2, "big") + (ip_id & 0xFFFF).to_bytes(2, "big")
+    header += bytes([0x40, 0x00, 0x40, 0x11, 0x00, 0x00])
+    header += bytes(int(p) for p in src.split(".")) + bytes(int(p) for p in dst.split("."))
+    udp = sport.to_bytes(2, "big") + dport.to_bytes(2, "big") + (PACKET_SIZE - 20).to_bytes(2, "big") + b"\x00\x00"
+    payload = int(now).to_bytes(4, "big") + int((now % 1) * 1e6).to_bytes(4, "big") + seq.to_bytes(4, "big")
+    return header + udp + payload + bytes(8)
+
+
+def iperf_report(opts, started, seconds, packets):
+    intervals = []
+    for i in range(int(seconds)):
+        n = packets[i] if i < len(packets) else 0
+        block = {"start": i, "end": i + 1, "seconds": 1, "bytes": n * PACKET_SIZE,
+                 "bits_per_second": n * PACKET_SIZE * 8, "packets": n,
+                 "omitted": False, "sender": True}
+        intervals.append({"streams": [dict(block, socket=5)], "sum": block})
+    total = sum(packets)
+    return {
+        "start": {
+            "connecting_to": {"host": opts["client"], "port": opts["port"]},
+            "timestamp": {"time": started.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+                          "timesecs": int(started.timestamp())},
+        },
+        "intervals": intervals,
+        "end": {"sum": {"start": 0, "end": seconds, "seconds": seconds,
+                        "bytes": total * PACKET_SIZE,
+                        "bits_per_second": total * PACKET_SIZE * 8 / max(seconds, 1e-9),
+                        "packets": total, "lost_packets": 0, "sender": True}},
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: lteue_stub.py <nr-erc.cfg>")
+        sys.exit(1)
+
+    scale = float(os.environ.get("LTEUE_STUB_TIME_SCALE", "1.0"))
+    max_pps = int(os.environ.get("LTEUE_STUB_MAX_PPS", "50"))
+    log_filename, com_port, ue_list = load_config(sys.argv[1])
+    os.makedirs(os.path.dirname(log_filename) or ".", exist_ok=True)
+
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stop.append(True))
+
+    lock = threading.Lock()
+    ues = {ue["ue_id"]: ue for ue in ue_list}
+    apps = [app for ue in ue_list for app in ue_apps(ue, 0, max_pps)]
+    t0 = time.monotonic()
+
+    def sim_time():
+        return (time.monotonic() - t0) / scale
+
+    def on_ue_add(msg):
+        with lock:
+            for ue in msg.get("list", []):
+                ues[ue["ue_id"]] = ue
+                apps.extend(ue_apps(ue, sim_time(), max_pps))
+
+    def on_ue_del(msg):
+        ids = msg["ue_id"] if isinstance(msg["ue_id"], list) else [msg["ue_id"]]
+        with lock:
+            for ue_id in ids:
+                ues.pop(ue_id, None)
+            apps[:] = [app for app in apps if app["ue_id"] not in ids]
+
+    remote_api = None
+    if com_port:
+        try:
+            remote_api = MockRemoteAPI("127.0.0.1", com_port,
+                                       hooks={"ue_add": on_ue_add, "ue_del": on_ue_del})
+            remote_api.ues.update({ue_id: dict(ue, power_on=True) for ue_id, ue in ues.items()})
+            remote_api.start()
+        except OSError as e:
+            print(f"Remote API disabled: port {com_port}: {e}", flush=True)
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            udp.bind(("127.0.0.1", com_port))
+            threading.Thread(target=serve_udp_stats, args=(udp, ues, lock), daemon=True).start()
+        except OSError as e:
+            print(f"UDP CLI disabled: port {com_port}: {e}", flush=True)
+
+    print("UE version 2024-06-14, Copyright (C) 2012-2024 Amarisoft (stub)")
+    print("/dev/sdr0 initialized (0s) (tries=0)")
+    print("(ue) Cell 0: SIB found", flush=True)
+
+    log = open(log_filename, "w", encoding="utf-8")
+    wall0 = datetime.now()
+    trace_on = False
+    last_stats = -1
+    while not stop:
+        sim_t = sim_time()
+        with lock:
+            if not trace_on and select.select([sys.stdin], [], [], 0)[0]:
+                if "t" in (sys.stdin.readline() or ""):
+                    trace_on = True
+                    print("Press [return] to stop the trace", flush=True)
+
+            for app in apps:
+                if app["state"] == "pending" and sim_t >= app["start"]:
+                    app["state"] = "running"
+                    app["started"] = wall0 + timedelta(seconds=sim_t)
+                    print(f"[{app['ue_id']}][{app['cmd']}] ip netns exec ue{app['ue_id']} {app['cmd']}", flush=True)
+                if app["state"] == "running":
+                    second = int(sim_t - app["start"])
+                    while len(app["packets"]) <= second:
+                        app["packets"].append(0)
+                    due = int((sim_t - app["start"]) * app["pps"])
+                    while app["seq"] < due and sim_t < app["end"]:
+                        app["seq"] += 1
+                        app["packets"][second] += 1
+                        now = wall0 + timedelta(seconds=sim_t)
+                        src = f"10.0.0.{app['ue_id'] + 1}"
+                        pkt = build_packet(app["seq"], src, app["opts"]["client"],
+                                           40000 + app["ue_id"], app["opts"]["port"],
+                                           app["seq"], now.timestamp())
+                        log.write(f"{now.strftime('%H:%M:%S.%f')[:-3]} [IP] UL {app['ue_id']:04x} "
+                                  f"{src}:{40000 + app['ue_id']} > {app['opts']['client']}:{app['opts']['port']} "
+                                  f"UDP len={PACKET_SIZE}\n{hex_dump(pkt)}\n")
+                    if sim_t >= app["end"]:
+                        app["state"] = "done"
+                        # Como iperf3: sólo con -J se imprime el informe al acabar
+                        if app["opts"]["json"]:
+                            report = iperf_report(app["opts"], app["started"], app["end"] - app["start"],
+                                                  app["packets"])
+                            print(json.dumps(report, indent="\t"), flush=True)
+            log.flush()
+
+            if trace_on and int(sim_t) != last_stats:
+                last_stats = int(sim_t)
+                print(stats_table(ues.values()), flush=True)
+                log.write(f"{(wall0 + timedelta(seconds=sim_t)).strftime('%H:%M:%S.%f')[:-3]} "
+                          f"[PHY] UL 0001 PUSCH:\n    mcs={20 + last_stats % 5} prb=0:273\n")
+        time.sleep(0.01 * min(scale, 1.0))
+
+    if remote_api:
+        remote_api.stop()
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Mock of the lteue remote API for testing warm_lteue.py and remote_api.py
+without an SDR.
+
+It keeps an in-memory UE list and answers ue_add, ue_del, ue_get,
+power_on, power_off and config_get the way lteue does (a reply with the
+same message and message_id, or an "error" field). hooks maps a message
+name to fn(msg), called after the default handling; lteue_stub.py uses
+them to start the traffic of the UEs added through the API.
+
+Usage: mock_remote_api.py [--host 127.0.0.1] [--port 9002]   (prints every message)
+"""
+import json
+import argparse
+import threading
+import socketserver
+
+from remote_api import accept_key, send_frame, recv_message, RemoteAPIError
+
+
+class MockRemoteAPI:
+    def __init__(self, host="127.0.0.1", port=9002, hooks=None, verbose=False):
+        self.hooks = hooks or {}
+        self.verbose = verbose
+        self.ues = {}
+        self.messages = []
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), self._handler_class(),
+                                                      bind_and_activate=False)
+        self.server.allow_reuse_address = True
+        self.server.daemon_threads = True
+        self.server.server_bind()
+        self.server.server_activate()
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # -------------- Messages --------------
+    def handle(self, msg):
+        name = msg.get("message")
+        reply = {"message": name, "message_id": msg.get("message_id")}
+        with self.lock:
+            self.messages.append(msg)
+            if self.verbose:
+                print(json.dumps(msg), flush=True)
+            if name == "ue_add":
+                added = msg.get("list", [])
+                dup = [ue.get("ue_id") for ue in added if ue.get("ue_id") in self.ues]
+                if dup:
+                    return dict(reply, error=f"UE ID already exists: {dup}")
+                for ue in added:
+                    self.ues[ue.get("ue_id")] = dict(ue, power_on=False)
+            elif name in ("ue_del", "power_on", "power_off"):
+                ids = msg.get("ue_id")
+                ids = ids if isinstance(ids, list) else [ids]
+                unknown = [i for i in ids if i not in self.ues]
+                if unknown:
+                    return dict(reply, error=f"Unknown UE ID: {unknown}")
+                for i in ids:
+                    if name == "ue_del":
+                        del self.ues[i]
+                    else:
+                        self.ues[i]["power_on"] = name == "power_on"
+            elif name == "ue_get":
+                reply["ue_list"] = [{"ue_id": i, "power_on": ue["power_on"]}
+                                    for i, ue in sorted(self.ues.items())]
+            elif name == "config_get":
+                reply.update(type="UE", name="UE", version="mock")
+            else:
+                return dict(reply, error=f"Unknown message: {name}")
+        hook = self.hooks.get(name)
+        if hook:
+            hook(msg)
+        return reply
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                request = b""
+                while not request.endswith(b"\r\n\r\n"):
+                    chunk = sock.recv(1)
+                    if not chunk:
+                        return
+                    request += chunk
+                headers = {k.strip().lower(): v.strip()
+                           for k, _, v in (h.partition(":")
+                                           for h in request.decode("latin-1").split("\r\n")[1:])}
+                key = headers.get("sec-websocket-key")
+                if not key:
+                    sock.sendall(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+                    return
+                sock.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                              "Connection: Upgrade\r\n"
+                              f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n").encode())
+                send_frame(sock, json.dumps({"message": "ready", "type": "UE",
+                                             "name": "UE", "version": "mock"}).encode(),
+                           mask=False)
+                try:
+                    while True:
+                        text = recv_message(sock, mask=False)
+                        if text is None:
+                            break
+                        try:
+                            reply = api.handle(json.loads(text))
+                        except ValueError as e:
+                            reply = {"error": f"Invalid JSON: {e}"}
+                        send_frame(sock, json.dumps(reply).encode(), mask=False)
+                except (OSError, RemoteAPIError):
+                    pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock lteue remote API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9002)
+    args = parser.parse_args()
+
+    api = MockRemoteAPI(args.host, args.port, verbose=True)
+    print(f"Mock remote API on ws://{args.host}:{api.port}", flush=True)
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,60 @@
 import sys
 import os
 
+class JsonSplitter:
+    """
+    Incremental version of split_log_all() for a trace that is still being
+    produced (pty_runner.py): feed() it one line at a time. Lines outside
+    JSON objects go to trace_out as they arrive and each JSON blob is
+    appended to json_out as soon as its braces balance. The files are the
+    same split_log_all() writes from the complete log.
+    """
+    def __init__(self, trace_out, json_out):
+        self.trace = open(trace_out, 'w', encoding='utf-8')
+        self.json = open(json_out, 'w', encoding='utf-8')
+        self.json.write('[\n')
+        self.count = 0
+        self.buf = None
+        self.depth = 0
+
+    def feed(self, line):
+        if self.buf is None:
+            # look for JSON start anywhere in line
+            start = line.find('{')
+            if start == -1:
+                # no JSON start: it's trace
+                self.trace.write(line)
+                return
+            # first JSON line: take from the first '{' onward
+            line = line[start:]
+            self.buf = []
+            self.depth = 0
+        self.buf.append(line)
+        self.depth += line.count('{') - line.count('}')
+        # when depth returns to zero, we've closed the JSON
+        if self.depth == 0:
+            self._write_blob(''.join(self.buf))
+            self.buf = None
+
+    def _write_blob(self, jb):
+        # all JSON blobs as a JSON list: [ {...}, {...}, ... ]
+        if self.count:
+            self.json.write(',\n')
+        # indent each blob by two spaces for readability
+        for line in jb.rstrip().splitlines():
+            self.json.write('  ' + line + '\n')
+        self.count += 1
+
+    def close(self):
+        # an unterminated blob at the end is kept as it is
+        if self.buf is not None:
+            self._write_blob(''.join(self.buf))
+            self.buf = None
+        self.json.write(']\n')
+        self.trace.close()
+        self.json.close()
+
+
 def split_log_all(input_file, trace_out, json_out):
     """
     Reads the entire log, pulls out every JSON object (balanced braces), and
@@ -10,68 +64,13 @@ def split_log_all(input_file, trace_out, json_out):
       - trace_out: all lines _outside_ of those JSON objects
       - json_out: all JSON blobs wrapped in a JSON list
     """
+    splitter = JsonSplitter(trace_out, json_out)
     with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-
-    trace_lines = []
-    json_blobs = []
-
-    i = 0
-    n = len(lines)
-    while i < n:
-        line = lines[i]
-        # look for JSON start anywhere in line
-        start = line.find('{')
-        if start == -1:
-            # no JSON start: it's trace
-            trace_lines.append(line)
-            i += 1
-            continue
-
-        # we found the start of a JSON blob
-        depth = 0
-        in_json = False
-        buf = []
-
-        # process lines until balanced braces close
-        while i < n:
-            l = lines[i]
-            if not in_json:
-                # first JSON line: take from the first '{' onward
-                l = l[start:]
-                in_json = True
-            buf.append(l)
-
-            # update brace depth
-            for c in l:
-                if c == '{':
-                    depth += 1
-                elif c == '}':
-                    depth -= 1
-
-            i += 1
-            # when depth returns to zero, we've closed the JSON
-            if in_json and depth == 0:
-                break
-
-        json_blobs.append(''.join(buf))
-
-    # write trace portion
-    with open(trace_out, 'w', encoding='utf-8') as tf:
-        tf.writelines(trace_lines)
-
-    # write all JSON blobs as a JSON list: [ {...}, {...}, ... ]
-    with open(json_out, 'w', encoding='utf-8') as jf:
-        jf.write('[\n')
-        for idx, jb in enumerate(json_blobs, start=1):
-            # indent each blob by two spaces for readability
-            for line in jb.rstrip().splitlines():
-                jf.write('  ' + line + '\n')
-            if idx != len(json_blobs):
-                jf.write(',\n')
-        jf.write(']\n')
+        for line in f:
+            splitter.feed(line)
+    splitter.close()
 
-    print(f"Trace saved to {trace_out}, {len(json_blobs)} JSON blob(s) saved to {json_out}")
+    print(f"Trace saved to {trace_out}, {splitter.count} JSON blob(s) saved to {json_out}")
 
 def main():
     if len(sys.argv) != 4:
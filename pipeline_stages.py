@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Python versions of the steps listener.sh runs for one experiment
+(generate -> lteue -> split -> dedupe -> extract -> rollup -> crosscheck -> index
+-> archive), so they can be driven from a job queue instead of a blocking
+shell script.
+
+Every stage appends its output to the experiment's lteue_execution.log,
+the same file listener.sh writes to. The *_stage() wrappers record each
+stage in the experiment's manifest.json (run_manifest.py) and skip it when
+its inputs have not changed.
+"""
+import os
+import json
+import threading
+import subprocess
+from datetime import datetime
+
+import archiver
+import log_index
+import batch_scheduler
+import timeline
+import pty_runner
+from run_manifest import RunManifest, MANIFEST_NAME
+
+# -------------- Default Paths --------------
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_OUTPUT_DIR = "/root/Desktop/OUTPUT"
+GENERATED_DIR = "/root/lteue-linux-2024-06-14/config/erc/generated"
+LTEUE_BIN = "/root/lteue-linux-2024-06-14/lteue"
+ARCHIVE_DIR = "/mnt/qnap/AmariDT/OUTPUT"
+CELL_DATABASE = os.path.join(SCRIPTS_DIR, "cell_database.json")
+DEFAULT_MARGIN = 40
+ROLLUPS_SCRIPT = os.path.join("validation_tests", "rollups.py")
+THROUGHPUT_BINS_SCRIPT = os.path.join("validation_tests", "throughput_bins.py")
+CROSSCHECK_SCRIPT = os.path.join("validation_tests", "iperf_crosscheck.py")
+
+STAGES = ("generate", "run", "split", "dedupe", "extract", "rollup", "crosscheck", "index",
+          "archive")
+RADIO_STAGES = ("generate", "run")
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage fails; the message names the stage."""
+
+
+def experiment_paths(exp_dir, exp_id):
+    """Standard file names inside an experiment directory (same as listener.sh)."""
+    return {
+        "request": os.path.join(exp_dir, "request.json"),
+        "log": os.path.join(exp_dir, "lteue_execution.log"),
+        "expect_log": os.path.join(exp_dir, "expect_trace.log"),
+        "trace_log": os.path.join(exp_dir, "traces.log"),
+        "json_log": os.path.join(exp_dir, "json.log"),
+        "ue_stats": os.path.join(exp_dir, "ue_stats.csv"),
+        "amari_log": os.path.join(exp_dir, "ue0.log"),
+        "csv": os.path.join(exp_dir, f"{exp_id}.csv"),
+        "throughput_check": os.path.join(exp_dir, f"{exp_id}.throughput_check.json"),
+        "sketches": os.path.join(exp_dir, f"{exp_id}.sketches.json"),
+        "rollups": os.path.join(exp_dir, f"{exp_id}.rollups.npz"),
+        "crosscheck": os.path.join(exp_dir, f"{exp_id}.iperf_crosscheck.csv"),
+        "index": log_index.index_path(os.path.join(exp_dir, "ue0.log")),
+    }
+
+
+def script(name):
+    return os.path.join(SCRIPTS_DIR, name)
+
+
+def log(log_file, message):
+    """Same format as the log() helper in listener.sh."""
+    line = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n"
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def run_command(stage, args, log_file, cwd=None, timeout=None, capture=False):
+    """
+    Runs a child process with stdout/stderr appended to log_file. With
+    capture=True the output is also returned as a string. The child's CPU
+    time, peak RSS and I/O are added to the current timeline stage.
+    """
+    log(log_file, f"[{stage}] {' '.join(str(a) for a in args)}")
+    with open(log_file, "a", encoding="utf-8") as out:
+        try:
+            proc = subprocess.Popen(args, stdout=subprocess.PIPE if capture else out,
+                                    stderr=subprocess.STDOUT, cwd=cwd, text=True)
+        except OSError as e:
+            raise StageError(f"{stage}: {e}")
+        timed_out = []
+
+        def kill():
+            timed_out.append(True)
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer:
+            timer.start()
+        output = proc.stdout.read() if capture else None
+        returncode = timeline.wait_child(proc)
+        if timer:
+            timer.cancel()
+        if capture:
+            proc.stdout.close()
+            out.write(output)
+    if timed_out:
+        raise StageError(f"{stage}: timed out after {timeout} seconds")
+    if returncode != 0:
+        raise StageError(f"{stage}: exited with code {returncode}")
+    return output
+
+
+def save_request(exp_dir, data):
+    """Writes request.json into a (new) experiment directory."""
+    os.makedirs(exp_dir, exist_ok=True)
+    request_file = os.path.join(exp_dir, "request.json")
+    with open(request_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return request_file
+
+
+def generate(request_file, log_file, generated_dir=GENERATED_DIR, amari_log=None, slot=None):
+    """
+    Runs process_json_v2.py and returns (config_dir, schedule): the directory
+    holding nr-erc.cfg, as reported by the generator's OUTPUT_DIR= line, and
+    the contents of its schedule.json. amari_log is the log_filename lteue
+    will write; slot (resource_allocator.Slot) gives the SDR device, com
+    port and UE ID block. Without them the generator's single-SDR defaults
+    are used.
+    """
+    args = ["python3", os.path.join(SCRIPTS_DIR, "process_json_v2.py"),
+            os.path.abspath(request_file), os.path.abspath(generated_dir),
+            "--cell-db", CELL_DATABASE]
+    if amari_log:
+        args += ["--log-file", os.path.abspath(amari_log)]
+    if slot is not None:
+        args += ["--sdr", slot.sdr, "--com-port", str(slot.com_port),
+                 "--ue-id-base", str(slot.ue_id_base)]
+    # Todos los slots comparten CELL_DATABASE; process_json_v2.py la bloquea
+    output = run_command("generate", args, log_file, capture=True)
+
+    config_dir = None
+    for line in output.splitlines():
+        if line.startswith("OUTPUT_DIR="):
+            config_dir = line[len("OUTPUT_DIR="):]
+    if not config_dir or not os.path.isdir(config_dir):
+        raise StageError("generate: generator did not report its output directory")
+
+    with open(os.path.join(config_dir, "schedule.json"), "r", encoding="utf-8") as f:
+        schedule = json.load(f)
+    return config_dir, schedule
+
+
+def run_radio(config_dir, paths, schedule, log_file,
+              margin=DEFAULT_MARGIN, lteue_bin=LTEUE_BIN, warm=None):
+    """
+    Runs lteue on a pty (pty_runner.py), which writes the trace and splits
+    it into traces.log, json.log and ue_stats.csv as it goes. lteue is
+    stopped once every ext_app has printed its report and the internal
+    events have ended; run_length + margin is only kept as a safety cap.
+    Returns the milestones of the run.
+
+    With warm (a warm_lteue.WarmLteue) the UEs are added to an already
+    running lteue instead; only the trace and ue0.log are written then,
+    and None is returned.
+    """
+    if warm is not None:
+        warm.run(config_dir, paths["expect_log"], paths["amari_log"], schedule, log_file,
+                 margin=margin)
+        return None
+    cfg_path = os.path.join(config_dir, "nr-erc.cfg")
+    log(log_file, f"[run] {lteue_bin} {cfg_path} (pty)")
+    try:
+        code, milestones = pty_runner.run_lteue(
+            cfg_path, paths["expect_log"], paths["trace_log"], paths["json_log"], paths["ue_stats"],
+            duration=int(schedule["run_length"] + 0.999), margin=margin, lteue_bin=lteue_bin,
+            n_apps=schedule.get("ext_app_count", -1),
+            min_end=schedule.get("internal_end_time", 0))
+    except OSError as e:
+        raise StageError(f"run: {e}")
+    log(log_file, f"[run] lteue exited with code {code}")
+    return milestones
+
+
+def split_trace(expect_log, trace_log, json_log, log_file):
+    run_command("split",
+                ["python3", os.path.join(SCRIPTS_DIR, "parserv2.py"),
+                 expect_log, trace_log, json_log],
+                log_file)
+
+
+def dedupe(json_log, log_file):
+    run_command("dedupe",
+                ["python3", os.path.join(SCRIPTS_DIR, "dedupe.py"), json_log],
+                log_file)
+
+
+def extract(exp_dir, request_file, amari_log, log_file):
+    run_command("extract",
+                ["python3", os.path.join(SCRIPTS_DIR, "data_extractor_v3.py"),
+                 exp_dir, request_file, amari_log],
+                log_file)
+
+
+def check_throughput(csv_file, request_file, log_file):
+    """Requested vs achieved verdict from an existing CSV (throughput_check.py)."""
+    run_command("throughput_check",
+                ["python3", script("throughput_check.py"), csv_file, request_file],
+                log_file)
+
+
+def rollup(csv_file, log_file):
+    """Per-flow packet/byte counts at 1 ms ... 10 s (validation_tests/rollups.py)."""
+    run_command("rollup",
+                ["python3", script(ROLLUPS_SCRIPT), "build", csv_file],
+                log_file)
+
+
+def crosscheck(csv_file, log_file):
+    """Log vs iperf3 interval throughput per port (validation_tests/iperf_crosscheck.py)."""
+    run_command("crosscheck",
+                ["python3", script(CROSSCHECK_SCRIPT), csv_file],
+                log_file)
+
+
+def index_log(amari_log, log_file):
+    """Builds the sidecar [IP]/mcs index of ue0.log (log_index.py)."""
+    try:
+        out = log_index.build_index(amari_log)
+    except (IOError, OSError, ValueError) as e:
+        raise StageError(f"index: {e}")
+    log(log_file, f"[index] {out}")
+
+
+def archive(exp_dir, dest_dir, log_file, workers=4):
+    """Compressed, hash-verified copy of the experiment directory (archiver.py)."""
+    log(log_file, f"[archive] {exp_dir} -> {dest_dir}")
+    try:
+        summary = archiver.archive_directory(exp_dir, dest_dir, workers=workers)
+    except (IOError, OSError) as e:
+        raise StageError(f"archive: {e}")
+    # El archivado se hace en hilos del pool: su E/S no cuenta en este hilo
+    timeline.add_io(summary["bytes_in"], summary["bytes_out"])
+    log(log_file, f"[archive] {summary['archived']} archived, {summary['skipped']} unchanged, "
+                  f"{summary['bytes_in']} -> {summary['bytes_out']} bytes")
+
+
+# -------------- Stages with manifest --------------
+def _run_stage(manifest, name, fn, log_file, force=(), **kwargs):
+    def timed():
+        with timeline.stage(manifest.exp_dir, name):
+            return fn()
+
+    result, ran = manifest.run(name, timed, force=name in force, **kwargs)
+    if not ran:
+        log(log_file, f"[{name}] up to date, skipped")
+        timeline.record_skipped(manifest.exp_dir, name)
+    return result
+
+
+def _generate_inputs(paths):
+    return [paths["request"], script("process_json_v2.py"), script("sim_scheduler.py")]
+
+
+def _run_inputs(config_dir):
+    return [os.path.join(config_dir, "nr-erc.cfg"), os.path.join(config_dir, "schedule.json")]
+
+
+def generate_stage(manifest, paths, generated_dir=GENERATED_DIR, slot=None, force=()):
+    """
+    Returns the generated config directory. lteue is configured to write
+    its log straight into the experiment directory (paths["amari_log"]).
+    The slot is kept in the stage result: a config generated for another
+    slot is regenerated.
+    """
+    def fn():
+        if slot is not None:
+            with open(paths["request"], "r", encoding="utf-8") as f:
+                n_ues = len(json.load(f).get("commands", []))
+            if n_ues > slot.ue_id_count:
+                raise StageError(f"generate: {n_ues} UEs do not fit in the "
+                                 f"{slot.ue_id_count} UE IDs of a slot")
+        config_dir, _ = generate(paths["request"], paths["log"], generated_dir,
+                                 amari_log=paths["amari_log"], slot=slot)
+        return {"config_dir": config_dir,
+                "slot": slot.as_dict() if slot is not None else None}
+
+    previous = manifest.result("generate") or {}
+    if slot is not None and previous.get("slot") != slot.as_dict():
+        force = set(force) | {"generate"}
+    result = _run_stage(
+        manifest, "generate", fn, paths["log"], force,
+        inputs=_generate_inputs(paths),
+        outputs=lambda r: _run_inputs(r["config_dir"]),
+        params={"generated_dir": generated_dir})
+    return result["config_dir"]
+
+
+def run_stage(manifest, paths, config_dir, margin=DEFAULT_MARGIN, lteue_bin=LTEUE_BIN, force=(),
+              warm=None):
+    """
+    lteue run; its trace and ue0.log are written into the experiment
+    directory. A warm run gives the same outputs, so it is not a parameter
+    of the stage. A cold run also splits the trace while it runs, so the
+    split stage is recorded as done with it.
+    """
+    def fn():
+        with open(os.path.join(config_dir, "schedule.json"), "r", encoding="utf-8") as f:
+            schedule = json.load(f)
+        # No mezclar con la traza, el ue0.log y su índice de una ejecución anterior
+        for stale in (paths["expect_log"], paths["amari_log"], paths["index"],
+                      paths["trace_log"], paths["json_log"], paths["ue_stats"]):
+            if os.path.exists(stale):
+                os.remove(stale)
+        milestones = run_radio(config_dir, paths, schedule, paths["log"],
+                               margin=margin, lteue_bin=lteue_bin, warm=warm)
+        if not os.path.isfile(paths["amari_log"]):
+            raise StageError(f"run: lteue did not write '{paths['amari_log']}'")
+        timeline.record_milestones(manifest.exp_dir, paths["expect_log"], milestones)
+        if milestones is not None:
+            manifest.run("split", lambda: None, inputs=_split_inputs(paths),
+                         outputs=[paths["trace_log"], paths["json_log"]], force=True)
+            log(paths["log"], "[split] done during the run")
+
+    _run_stage(manifest, "run", fn, paths["log"], force,
+               inputs=_run_inputs(config_dir),
+               outputs=[paths["expect_log"], paths["amari_log"]],
+               params={"margin": margin, "lteue_bin": lteue_bin})
+
+
+def _split_inputs(paths):
+    return [paths["expect_log"], script("parserv2.py")]
+
+
+def radio_fresh(manifest, paths, generated_dir=GENERATED_DIR, margin=DEFAULT_MARGIN,
+                lteue_bin=LTEUE_BIN):
+    """True if generate and run are up to date, whatever slot they ran on."""
+    if not manifest.is_fresh("generate", _generate_inputs(paths), {"generated_dir": generated_dir}):
+        return False
+    config_dir = manifest.result("generate")["config_dir"]
+    return manifest.is_fresh("run", _run_inputs(config_dir),
+                             {"margin": margin, "lteue_bin": lteue_bin})
+
+
+def archive_inputs(exp_dir):
+    """Files whose change requires a new archive (not the logs of the pipeline itself)."""
+    skip = (MANIFEST_NAME, timeline.TIMELINE_NAME, "lteue_execution.log")
+    return sorted(os.path.join(root, name)
+                  for root, _, names in os.walk(exp_dir)
+                  for name in names
+                  if name not in skip and not name.endswith(".part"))
+
+
+def postprocess(exp_dir, exp_id, log_file, archive_dir=ARCHIVE_DIR, manifest=None, force=()):
+    """
+    Split, dedupe, extract, rollup, crosscheck, index and (optionally)
+    archive a finished run, skipping the stages that are up to date in the
+    manifest. force is a collection of stage names to run regardless.
+    """
+    paths = experiment_paths(exp_dir, exp_id)
+    manifest = manifest or RunManifest(exp_dir)
+    _run_stage(manifest, "split",
+               lambda: split_trace(paths["expect_log"], paths["trace_log"], paths["json_log"], log_file),
+               log_file, force,
+               inputs=_split_inputs(paths),
+               outputs=[paths["trace_log"], paths["json_log"]])
+    _run_stage(manifest, "dedupe", lambda: dedupe(paths["json_log"], log_file),
+               log_file, force,
+               inputs=[paths["json_log"], script("dedupe.py")],
+               outputs=[paths["json_log"]])
+    _run_stage(manifest, "extract",
+               lambda: extract(exp_dir, paths["request"], paths["amari_log"], log_file),
+               log_file, force,
+               inputs=[paths["request"], paths["amari_log"],
+                       script("data_extractor_v3.py"), script("seekable_log.py"),
+                       script("throughput_check.py"), script("quantile_sketch.py")],
+               outputs=[paths["csv"], paths["throughput_check"], paths["sketches"]])
+    _csv_stages(manifest, paths, log_file, force)
+    _run_stage(manifest, "index", lambda: index_log(paths["amari_log"], log_file),
+               log_file, force,
+               inputs=[paths["amari_log"], script("log_index.py")],
+               outputs=[paths["index"]])
+    _archive_stage(manifest, exp_dir, exp_id, log_file, archive_dir, force)
+
+
+def _csv_stages(manifest, paths, log_file, force):
+    """rollup and crosscheck of an experiment's CSV."""
+    _run_stage(manifest, "rollup", lambda: rollup(paths["csv"], log_file),
+               log_file, force,
+               inputs=[paths["csv"], script(ROLLUPS_SCRIPT),
+                       script(THROUGHPUT_BINS_SCRIPT)],
+               outputs=[paths["rollups"]])
+    _run_stage(manifest, "crosscheck", lambda: crosscheck(paths["csv"], log_file),
+               log_file, force,
+               inputs=[paths["csv"], paths["json_log"], script(CROSSCHECK_SCRIPT),
+                       script(THROUGHPUT_BINS_SCRIPT)],
+               outputs=[paths["crosscheck"]])
+
+
+def _archive_stage(manifest, exp_dir, exp_id, log_file, archive_dir, force):
+    if archive_dir:
+        dest_dir = os.path.join(archive_dir, exp_id)
+        _run_stage(manifest, "archive", lambda: archive(exp_dir, dest_dir, log_file),
+                   log_file, force,
+                   inputs=archive_inputs(exp_dir), params={"dest_dir": dest_dir})
+
+
+def postprocess_batch(batch_dir, archive_dir=ARCHIVE_DIR, force=()):
+    """
+    Splits a post-processed batched run back into its members' directories
+    (batch_scheduler.split_results), then checks the throughput, rolls up,
+    cross-checks and archives each member's share. The split is recorded
+    as the "split" stage of every member's manifest; the batch is split
+    again when any member is stale. Returns the ids of the members.
+    """
+    info = batch_scheduler.load_batch(batch_dir)
+    batch_paths = experiment_paths(batch_dir, info["id"])
+    members = [(m["exp_dir"], m["id"], experiment_paths(m["exp_dir"], m["id"]), RunManifest(m["exp_dir"]))
+               for m in info["members"]]
+
+    def split_inputs(paths):
+        return [batch_paths["csv"], batch_paths["json_log"], batch_paths["sketches"],
+                paths["request"], script("batch_scheduler.py"), script("throughput_check.py")]
+
+    force = set(force)
+    counts = None
+    if "split" in force or not all(manifest.is_fresh("split", split_inputs(paths))
+                                   for _, _, paths, manifest in members):
+        counts = batch_scheduler.split_results(batch_dir, info)
+        # Todos los miembros se han reescrito: su split se registra de nuevo
+        force.add("split")
+
+    for i, (exp_dir, exp_id, paths, manifest) in enumerate(members):
+        log_file = paths["log"]
+
+        def split():
+            log(log_file, f"[batch] {counts[i]} row(s) split from {batch_dir}")
+            check_throughput(paths["csv"], paths["request"], log_file)
+
+        _run_stage(manifest, "split", split, log_file, force,
+                   inputs=split_inputs(paths),
+                   outputs=lambda _: [p for p in (paths["csv"], paths["json_log"], paths["sketches"],
+                                                  paths["throughput_check"])
+                                      if os.path.exists(p)])
+        _csv_stages(manifest, paths, log_file, force)
+        _archive_stage(manifest, exp_dir, exp_id, log_file, archive_dir, force)
+    return [exp_id for _, exp_id, _, _ in members]
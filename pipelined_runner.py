@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Pipelined experiment runner: the radio stages of run N+1 (generate, lteue)
+overlap with the post-processing of run N (split, dedupe, extract, archive).
+
+There is one radio worker per slot of the ResourceAllocator (one per SDR
+card): each experiment gets its own SDR device, com port, UE ID block and
+writes its ue0.log straight into its experiment directory, so up to
+len(devices) experiments run on the radio at once. As soon as lteue exits
+the slot is released and post-processing runs in a bounded pool of
+background workers. When max_pending finished runs are already waiting for
+post-processing the radio workers block, so a slow archive cannot fill the
+disk with unprocessed logs.
+
+With --batch, queued requests that share the radio configuration are
+merged into one multi-UE lteue run (batch_scheduler.py); the results are
+split back into each request's directory after post-processing. With
+--warm, lteue stays up between experiments and is only restarted when the
+radio config changes (warm_lteue.py).
+
+Usage: pipelined_runner.py [options] <request.json> [<request.json> ...]
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import batch_scheduler
+import pipeline_stages as stages
+from run_manifest import RunManifest
+from resource_allocator import ResourceAllocator, parse_devices
+from warm_lteue import WarmLteue
+from request_validator import validate_request, load_cell_database
+
+# Estados de un experimento
+QUEUED = "queued"
+RUNNING = "running"
+POSTPROCESSING = "postprocessing"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING, POSTPROCESSING)
+
+
+class PipelinedRunner:
+    def __init__(self, generated_dir=stages.GENERATED_DIR,
+                 lteue_bin=stages.LTEUE_BIN,
+                 archive_dir=stages.ARCHIVE_DIR,
+                 margin=stages.DEFAULT_MARGIN,
+                 post_workers=2,
+                 max_pending=4,
+                 on_update=None,
+                 allocator=None,
+                 batching=False,
+                 warm=False):
+        """
+        on_update(exp_id, **fields) is called on every status change with
+        some of: status, stage, error, device. With batching, a radio
+        worker merges the queued requests compatible with the one it takes
+        into a single lteue run (batch_scheduler.py). With warm, each slot
+        keeps its lteue running between experiments (warm_lteue.py).
+        """
+        self.generated_dir = generated_dir
+        self.lteue_bin = lteue_bin
+        self.archive_dir = archive_dir
+        self.allocator = allocator or ResourceAllocator()
+        self.batching = batching
+        self.max_batch_ues = min(slot.ue_id_count for slot in self.allocator.slots)
+        self.warm = {slot.index: WarmLteue(os.path.join(generated_dir, "_warm", f"slot{slot.index}"),
+                                           lteue_bin)
+                     for slot in self.allocator.slots} if warm else {}
+        self.margin = margin
+        self.on_update = on_update or (lambda exp_id, **fields: None)
+
+        # Cola FIFO de (exp_dir, exp_id); el lote sale de en medio sin reordenar el resto
+        self.queue = deque()
+        self.queued = threading.Condition()
+        self.active = 0
+        self.idle = threading.Condition()
+        self.pending = threading.BoundedSemaphore(max(max_pending, 1))
+        self.post_pool = ThreadPoolExecutor(max_workers=post_workers,
+                                            thread_name_prefix="postprocess")
+        self.radio_threads = [threading.Thread(target=self._radio_worker,
+                                               name=f"radio-{i}", daemon=True)
+                              for i in range(len(self.allocator))]
+        for thread in self.radio_threads:
+            thread.start()
+
+    def submit(self, exp_dir, exp_id):
+        """Queues an experiment whose request.json is already in exp_dir."""
+        with self.idle:
+            self.active += 1
+        self.on_update(exp_id, status=QUEUED)
+        with self.queued:
+            self.queue.append((exp_dir, exp_id))
+            self.queued.notify()
+
+    def join(self):
+        """Waits until every submitted experiment has been fully processed."""
+        with self.idle:
+            self.idle.wait_for(lambda: self.active == 0)
+
+    def shutdown(self):
+        self.post_pool.shutdown(wait=True)
+        for instance in self.warm.values():
+            instance.stop()
+
+    # -------------- Workers --------------
+    def _finish(self):
+        with self.idle:
+            self.active -= 1
+            self.idle.notify_all()
+
+    def _fail(self, exp_dir, exp_id, error):
+        if not isinstance(error, stages.StageError):
+            traceback.print_exc()
+        stages.log(stages.experiment_paths(exp_dir, exp_id)["log"], f"Error: {error}")
+        self.on_update(exp_id, status=FAILED, error=str(error))
+
+    def _notify(self, jobs, **fields):
+        for _, exp_id in jobs:
+            self.on_update(exp_id, **fields)
+
+    def _load_request(self, exp_dir):
+        with open(os.path.join(exp_dir, "request.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _next_jobs(self):
+        """
+        Blocks until a job is queued and takes the oldest one. With batching,
+        the queued jobs that can share its lteue run
+        (batch_scheduler.compatible) are taken too; the others keep their
+        place in the queue.
+        """
+        with self.queued:
+            self.queued.wait_for(lambda: self.queue)
+            first = self.queue.popleft()
+            if not self.batching:
+                return [first]
+            try:
+                batch = [self._load_request(first[0])]
+            except (OSError, ValueError):
+                return [first]
+            taken, rest = [first], []
+            for job in self.queue:
+                try:
+                    data = self._load_request(job[0])
+                    ok = batch_scheduler.compatible(batch, data, self.max_batch_ues)
+                except (OSError, ValueError):
+                    ok = False
+                if ok:
+                    batch.append(data)
+                    taken.append(job)
+                else:
+                    rest.append(job)
+            self.queue.clear()
+            self.queue.extend(rest)
+        return taken
+
+    def _prepare_run(self, jobs):
+        """
+        Returns (run_dir, run_id, jobs). Several jobs are merged into one
+        request in <output_dir>/_batches/<batch id>.
+        """
+        if len(jobs) == 1:
+            return jobs[0][0], jobs[0][1], jobs
+        batch_id = f"batch-{jobs[0][1]}+{len(jobs) - 1}"
+        batch_dir = os.path.join(os.path.dirname(os.path.abspath(jobs[0][0])), "_batches", batch_id)
+        members = [(exp_dir, exp_id, self._load_request(exp_dir)) for exp_dir, exp_id in jobs]
+        stages.save_request(batch_dir, batch_scheduler.merge_requests(batch_id, [m[2] for m in members]))
+        batch_scheduler.save_batch(batch_dir, batch_id, members)
+        for exp_dir, exp_id in jobs:
+            stages.log(stages.experiment_paths(exp_dir, exp_id)["log"],
+                       f"[batch] running in {batch_id} with {len(jobs) - 1} other request(s): {batch_dir}")
+        return batch_dir, batch_id, jobs
+
+    def _radio_worker(self):
+        while True:
+            jobs = self._next_jobs()
+            # Espera a que haya hueco en la cola de post-procesado
+            self.pending.acquire()
+            try:
+                run = self._prepare_run(jobs)
+                with self.allocator.allocate() as slot:
+                    self._run_radio_stages(run, slot)
+            except Exception as e:
+                self.pending.release()
+                for exp_dir, exp_id in jobs:
+                    self._fail(exp_dir, exp_id, e)
+                    self._finish()
+            else:
+                self.post_pool.submit(self._run_post_stages, run)
+
+    def _run_radio_stages(self, run, slot):
+        run_dir, run_id, jobs = run
+        paths = stages.experiment_paths(run_dir, run_id)
+        manifest = RunManifest(run_dir)
+        # Un experimento enviado siempre se ejecuta en la radio; el
+        # post-procesado sólo rehace lo que haya cambiado
+        self._notify(jobs, status=RUNNING, stage="generate", device=slot.sdr)
+        config_dir = stages.generate_stage(manifest, paths, self.generated_dir, slot=slot,
+                                           force=stages.RADIO_STAGES)
+
+        self._notify(jobs, stage="run")
+        stages.run_stage(manifest, paths, config_dir, margin=self.margin,
+                         lteue_bin=self.lteue_bin, force=stages.RADIO_STAGES,
+                         warm=self.warm.get(slot.index))
+
+    def _run_post_stages(self, run):
+        run_dir, run_id, jobs = run
+        log_file = stages.experiment_paths(run_dir, run_id)["log"]
+        self._notify(jobs, status=POSTPROCESSING, stage="postprocess")
+        try:
+            stages.postprocess(run_dir, run_id, log_file, self.archive_dir)
+            if len(jobs) > 1:
+                stages.postprocess_batch(run_dir, self.archive_dir)
+        except Exception as e:
+            for exp_dir, exp_id in jobs:
+                self._fail(exp_dir, exp_id, e)
+        else:
+            for exp_dir, exp_id in jobs:
+                stages.log(stages.experiment_paths(exp_dir, exp_id)["log"],
+                           "Script finalizado correctamente.")
+                self.on_update(exp_id, status=DONE, stage=None)
+        finally:
+            self.pending.release()
+            for _ in jobs:
+                self._finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run experiments with radio/post-processing overlap")
+    parser.add_argument("requests", nargs="+", help="request JSON files (same format as listener.sh)")
+    parser.add_argument("--output-dir", default=stages.BASE_OUTPUT_DIR)
+    parser.add_argument("--generated-dir", default=stages.GENERATED_DIR)
+    parser.add_argument("--lteue", default=stages.LTEUE_BIN)
+    parser.add_argument("--devices", default="",
+                        help="comma-separated SDR devices, one experiment each (default: /dev/sdr*)")
+    parser.add_argument("--archive-dir", default=stages.ARCHIVE_DIR,
+                        help="archive root; empty string disables archiving")
+    parser.add_argument("--margin", type=int, default=stages.DEFAULT_MARGIN)
+    parser.add_argument("--post-workers", type=int, default=2)
+    parser.add_argument("--batch", action="store_true",
+                        help="merge queued requests with the same radio config into one lteue run")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep lteue running between experiments with the same radio config")
+    parser.add_argument("--max-pending", type=int, default=4,
+                        help="finished runs allowed to wait for post-processing")
+    args = parser.parse_args()
+
+    cell_database = load_cell_database(os.path.join(stages.SCRIPTS_DIR, "cell_database.json"))
+    status = {}
+    lock = threading.Lock()
+
+    def on_update(exp_id, **fields):
+        with lock:
+            status.setdefault(exp_id, {}).update(fields)
+        if "status" in fields:
+            print(f"[{exp_id}] {fields['status']}" +
+                  (f": {fields['error']}" if fields.get("error") else ""), flush=True)
+
+    runner = PipelinedRunner(generated_dir=args.generated_dir, lteue_bin=args.lteue,
+                             archive_dir=args.archive_dir,
+                             margin=args.margin, post_workers=args.post_workers,
+                             max_pending=args.max_pending, on_update=on_update,
+                             allocator=ResourceAllocator(parse_devices(args.devices)),
+                             batching=args.batch, warm=args.warm)
+
+    for request_file in args.requests:
+        try:
+            with open(request_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading JSON file '{request_file}': {e}")
+            status[request_file] = {"status": FAILED}
+            continue
+        errors = validate_request(data, cell_database)
+        if errors:
+            print(f"Invalid request '{request_file}':")
+            for err in errors:
+                print(f"  - {err}")
+            status[request_file] = {"status": FAILED}
+            continue
+        exp_id = data.get("id", "id_value_missing")
+        exp_dir = os.path.join(args.output_dir, exp_id)
+        stages.save_request(exp_dir, data)
+        runner.submit(exp_dir, exp_id)
+
+    runner.join()
+    runner.shutdown()
+
+    failed = [exp_id for exp_id, st in status.items() if st.get("status") != DONE]
+    print(f"{len(status) - len(failed)} experiment(s) done, {len(failed)} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,44 @@
 import sys
 import json
 import os
+import argparse
 from datetime import datetime
 import random, math
+import fcntl
+
+from sim_scheduler import schedule_from_request
+from request_validator import parse_iperf_command, validate_request
 
 # -------------- Cell Database Setup --------------
 cell_database_path = "cell_database.json"
 
-# Ensure a JSON file is passed as an argument
-if len(sys.argv) < 2:
-    print("Usage: python process_json.py <json_file>")
-    sys.exit(1)
+# -------------- Arguments --------------
+# The defaults reproduce the single-SDR setup used by listener.sh; the
+# experiment runner passes the resources of the slot it allocated
+# (resource_allocator.py) so several experiments can run at once.
+parser = argparse.ArgumentParser(description="Generate lteue configuration from a request")
+parser.add_argument("json_file")
+parser.add_argument("generated_base_dir", nargs="?",
+                    default="/root/lteue-linux-2024-06-14/config/erc/generated/")
+parser.add_argument("--sdr", default="/dev/sdr0", help="SDR device (rf_driver dev0)")
+parser.add_argument("--com-port", type=int, default=9002, help="remote API / CLI port")
+parser.add_argument("--log-file", default="/root/Desktop/OUTPUT/ue0.log",
+                    help="log_filename written by lteue")
+parser.add_argument("--ue-id-base", type=int, default=0,
+                    help="UE IDs (and IMSIs, netns) start at ue_id_base + 1")
+parser.add_argument("--cell-db", default=cell_database_path,
+                    help="cell database shared by all slots (read and updated under a lock)")
+args = parser.parse_args()
 
 # Get the JSON file from the arguments
-json_file = sys.argv[1]
+json_file = args.json_file
 
 # Load or create cell database
+# Varios slots generan a la vez: la base de datos se lee y se reescribe
+# bajo un flock para no perder celdas ni leer un fichero a medio escribir
+cell_database_path = args.cell_db
+cell_db_lock = open(cell_database_path + ".lock", "a")
+fcntl.flock(cell_db_lock, fcntl.LOCK_EX)
 if os.path.exists(cell_database_path):
     with open(cell_database_path, "r") as db_file:
         cell_database = json.load(db_file)
@@ -32,9 +55,17 @@ except Exception as e:
     print(f"Error loading JSON file: {e}")
     sys.exit(1)
 
+# -------------- Validate Request --------------
+validation_errors = validate_request(data, cell_database)
+if validation_errors:
+    print(f"Invalid request ({len(validation_errors)} error(s)):")
+    for err in validation_errors:
+        print(f"  - {err}")
+    sys.exit(1)
+
 
 # -------------- Create Timestamped Output Directory --------------
-base_output_dir = "/root/lteue-linux-2024-06-14/config/erc/generated/"
+base_output_dir = args.generated_base_dir
 timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M")
 id_name= data.get("id", "missing")
 output_dir = os.path.join(base_output_dir, id_name)
@@ -98,8 +129,11 @@ if flag_db == 1:
         else:
             print(f"'{cell_name}' already has data for bandwidth {bandwidth}.")
 
-with open(cell_database_path, "w") as db_file:
+with open(cell_database_path + ".part", "w") as db_file:
     json.dump(cell_database, db_file, indent=4)
+os.replace(cell_database_path + ".part", cell_database_path)
+fcntl.flock(cell_db_lock, fcntl.LOCK_UN)
+cell_db_lock.close()
 
 if flag_cell_name == 1 and flag_cell_data == 0:
     print(f"Retrieving configuration for cell '{cell_name}' and bandwidth '{bandwidth}' from database")
@@ -139,14 +173,14 @@ cfg_content = f"""{{
 #define CHANNEL_SIM {chan}
 
   log_options: "all.level=debug,all.max_size=1,ip.max_size=50,ip.payload=true",
-  log_filename: "/root/Desktop/OUTPUT/ue0.log",
-  com_addr: "[::]:9002",
+  log_filename: "{args.log_file}",
+  com_addr: "[::]:{args.com_port}",
   cli_enabled: true,
-  cli_addr: "[::]:9002",
+  cli_addr: "[::]:{args.com_port}",
 
   rf_driver: {{
     name: "sdr",
-    args: "dev0=/dev/sdr0",
+    args: "dev0={args.sdr}",
   }},
   tx_gain: {tx_gain},
   rx_gain: {rx_gain},
@@ -193,10 +227,20 @@ except Exception as e:
     print(f"Error writing file '{output_file_1}': {e}")
     sys.exit(1)
 
+# -------------- Schedule power_on / traffic times --------------
+try:
+    schedule, run_length = schedule_from_request(data)
+except (KeyError, ValueError) as e:
+    print(f"Error: invalid schedule - {e}")
+    sys.exit(1)
+
 # -------------- Generate users-scenario.cfg --------------
 ue_list = []
+ext_app_count = 0        # apps whose exit is visible in the trace: iperf3 -J clients
+untracked_apps = 0       # iperf3 sin -J (o servidores): no imprimen informe al acabar
+internal_end_time = 0    # last end_time of events lteue runs internally (ping)
 for idx, command_entry in enumerate(commands, start=1):
-    ue_id = idx
+    ue_id = args.ue_id_base + idx
     imsi = 214050000002000 + ue_id
     ue_entry = {
         "ue_id": ue_id,
@@ -252,38 +296,42 @@ for idx, command_entry in enumerate(commands, start=1):
     
     # Generate sim_events based on the command
     command = command_entry["command"]
-    duration = command_entry["duration"]
+    slot = schedule[idx - 1]
     command_list = command.split()
     if command_list[0] == "ping":
         sim_events = [
-            {"start_time": 5, "event": "power_on"},
+            {"start_time": slot["power_on"], "event": "power_on"},
             {
-                "start_time": 10,
-                "end_time": duration + 10,
+                "start_time": slot["start_time"],
+                "end_time": slot["end_time"],
                 "dst_addr": command_list[1],
                 "payload_len": 1000,
                 "delay": 1,
                 "event": command_list[0]
             }
         ]
+        internal_end_time = max(internal_end_time, slot["end_time"])
     elif command_list[0] == "iperf3":
         # Enclose each argument (except the command) in quotes
         iperf_args = [f'"{arg}"' for arg in command_list[1:]]
         args_str = ", ".join(iperf_args)
         sim_events = [
-            {"start_time": 5
-             #+(idx*2)
-             , "event": "power_on"},
+            {"start_time": slot["power_on"], "event": "power_on"},
             {
                 "event": "ext_app",
-                "start_time": 10+(idx*2),
-                "end_time": duration + 10,
+                "start_time": slot["start_time"],
+                "end_time": slot["end_time"],
                 "prog": "ext_app.sh",
                 "args": json.loads(f'["iperf3", {args_str}]'),
                 "dump_stdout": True,
                 "dump_stderr": True
             }
         ]
+        opts = parse_iperf_command(command)
+        if opts["client"] is not None and opts["json"]:
+            ext_app_count += 1
+        else:
+            untracked_apps += 1
     ue_entry["sim_events"] = sim_events
     ue_list.append(ue_entry)
 
@@ -299,6 +347,32 @@ except Exception as e:
     print(f"Error writing file '{output_file_2}': {e}")
     sys.exit(1)
 
+# Si alguna app no imprime informe, el fin sólo lo marca el tope (--n-apps -1)
+if untracked_apps:
+    ext_app_count = -1
+
+# -------------- Save schedule and run length --------------
+output_file_schedule = os.path.join(output_dir, "schedule.json")
+try:
+    with open(output_file_schedule, 'w') as schedule_file:
+        json.dump({
+            "run_length": run_length,
+            "ext_app_count": ext_app_count,
+            "internal_end_time": internal_end_time,
+            "ues": schedule,
+            "resources": {
+                "sdr": args.sdr,
+                "com_port": args.com_port,
+                "log_filename": args.log_file,
+                "ue_ids": [ue["ue_id"] for ue in ue_list]
+            }
+        }, schedule_file, indent=2)
+    print(f"File '{output_file_schedule}' generated successfully.")
+except Exception as e:
+    print(f"Error writing file '{output_file_schedule}': {e}")
+    sys.exit(1)
+print(f"RUN_LENGTH={run_length}")
+
 # -------------- Generate ext_app.sh --------------
 ext_app_content = """#!/bin/bash
 
@@ -427,3 +501,6 @@ try:
 except Exception as e:
     print(f"Error writing file '{output_file_4}': {e}")
     sys.exit(1)
+
+# Machine-readable summary for listener.sh / pipeline_stages.py
+print(f"OUTPUT_DIR={output_dir}")
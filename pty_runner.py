@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Runs lteue on a pseudo-terminal with asyncio (replaces the expect script
+and its `script` wrapper).
+
+lteue's output is fanned out as it is produced to:
+  - the trace writer: expect_trace.log, the raw pty output as before
+  - the JSON splitter (parserv2.JsonSplitter): traces.log and json.log
+  - the stats-table parser (ue_stats.py): ue_stats.csv
+  - the milestone collector (timeline.milestone_from_line)
+so nothing has to be read back from disk once the run is over.
+
+Completion detection is the one of the expect script: 't' is sent when
+"(ue) Cell N: SIB found" appears; every iperf3 -J report ends with a
+closing brace at column 0, and once n_apps reports have been seen lteue
+is stopped when the internal events have ended (min_end s after the SIB)
+plus a grace period. duration + margin after the SIB is a safety cap.
+The "[Expect] milestone <name> <epoch ms>" lines are kept for timeline.py.
+
+Usage: pty_runner.py <nr-erc.cfg> <exp_dir> <duration> <margin>
+                     [--lteue BIN] [--n-apps N] [--min-end S]
+"""
+import io
+import os
+import re
+import pty
+import sys
+import time
+import codecs
+import signal
+import asyncio
+import argparse
+import subprocess
+
+import timeline
+from parserv2 import JsonSplitter
+from ue_stats import StatsTableParser, StatsCsvWriter
+
+sib_pattern = re.compile(r"\(ue\) Cell [0-9]+: SIB found")
+
+LTEUE_BIN = "/root/lteue-linux-2024-06-14/lteue"
+GRACE = 2               # s tras el último informe para que lteue vuelque ue0.log
+START_TIMEOUT = 120     # s hasta "SIB found"
+STOP_TIMEOUT = 10       # s entre SIGTERM y SIGKILL
+
+
+class LteueRun:
+    def __init__(self, lteue_bin, cfg_path, expect_log, line_sinks=(),
+                 duration=0, margin=40, n_apps=-1, min_end=0, grace=GRACE):
+        self.args = [lteue_bin, cfg_path]
+        self.expect_log = expect_log
+        self.line_sinks = list(line_sinks)
+        self.duration = duration
+        self.margin = margin
+        self.n_apps = n_apps
+        self.min_end = min_end
+        self.grace = grace
+
+        self.proc = None
+        self.milestones = []
+        self.reports = 0
+        self.t_sib = None
+        self.terminated = False
+        # Igual que al leer el fichero en modo texto (parserv2.py): utf-8
+        # ignorando errores y \r\n -> \n
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="ignore"), translate=True)
+        self.pending = ""
+        self.queued = []
+        self.feeding = False
+
+    # -------------- Output --------------
+    def _feed(self, data, final=False):
+        # Lo que se emite mientras se procesa un bloque va detrás de él, en
+        # la traza y en los parsers
+        self.queued.append(data)
+        if self.feeding:
+            return
+        self.feeding = True
+        try:
+            while self.queued:
+                data = self.queued.pop(0)
+                self.trace.write(data)
+                lines = (self.pending + self.decoder.decode(data)).split("\n")
+                self.pending = lines.pop()
+                for line in lines:
+                    self._line(line + "\n")
+                if self.t_sib is None and sib_pattern.search(self.pending):
+                    # expect no esperaba al salto de línea
+                    self._on_sib()
+            if final:
+                # Última línea sin salto de línea
+                last = self.pending + self.decoder.decode(b"", final=True)
+                self.pending = ""
+                if last:
+                    self._line(last)
+        finally:
+            self.feeding = False
+
+    def _line(self, line):
+        for sink in self.line_sinks:
+            sink(line)
+        m = timeline.milestone_from_line(line)
+        if m:
+            self.milestones.append(m)
+        if self.t_sib is None:
+            if sib_pattern.search(line):
+                self._on_sib()
+        elif line == "}\n":
+            self.reports += 1
+            if self.n_apps > 0 and self.reports == self.n_apps:
+                self._schedule_finish()
+
+    def _emit(self, text):
+        """Messages of the runner go through the same path as lteue's output."""
+        self._feed(text.encode())
+
+    def _milestone(self, name):
+        self._emit(f"[Expect] milestone {name} {int(time.time() * 1000)}\n")
+
+    def _on_output(self):
+        try:
+            data = os.read(self.master, 65536)
+        except OSError:
+            data = b""
+        if data:
+            self._feed(data)
+        elif not self.done.done():
+            self.done.set_result(None)
+
+    # -------------- Run control --------------
+    def _on_sib(self):
+        if self.done.done():
+            return
+        self.t_sib = time.monotonic()
+        self._milestone("sib_found")
+        try:
+            os.write(self.master, b"t\r")
+        except OSError:
+            pass
+        self.cap.cancel()
+        self.cap = self.loop.call_later(self.duration + self.margin, self._terminate, "Timeout reached")
+        # Sin ext_apps sólo tienen que acabar los eventos internos
+        if self.n_apps == 0:
+            self._schedule_finish()
+
+    def _schedule_finish(self):
+        self._milestone("traffic_done")
+        elapsed = time.monotonic() - self.t_sib
+        wait = max(self.min_end - elapsed, 0) + self.grace
+        self.loop.call_later(wait, self._terminate, "All UE traffic finished")
+
+    def _signal(self, sig):
+        try:
+            os.killpg(self.proc.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _terminate(self, reason):
+        if self.terminated:
+            return
+        self.terminated = True
+        self._milestone("terminate")
+        self._emit(f"[Expect] {reason}; terminating lteue\n")
+        self._signal(signal.SIGTERM)
+        self.loop.call_later(STOP_TIMEOUT, self._signal, signal.SIGKILL)
+
+    def _check_exit(self):
+        """EOF may never come if a child of lteue keeps the pty open."""
+        exited = os.waitid(os.P_PID, self.proc.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+        if exited is not None and not self.done.done():
+            self.loop.call_later(1, lambda: self.done.done() or self.done.set_result(None))
+        else:
+            self.loop.call_later(0.5, self._check_exit)
+
+    async def run(self):
+        """Runs lteue until it exits or is stopped. Returns its exit code."""
+        self.loop = asyncio.get_running_loop()
+        self.done = self.loop.create_future()
+        master, slave = pty.openpty()
+        # expect escribía con log_file -a
+        with open(self.expect_log, "ab") as self.trace:
+            self._milestone("spawn")
+            try:
+                self.proc = subprocess.Popen(self.args, stdin=slave, stdout=slave, stderr=slave,
+                                             start_new_session=True)
+            except OSError:
+                os.close(master)
+                raise
+            finally:
+                os.close(slave)
+            self.master = master
+            self.cap = self.loop.call_later(START_TIMEOUT, self._terminate, "No cell found")
+            self.loop.add_reader(master, self._on_output)
+            self.loop.call_later(0.5, self._check_exit)
+            try:
+                await self.done
+            finally:
+                self.loop.remove_reader(master)
+                os.close(master)
+                self.cap.cancel()
+                self._feed(b"", final=True)
+        if not self.terminated:
+            self._signal(signal.SIGKILL)
+        return timeline.wait_child(self.proc)
+
+
+def run_lteue(cfg_path, expect_log, trace_log, json_log, stats_csv, duration, margin,
+              lteue_bin=LTEUE_BIN, n_apps=-1, min_end=0, grace=GRACE):
+    """
+    Runs lteue for one experiment, writing expect_trace.log, traces.log,
+    json.log and ue_stats.csv while it runs. Returns (exit code, milestones).
+    Raises OSError if lteue cannot be started.
+    """
+    splitter = JsonSplitter(trace_log, json_log)
+    stats = StatsCsvWriter(stats_csv)
+    try:
+        run = LteueRun(lteue_bin, cfg_path, expect_log,
+                       line_sinks=[splitter.feed, StatsTableParser(stats).feed],
+                       duration=duration, margin=margin, n_apps=n_apps,
+                       min_end=min_end, grace=grace)
+        code = asyncio.run(run.run())
+    finally:
+        splitter.close()
+        stats.close()
+    return code, run.milestones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run lteue on a pty and split its output live")
+    parser.add_argument("cfg_path")
+    parser.add_argument("exp_dir", help="gets expect_trace.log, traces.log, json.log, ue_stats.csv")
+    parser.add_argument("duration", type=float)
+    parser.add_argument("margin", type=float)
+    parser.add_argument("--lteue", default=LTEUE_BIN)
+    parser.add_argument("--n-apps", type=int, default=-1,
+                        help="iperf3 -J reports to wait for (-1: only the safety cap)")
+    parser.add_argument("--min-end", type=float, default=0,
+                        help="last end_time (s) of events lteue runs internally (ping)")
+    args = parser.parse_args()
+
+    os.makedirs(args.exp_dir, exist_ok=True)
+    try:
+        code, milestones = run_lteue(args.cfg_path,
+                                     os.path.join(args.exp_dir, "expect_trace.log"),
+                                     os.path.join(args.exp_dir, "traces.log"),
+                                     os.path.join(args.exp_dir, "json.log"),
+                                     os.path.join(args.exp_dir, "ue_stats.csv"),
+                                     args.duration, args.margin, args.lteue,
+                                     args.n_apps, args.min_end)
+    except OSError as e:
+        print(f"Error: cannot start {args.lteue}: {e}")
+        sys.exit(1)
+    timeline.record_milestones(args.exp_dir, milestones=milestones)
+    print(f"lteue exited with code {code}; {len(milestones)} milestone(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Mergeable quantile sketches of latency and per-second throughput per
+flow, filled by data_extractor_v3.py while it parses ue0.log and stored
+next to the experiment as <id>.sketches.json.
+
+QuantileSketch is a log-bucketed histogram (HDR / DDSketch style): a
+value v > 0 goes to bucket ceil(log(v) / log(gamma)), with
+gamma = (1 + a) / (1 - a), so every quantile is returned within a
+relative error a (1% by default). Two sketches with the same accuracy
+merge by adding their bucket counts, which is how the catalog combines
+flows, UEs and experiments without the raw packets. Memory is bounded:
+the range of values fixes the number of buckets (about 1000 from 1 us to
+1000 s at 1%), and past MAX_BUCKETS the lowest buckets are folded
+together.
+
+Per flow (source IP:port -> destination IP:port):
+  latency_ms       time of the [IP] line minus the send time in the iperf
+                   header; only the microseconds of the header are
+                   extracted, so the difference is taken modulo 1 s
+                   (valid while latency < 1 s); log stamps are truncated to
+                   ms, so a packet logged in its send millisecond counts as 0
+  throughput_MBps  bytes (IP_Total_Length, 1470 if missing) of every full
+                   second between the first and the last packet, empty
+                   seconds counting as 0
+
+Usage:
+  quantile_sketch.py show <file.sketches.json> [dst_port]
+  quantile_sketch.py merge <file.sketches.json> [...]     (all flows of all files)
+"""
+import sys
+import json
+import math
+import os
+
+from throughput_check import PACKET_SIZE, clock_ms
+
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048          # límite de buckets por sketch
+MIN_VALUE = 1e-9            # valores por debajo cuentan como cero
+QUANTILES = (0.05, 0.5, 0.95, 0.99)
+METRICS = ("latency_ms", "throughput_MBps")
+SKETCH_VERSION = 1
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_buckets=MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, count=1):
+        if count <= 0:
+            return
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= MIN_VALUE:
+            self.zero_count += count
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        # Juntar los buckets más bajos en el primero que se conserva
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        keep = keys[len(excess)]
+        self.buckets[keep] += sum(self.buckets.pop(k) for k in excess)
+
+    def merge(self, other):
+        """Adds other's counts into this sketch (same relative accuracy required)."""
+        if not math.isclose(other.relative_accuracy, self.relative_accuracy):
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), or None if the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return min(max(0.0, self.min), self.max)
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs=QUANTILES):
+        return {q: self.quantile(q) for q in qs}
+
+    def to_dict(self):
+        return {"relative_accuracy": self.relative_accuracy, "count": self.count,
+                "sum": self.sum, "min": self.min if self.count else None,
+                "max": self.max if self.count else None, "zero_count": self.zero_count,
+                "buckets": {str(k): n for k, n in sorted(self.buckets.items())}}
+
+    @classmethod
+    def from_dict(cls, data, max_buckets=MAX_BUCKETS):
+        sketch = cls(data["relative_accuracy"], max_buckets)
+        sketch.buckets = {int(k): n for k, n in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class FlowSketches:
+    """Per-flow latency and per-second throughput sketches, fed packet by packet."""
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.flows = {}
+
+    def _flow(self, key):
+        flow = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = {
+                "latency_ms": QuantileSketch(self.relative_accuracy),
+                "throughput_MBps": QuantileSketch(self.relative_accuracy),
+                "second": None, "first_second": None, "bytes": 0}
+        return flow
+
+    def add(self, timestamp_log, src_ip, src_port, dst_ip, dst_port,
+            ip_total_length=None, timestamp_iperf=None):
+        flow = self._flow((src_ip, int(src_port), dst_ip, int(dst_port)))
+        t_ms = clock_ms(timestamp_log)
+
+        if timestamp_iperf not in (None, ""):
+            # Latencia módulo 1 s: ms del log frente a los us de la cabecera iperf
+            delay_us = ((t_ms % 1000) * 1000 - int(timestamp_iperf)) % 1000000
+            if delay_us > 1000000 - 1000:
+                # Mismo ms que el envío: el log trunca a ms, no es casi 1 s
+                delay_us = 0
+            flow["latency_ms"].add(delay_us / 1000)
+
+        second = t_ms // 1000
+        if flow["second"] is not None and second < flow["second"] - 43200:
+            # El reloj del log pasó por medianoche
+            second += 86400
+        if flow["second"] is None:
+            flow["second"] = flow["first_second"] = second
+        elif second > flow["second"]:
+            self._close_second(flow)
+            # Segundos sin paquetes entre medias
+            flow["throughput_MBps"].add(0.0, second - flow["second"] - 1)
+            flow["second"] = second
+        flow["bytes"] += int(ip_total_length) if ip_total_length else PACKET_SIZE
+
+    def _close_second(self, flow):
+        # El primer segundo es parcial: no entra en el sketch
+        if flow["second"] != flow["first_second"]:
+            flow["throughput_MBps"].add(flow["bytes"] / 1e6)
+        flow["bytes"] = 0
+
+    def to_dict(self):
+        """Serializable form; the last (partial) second of each flow is left out."""
+        flows = []
+        for (src_ip, src_port, dst_ip, dst_port), flow in sorted(self.flows.items()):
+            flows.append({"src_ip": src_ip, "src_port": src_port,
+                          "dst_ip": dst_ip, "dst_port": dst_port,
+                          **{m: flow[m].to_dict() for m in METRICS}})
+        return {"version": SKETCH_VERSION, "relative_accuracy": self.relative_accuracy,
+                "flows": flows}
+
+
+def sketch_path(csv_file):
+    return os.path.splitext(csv_file)[0] + ".sketches.json"
+
+
+def save_sketches(path, sketches):
+    tmp = path + ".part"
+    with open(tmp, "w") as f:
+        json.dump(sketches.to_dict(), f)
+    os.replace(tmp, path)
+
+
+def load_flows(path):
+    """Flows of a .sketches.json: dicts with the flow fields and a QuantileSketch per metric."""
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != SKETCH_VERSION:
+        raise ValueError(f"{path}: unsupported sketch version {data.get('version')}")
+    return [{**flow, **{m: QuantileSketch.from_dict(flow[m]) for m in METRICS}}
+            for flow in data["flows"]]
+
+
+def merge_all(sketches):
+    """One QuantileSketch from an iterable of them (None if empty)."""
+    merged = None
+    for sketch in sketches:
+        if merged is None:
+            merged = QuantileSketch(sketch.relative_accuracy)
+        merged.merge(sketch)
+    return merged
+
+
+def describe(sketch):
+    if sketch is None or not sketch.count:
+        return "no samples"
+    qs = ", ".join(f"p{q * 100:g} {v:.3f}" for q, v in sketch.quantiles().items())
+    return f"n={sketch.count}, mean {sketch.mean:.3f}, {qs}, max {sketch.max:.3f}"
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("show", "merge"):
+        print("Usage: python3 quantile_sketch.py show <file.sketches.json> [dst_port]")
+        print("       python3 quantile_sketch.py merge <file.sketches.json> [...]")
+        sys.exit(1)
+    try:
+        if sys.argv[1] == "show":
+            flows = load_flows(sys.argv[2])
+            if len(sys.argv) > 3:
+                flows = [f for f in flows if f["dst_port"] == int(sys.argv[3])]
+            for f in flows:
+                print(f"{f['src_ip']}:{f['src_port']} > {f['dst_ip']}:{f['dst_port']}")
+                for m in METRICS:
+                    print(f"  {m}: {describe(f[m])}")
+        else:
+            flows = [f for path in sys.argv[2:] for f in load_flows(path)]
+            print(f"{len(flows)} flow(s) from {len(sys.argv) - 2} file(s)")
+            for m in METRICS:
+                print(f"  {m}: {describe(merge_all(f[m] for f in flows))}")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Minimal client for the Amarisoft remote API (JSON messages over a
+WebSocket on com_addr), using only the standard library.
+
+Every request carries a message_id and the reply with the same id is
+returned; unsolicited messages (the "ready" banner, events) are skipped.
+A reply with an "error" field raises RemoteAPIError.
+
+The frame helpers are shared with mock_remote_api.py.
+
+Usage: remote_api.py <host:port> <message> ['{"param": value, ...}']
+"""
+import os
+import sys
+import json
+import base64
+import socket
+import struct
+import hashlib
+import threading
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Opcodes de WebSocket (RFC 6455)
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class RemoteAPIError(Exception):
+    """Raised on connection errors or when lteue replies with an error."""
+
+
+# -------------- WebSocket frames --------------
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise RemoteAPIError("connection closed")
+        buf += chunk
+    return buf
+
+
+def send_frame(sock, payload, opcode=OP_TEXT, mask=True):
+    """Clients must mask their frames, servers must not."""
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        header += bytes([mask_bit | n])
+    elif n < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", n)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+        header += key
+    sock.sendall(header + payload)
+
+
+def recv_frame(sock):
+    """Returns (opcode, fin, payload) of one frame, unmasking it if needed."""
+    b0, b1 = recv_exact(sock, 2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", recv_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", recv_exact(sock, 8))[0]
+    key = recv_exact(sock, 4) if b1 & 0x80 else None
+    payload = recv_exact(sock, n)
+    if key:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return b0 & 0x0F, b0 & 0x80, payload
+
+
+def recv_message(sock, mask=True):
+    """
+    Next text message, reassembling fragments and answering pings. Returns
+    None when the peer closes the connection.
+    """
+    parts = []
+    while True:
+        opcode, fin, payload = recv_frame(sock)
+        if opcode == OP_PING:
+            send_frame(sock, payload, OP_PONG, mask)
+            continue
+        if opcode == OP_PONG:
+            continue
+        if opcode == OP_CLOSE:
+            return None
+        parts.append(payload)
+        if fin:
+            return b"".join(parts).decode("utf-8")
+
+
+# -------------- Client --------------
+class RemoteAPI:
+    def __init__(self, host="127.0.0.1", port=9002, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise RemoteAPIError(f"{self.host}:{self.port}: {e}")
+        key = base64.b64encode(os.urandom(16)).decode()
+        sock.sendall((f"GET / HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                      "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n"
+                      "Origin: http://127.0.0.1\r\n\r\n").encode())
+        # Byte a byte: el mensaje "ready" puede llegar justo tras la cabecera
+        response = b""
+        while not response.endswith(b"\r\n\r\n"):
+            chunk = sock.recv(1)
+            if not chunk:
+                sock.close()
+                raise RemoteAPIError(f"{self.host}:{self.port}: handshake failed")
+            response += chunk
+        head = response.split(b"\r\n\r\n", 1)[0].decode("latin-1").split("\r\n")
+        headers = {k.strip().lower(): v.strip()
+                   for k, _, v in (h.partition(":") for h in head[1:])}
+        if head[0].split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != accept_key(key):
+            sock.close()
+            raise RemoteAPIError(f"{self.host}:{self.port}: not a WebSocket server ({head[0]})")
+        self.sock = sock
+        return self
+
+    def close(self):
+        if self.sock:
+            try:
+                send_frame(self.sock, b"", OP_CLOSE)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self.connect() if self.sock is None else self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, message, **params):
+        """Sends {"message": message, **params} and returns lteue's reply."""
+        with self.lock:
+            if self.sock is None:
+                self.connect()
+            message_id = self.next_id
+            self.next_id += 1
+            data = dict(params, message=message, message_id=message_id)
+            try:
+                send_frame(self.sock, json.dumps(data).encode("utf-8"))
+                while True:
+                    text = recv_message(self.sock)
+                    if text is None:
+                        raise RemoteAPIError(f"{message}: connection closed by lteue")
+                    reply = json.loads(text)
+                    if reply.get("message_id") == message_id:
+                        break
+            except (OSError, ValueError) as e:
+                self.close()
+                raise RemoteAPIError(f"{message}: {e}")
+        if "error" in reply:
+            raise RemoteAPIError(f"{message}: {reply['error']}")
+        return reply
+
+
+def parse_address(value, default_port=9002):
+    """
+    'host:port', '[::1]:port' or 'port' -> (host, port). A wildcard
+    listen address such as com_addr "[::]:9002" maps to localhost.
+    """
+    if value.isdigit():
+        return "127.0.0.1", int(value)
+    host, _, port = value.rpartition(":")
+    host = host.strip("[]")
+    if host in ("", "::", "0.0.0.0"):
+        host = "127.0.0.1"
+    return host, int(port or default_port)
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python3 remote_api.py <host:port> <message> ['{json params}']")
+        sys.exit(1)
+    host, port = parse_address(sys.argv[1])
+    try:
+        params = json.loads(sys.argv[3]) if len(sys.argv) == 4 else {}
+    except ValueError as e:
+        print(f"Error: invalid JSON parameters: {e}")
+        sys.exit(1)
+    try:
+        with RemoteAPI(host, port) as api:
+            reply = api.request(sys.argv[2], **params)
+    except RemoteAPIError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(json.dumps(reply, indent=2))
+
+
+if __name__ == "__main__":
+    main()
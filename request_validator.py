@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+import sys
+import json
+import os
+import re
+
+# -------------- Cell Database Setup --------------
+cell_database_path = "cell_database.json"
+
+# -------------- iperf3 argument parsing --------------
+# Opciones de iperf3 que llevan valor y su nombre largo equivalente
+IPERF_VALUE_FLAGS = {
+    "-c": "client", "--client": "client",
+    "-p": "port", "--port": "port",
+    "-b": "bitrate", "--bitrate": "bitrate", "--bandwidth": "bitrate",
+    "-t": "time", "--time": "time",
+    "-n": "bytes", "--bytes": "bytes",
+    "-k": "blockcount", "--blockcount": "blockcount",
+    "-l": "length", "--length": "length",
+    "-i": "interval", "--interval": "interval",
+    "-P": "parallel", "--parallel": "parallel",
+    "-w": "window", "--window": "window",
+    "-B": "bind", "--bind": "bind",
+    "-f": "format", "--format": "format",
+    "-O": "omit", "--omit": "omit",
+    "-S": "tos", "--tos": "tos",
+    "-T": "title", "--title": "title",
+    "-M": "set_mss", "--set-mss": "set_mss",
+    "--cport": "cport",
+    "--logfile": "logfile",
+}
+IPERF_BOOL_FLAGS = {
+    "-u": "udp", "--udp": "udp",
+    "-J": "json", "--json": "json",
+    "-R": "reverse", "--reverse": "reverse",
+    "-s": "server", "--server": "server",
+    "-1": "one_off", "--one-off": "one_off",
+    "-N": "no_delay", "--no-delay": "no_delay",
+    "-Z": "zerocopy", "--zerocopy": "zerocopy",
+    "-4": "version4", "--version4": "version4",
+    "-6": "version6", "--version6": "version6",
+    "-V": "verbose", "--verbose": "verbose",
+    "-d": "debug", "--debug": "debug",
+    "--bidir": "bidir",
+    "--forceflush": "forceflush",
+    "--get-server-output": "get_server_output",
+}
+IPERF_INT_OPTIONS = ("port", "time", "parallel", "length", "omit", "cport")
+IPERF_DEFAULT_PORT = 5201
+
+bitrate_pattern = re.compile(r"^(\d+(?:\.\d+)?)([kKmMgGtT]?)(?:/\d+)?$")
+size_pattern = re.compile(r"^(\d+(?:\.\d+)?)([kKmMgG]?)$")
+ipv4_pattern = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+hostname_pattern = re.compile(r"^[A-Za-z0-9]([A-Za-z0-9.-]*[A-Za-z0-9])?$")
+
+RATE_UNITS = {"": 1, "k": 1e3, "m": 1e6, "g": 1e9, "t": 1e12}
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_bitrate(value):
+    """
+    Converts an iperf3 bitrate string ("10M", "500k", "1.5G/10") to bits per
+    second. iperf3 uses decimal (1000-based) multipliers for rates.
+    """
+    m = bitrate_pattern.match(value)
+    if not m:
+        raise ValueError(f"invalid bitrate '{value}'")
+    number, unit = m.groups()
+    return float(number) * RATE_UNITS[unit.lower()]
+
+
+def parse_size(value):
+    """Converts an iperf3 size string ("1470", "64K") to bytes (1024-based)."""
+    m = size_pattern.match(value)
+    if not m:
+        raise ValueError(f"invalid size '{value}'")
+    number, unit = m.groups()
+    return int(float(number) * SIZE_UNITS[unit.lower()])
+
+
+def parse_iperf_command(command):
+    """
+    Parses an "iperf3 ..." command string into a dict of options.
+
+    Always present keys: client (server address or None), server (bool),
+    port (int, 5201 by default), udp, json, reverse (bools),
+    bitrate_bps (float or None) and length_bytes (int or None).
+    Raises ValueError on unknown flags, missing values or bad numbers.
+    """
+    tokens = command.split()
+    if not tokens or tokens[0] != "iperf3":
+        raise ValueError("command does not start with 'iperf3'")
+
+    opts = {name: False for name in IPERF_BOOL_FLAGS.values()}
+    opts.update({"client": None, "port": IPERF_DEFAULT_PORT,
+                 "bitrate_bps": None, "length_bytes": None})
+
+    i = 1
+    while i < len(tokens):
+        tok = tokens[i]
+        value = None
+        if tok.startswith("--") and "=" in tok:
+            tok, value = tok.split("=", 1)
+        if tok in IPERF_BOOL_FLAGS:
+            opts[IPERF_BOOL_FLAGS[tok]] = True
+            i += 1
+            continue
+        if tok not in IPERF_VALUE_FLAGS:
+            raise ValueError(f"unknown iperf3 option '{tok}'")
+        name = IPERF_VALUE_FLAGS[tok]
+        if value is None:
+            if i + 1 >= len(tokens):
+                raise ValueError(f"option '{tok}' requires a value")
+            value = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+
+        if name == "bitrate":
+            opts["bitrate_bps"] = parse_bitrate(value)
+        elif name == "length":
+            opts["length_bytes"] = parse_size(value)
+        elif name in IPERF_INT_OPTIONS:
+            try:
+                opts[name] = int(value)
+            except ValueError:
+                raise ValueError(f"option '{tok}' expects an integer, got '{value}'")
+        else:
+            opts[name] = value
+
+    if opts["client"] is None and not opts["server"]:
+        raise ValueError("iperf3 needs either -c <host> or -s")
+    if opts["client"] is not None and opts["server"]:
+        raise ValueError("iperf3 cannot use -c and -s at the same time")
+    if not 0 < opts["port"] < 65536:
+        raise ValueError(f"port {opts['port']} out of range")
+    return opts
+
+
+def parse_ping_command(command):
+    """Parses a "ping <dst_addr>" command string (the form the generator supports)."""
+    tokens = command.split()
+    if len(tokens) < 2:
+        raise ValueError("ping requires a destination address")
+    dst = tokens[1]
+    if not (ipv4_pattern.match(dst) or hostname_pattern.match(dst)):
+        raise ValueError(f"invalid ping destination '{dst}'")
+    return {"dst_addr": dst}
+
+
+COMMAND_PARSERS = {
+    "iperf3": parse_iperf_command,
+    "ping": parse_ping_command,
+}
+
+# -------------- Schema --------------
+# Cada campo: (tipos admitidos, obligatorio, comprobación extra o sub-esquema)
+NUMBER = (int, float)
+
+
+def _positive(value):
+    return None if value > 0 else "must be > 0"
+
+
+def _non_negative(value):
+    return None if value >= 0 else "must be >= 0"
+
+
+def _non_empty(value):
+    return None if value else "must not be empty"
+
+
+def _subcarrier_spacing(value):
+    return None if value in (15, 30, 60, 120) else "must be one of 15, 30, 60, 120"
+
+
+def _band(value):
+    return None if re.match(r"^[Bbn]?\d+$", value) else "must look like 'B78'"
+
+
+def _plmn(value):
+    return None if re.match(r"^\d{5,6}$", str(value)) else "must be 5 or 6 digits"
+
+
+def _command(value):
+    program = value.split()[0] if value.split() else ""
+    parser = COMMAND_PARSERS.get(program)
+    if parser is None:
+        return f"unknown program '{program}' (expected one of {', '.join(COMMAND_PARSERS)})"
+    try:
+        parser(value)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+COMMAND_SCHEMA = {
+    "command": (str, True, _command),
+    "duration": (NUMBER, True, _positive),
+}
+
+RADIO_CONFIG_SCHEMA = {
+    "cell_name": (str, False, _non_empty),
+    "bandwidth": (NUMBER, True, _positive),
+    "band": (str, False, _band),
+    "arfcn": (int, False, _non_negative),
+    "ssb_nr_arfcn": (int, False, _non_negative),
+    "subcarrier_spacing": (int, False, _subcarrier_spacing),
+    "tx_gain": (NUMBER, True, None),
+    "rx_gain": (NUMBER, True, None),
+    "plmn": ((int, str), True, _plmn),
+}
+
+CHANNEL_SCHEMA = {
+    "type": (str, False, _non_empty),
+    "A": (NUMBER, False, None),
+    "B": (NUMBER, False, None),
+}
+
+CHANNEL_PARAMS_SCHEMA = {
+    "max_distance": (NUMBER, False, _non_negative),
+    "min_distance": (NUMBER, False, _non_negative),
+    "noise_spd": (NUMBER, False, None),
+    "speed": (NUMBER, False, _non_negative),
+    "channel": (dict, False, CHANNEL_SCHEMA),
+}
+
+SCHEDULE_SCHEMA = {
+    "attach_rate": (NUMBER, False, _positive),
+    "max_concurrent": (int, False, _positive),
+    "first_power_on": (NUMBER, False, _non_negative),
+    "attach_time": (NUMBER, False, _non_negative),
+}
+
+REQUEST_SCHEMA = {
+    "id": (str, False, _non_empty),
+    "commands": (list, True, COMMAND_SCHEMA),
+    "radio_config": (dict, True, RADIO_CONFIG_SCHEMA),
+    "channel_sim": (bool, False, None),
+    "channel_params": (dict, False, CHANNEL_PARAMS_SCHEMA),
+    "schedule": (dict, False, SCHEDULE_SCHEMA),
+}
+
+CELL_DATA_FIELDS = ("band", "arfcn", "ssb_nr_arfcn", "subcarrier_spacing")
+
+
+def _type_name(types):
+    if isinstance(types, tuple):
+        return " or ".join(t.__name__ for t in types)
+    return types.__name__
+
+
+def compile_schema(schema):
+    """
+    Turns a schema dict into a list of per-field check closures, so that
+    validating a request is a flat loop with no schema interpretation.
+    Returns a function check(obj, path, errors).
+    """
+    checks = []
+    for field, (types, required, extra) in schema.items():
+        if isinstance(extra, dict):
+            sub_check = compile_schema(extra)
+            if types is list:
+                def extra_check(value, path, errors, sub_check=sub_check):
+                    if not value:
+                        errors.append(f"{path}: must not be empty")
+                    for idx, item in enumerate(value):
+                        item_path = f"{path}[{idx}]"
+                        if not isinstance(item, dict):
+                            errors.append(f"{item_path}: expected object")
+                            continue
+                        sub_check(item, item_path, errors)
+            else:
+                def extra_check(value, path, errors, sub_check=sub_check):
+                    sub_check(value, path, errors)
+        elif extra is not None:
+            def extra_check(value, path, errors, fn=extra):
+                msg = fn(value)
+                if msg:
+                    errors.append(f"{path}: {msg}")
+        else:
+            extra_check = None
+
+        def check_field(obj, path, errors, field=field, types=types,
+                        required=required, extra_check=extra_check):
+            field_path = f"{path}.{field}" if path else field
+            if field not in obj:
+                if required:
+                    errors.append(f"{field_path}: missing required field")
+                return
+            value = obj[field]
+            # bool es subclase de int: no aceptarlo como número
+            if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+                errors.append(f"{field_path}: expected {_type_name(types)}, "
+                              f"got {type(value).__name__}")
+                return
+            if extra_check is not None:
+                extra_check(value, field_path, errors)
+
+        checks.append(check_field)
+
+    def check(obj, path, errors):
+        for check_field in checks:
+            check_field(obj, path, errors)
+
+    return check
+
+
+_check_request = compile_schema(REQUEST_SCHEMA)
+
+
+def validate_request(data, cell_database=None):
+    """
+    Validates a request dict and returns a list with every error found
+    (empty list when the request is valid). cell_database is the parsed
+    cell_database.json used to check that a cell_name-only request can be
+    resolved.
+    """
+    if not isinstance(data, dict):
+        return ["request: expected a JSON object"]
+
+    errors = []
+    _check_request(data, "", errors)
+
+    radio = data.get("radio_config")
+    if isinstance(radio, dict):
+        missing = [f for f in CELL_DATA_FIELDS if f not in radio]
+        cell_name = radio.get("cell_name")
+        if missing and not cell_name:
+            errors.append("radio_config: no cell_name and incomplete cell data "
+                          f"(missing {', '.join(missing)})")
+        elif missing and isinstance(cell_name, str):
+            bandwidth = radio.get("bandwidth")
+            bw_info = (cell_database or {}).get(cell_name, {}).get("bandwidth_info", {})
+            if str(bandwidth) not in bw_info:
+                errors.append(f"radio_config: cell '{cell_name}' with bandwidth "
+                              f"'{bandwidth}' not found in cell database")
+
+    channel_params = data.get("channel_params")
+    if isinstance(channel_params, dict):
+        min_d = channel_params.get("min_distance", 0)
+        max_d = channel_params.get("max_distance", 0)
+        if isinstance(min_d, NUMBER) and isinstance(max_d, NUMBER) and min_d > max_d:
+            errors.append("channel_params: min_distance is greater than max_distance")
+
+    return errors
+
+
+def load_cell_database(path=cell_database_path):
+    if os.path.exists(path):
+        with open(path, "r") as db_file:
+            return json.load(db_file)
+    return {}
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: request_validator.py <json_file> [cell_database.json]")
+        sys.exit(1)
+
+    json_file = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) == 3 else cell_database_path
+
+    try:
+        with open(json_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error loading JSON file: {e}")
+        sys.exit(1)
+
+    errors = validate_request(data, load_cell_database(db_path))
+    if errors:
+        print(f"Invalid request ({len(errors)} error(s)):")
+        for err in errors:
+            print(f"  - {err}")
+        sys.exit(1)
+    print("Request OK")
+
+
+if __name__ == "__main__":
+    main()
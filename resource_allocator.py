@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Radio resources for concurrent experiments.
+
+Each slot owns one SDR device, its own remote API/CLI port (com_addr) and
+a disjoint block of UE IDs; since IMSIs (214050000002000 + ue_id) and the
+network namespaces created by ue-ifup are derived from the UE ID, they do
+not collide either. A job acquires a slot for the radio stages and
+releases it when lteue has exited, so at most one experiment uses a card
+at a time and up to len(devices) experiments run in parallel.
+
+Usage: resource_allocator.py [--devices /dev/sdr0,/dev/sdr1]   (prints the slots)
+"""
+import glob
+import queue
+import argparse
+from contextlib import contextmanager
+
+BASE_COM_PORT = 9002
+UE_IDS_PER_SLOT = 64
+
+
+def detect_devices(pattern="/dev/sdr*"):
+    """SDR devices present on the host, sorted by name."""
+    return sorted(glob.glob(pattern))
+
+
+class Slot:
+    def __init__(self, index, sdr, com_port, ue_id_base, ue_id_count):
+        self.index = index
+        self.sdr = sdr
+        self.com_port = com_port
+        self.ue_id_base = ue_id_base
+        self.ue_id_count = ue_id_count
+
+    def as_dict(self):
+        return {"index": self.index, "sdr": self.sdr, "com_port": self.com_port,
+                "ue_ids": [self.ue_id_base + 1, self.ue_id_base + self.ue_id_count]}
+
+    def __repr__(self):
+        return f"Slot({self.index}, {self.sdr}, port {self.com_port}, " \
+               f"ue_id {self.ue_id_base + 1}-{self.ue_id_base + self.ue_id_count})"
+
+
+class ResourceAllocator:
+    def __init__(self, devices=None, base_port=BASE_COM_PORT, ue_ids_per_slot=UE_IDS_PER_SLOT):
+        devices = devices or detect_devices() or ["/dev/sdr0"]
+        self.slots = [Slot(i, dev, base_port + i, i * ue_ids_per_slot, ue_ids_per_slot)
+                      for i, dev in enumerate(devices)]
+        self.free = queue.Queue()
+        for slot in self.slots:
+            self.free.put(slot)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def acquire(self, timeout=None):
+        """Blocks until a slot is free. Raises queue.Empty on timeout."""
+        return self.free.get(timeout=timeout)
+
+    def release(self, slot):
+        self.free.put(slot)
+
+    @contextmanager
+    def allocate(self, timeout=None):
+        slot = self.acquire(timeout)
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+
+def parse_devices(value):
+    """'/dev/sdr0,/dev/sdr1' -> list; empty -> None (auto-detect)."""
+    devices = [d.strip() for d in (value or "").split(",") if d.strip()]
+    return devices or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the radio slots of this host")
+    parser.add_argument("--devices", default="", help="comma-separated SDR devices (default: /dev/sdr*)")
+    parser.add_argument("--base-port", type=int, default=BASE_COM_PORT)
+    parser.add_argument("--ue-ids-per-slot", type=int, default=UE_IDS_PER_SLOT)
+    args = parser.parse_args()
+
+    allocator = ResourceAllocator(parse_devices(args.devices), args.base_port, args.ue_ids_per_slot)
+    for slot in allocator.slots:
+        print(slot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Resumes the pipeline of one or more experiments from their manifest.json,
+running only the stages that are missing, failed or stale (inputs or the
+processing script changed). Use it after listener.sh or the service failed
+partway, or to refresh a whole output tree after upgrading the extractor.
+
+Each argument is an experiment directory (with request.json) or a
+directory of experiment directories. A member of a batched run
+(batch_scheduler.py) holds only its share of the results; it is resumed
+through its batch directory, which post-processes the batch run and
+splits it into every member again (pipeline_stages.postprocess_batch).
+
+The radio stages (generate, run) are never re-run unless --radio is given:
+a run whose expect_trace.log and ue0.log are present is accepted as done
+(runs made by listener.sh have no manifest and are adopted this way).
+
+Usage: resume_pipeline.py [--radio] [--force STAGE ...] [--archive-dir DIR]
+                          [--workers N] <dir> [<dir> ...]
+"""
+import os
+import sys
+import json
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import batch_scheduler
+import pipeline_stages as stages
+from run_manifest import RunManifest
+from resource_allocator import ResourceAllocator, parse_devices
+
+
+def find_experiments(paths):
+    """
+    Run directories (those holding a request.json) under paths; batch
+    members are replaced by their batch directory, listed once.
+    """
+    candidates = []
+    for path in paths:
+        if os.path.isfile(os.path.join(path, "request.json")):
+            candidates.append(path)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                exp_dir = os.path.join(path, name)
+                if os.path.isfile(os.path.join(exp_dir, "request.json")):
+                    candidates.append(exp_dir)
+    found, seen = [], set()
+    for exp_dir in candidates:
+        run_dir = batch_scheduler.member_batch_dir(exp_dir) or exp_dir
+        if os.path.abspath(run_dir) not in seen:
+            seen.add(os.path.abspath(run_dir))
+            found.append(run_dir)
+    return found
+
+
+def resume_experiment(exp_dir, archive_dir=stages.ARCHIVE_DIR, radio=False, force=(),
+                      generated_dir=stages.GENERATED_DIR,
+                      lteue_bin=stages.LTEUE_BIN, margin=stages.DEFAULT_MARGIN,
+                      allocator=None):
+    """
+    Brings one experiment (or batched run and its members) up to date.
+    Raises StageError on failure.
+    """
+    with open(os.path.join(exp_dir, "request.json"), "r", encoding="utf-8") as f:
+        exp_id = json.load(f).get("id") or os.path.basename(os.path.normpath(exp_dir))
+    paths = stages.experiment_paths(exp_dir, exp_id)
+    manifest = RunManifest(exp_dir)
+
+    if radio:
+        if set(force) & set(stages.RADIO_STAGES) or \
+                not stages.radio_fresh(manifest, paths, generated_dir, margin, lteue_bin):
+            # Un slot (tarjeta SDR) por experimento en la radio a la vez
+            with (allocator or ResourceAllocator()).allocate() as slot:
+                config_dir = stages.generate_stage(manifest, paths, generated_dir, slot, force)
+                stages.run_stage(manifest, paths, config_dir, margin=margin,
+                                 lteue_bin=lteue_bin, force=force)
+    elif not manifest.is_fresh("run", check_inputs=False):
+        if not manifest.adopt("run", [paths["expect_log"], paths["amari_log"]]):
+            raise stages.StageError("run: radio outputs missing, use --radio to repeat the run")
+
+    stages.postprocess(exp_dir, exp_id, paths["log"], archive_dir, manifest=manifest, force=force)
+    if batch_scheduler.is_batch_dir(exp_dir):
+        stages.postprocess_batch(exp_dir, archive_dir, force)
+    return exp_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume experiments from their manifest")
+    parser.add_argument("dirs", nargs="+", help="experiment directories or their parent")
+    parser.add_argument("--radio", action="store_true",
+                        help="also re-run generate/run when missing or stale")
+    parser.add_argument("--force", nargs="+", default=[], choices=stages.STAGES,
+                        metavar="STAGE", help="stages to run even if up to date")
+    parser.add_argument("--archive-dir", default=stages.ARCHIVE_DIR,
+                        help="archive root; empty string disables archiving")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="experiments post-processed in parallel")
+    parser.add_argument("--generated-dir", default=stages.GENERATED_DIR)
+    parser.add_argument("--lteue", default=stages.LTEUE_BIN)
+    parser.add_argument("--devices", default="",
+                        help="comma-separated SDR devices for --radio (default: /dev/sdr*)")
+    parser.add_argument("--margin", type=int, default=stages.DEFAULT_MARGIN)
+    args = parser.parse_args()
+
+    experiments = find_experiments(args.dirs)
+    if not experiments:
+        print("Error: no experiment directories found.")
+        sys.exit(1)
+
+    allocator = ResourceAllocator(parse_devices(args.devices))
+
+    def resume(exp_dir):
+        try:
+            resume_experiment(exp_dir, args.archive_dir, args.radio, set(args.force),
+                              args.generated_dir, args.lteue, args.margin, allocator)
+        except Exception as e:
+            if not isinstance(e, stages.StageError):
+                traceback.print_exc()
+            print(f"[{exp_dir}] failed: {e}", flush=True)
+            return False
+        print(f"[{exp_dir}] up to date", flush=True)
+        return True
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(resume, experiments))
+
+    failed = results.count(False)
+    print(f"{len(results) - failed} experiment(s) up to date, {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Run manifest (manifest.json) kept in every experiment directory.
+
+For each pipeline stage it records the status, the SHA-256 of its input
+files (data and the script that processes them), its parameters and the
+SHA-256 of its outputs. A stage is up to date when it finished, its outputs
+still exist and its inputs and parameters are unchanged, so a resumed run
+only recomputes what is stale.
+
+A file that is both input and output of a stage (dedupe rewrites json.log
+in place) is compared with the hash it had after the stage ran.
+
+Hashes are cached by size and mtime, as in archiver.py, so checking a
+multi-GB ue0.log that has not changed does not read it again.
+
+Usage: run_manifest.py <exp_dir>   (prints the manifest status)
+"""
+import os
+import sys
+import json
+from datetime import datetime
+
+from archiver import sha256_file
+
+MANIFEST_NAME = "manifest.json"
+
+# Estados de una etapa
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class RunManifest:
+    def __init__(self, exp_dir):
+        self.exp_dir = exp_dir
+        self.path = os.path.join(exp_dir, MANIFEST_NAME)
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            data = {}
+        self.stages = data.get("stages", {})
+        self.hash_cache = data.get("hash_cache", {})
+
+    def save(self):
+        tmp = self.path + ".part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages, "hash_cache": self.hash_cache},
+                      f, indent=2)
+        os.replace(tmp, self.path)
+
+    # -------------- Hashes --------------
+    def _key(self, path):
+        """Paths inside the experiment directory are stored relative to it."""
+        path = os.path.abspath(path)
+        rel = os.path.relpath(path, os.path.abspath(self.exp_dir))
+        return path if rel.startswith("..") else rel
+
+    def hash_file(self, path):
+        """SHA-256 of path, or None if it does not exist."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = self._key(path)
+        cached = self.hash_cache.get(key)
+        if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime:
+            return cached["sha256"]
+        digest = sha256_file(path)
+        self.hash_cache[key] = {"size": st.st_size, "mtime": st.st_mtime, "sha256": digest}
+        return digest
+
+    def _hashes(self, paths):
+        return {self._key(p): self.hash_file(p) for p in paths}
+
+    # -------------- Stages --------------
+    def status(self, name):
+        return self.stages.get(name, {}).get("status", PENDING)
+
+    def result(self, name):
+        return self.stages.get(name, {}).get("result")
+
+    def is_fresh(self, name, inputs=(), params=None, check_inputs=True):
+        """True if the stage finished and nothing it depends on changed."""
+        entry = self.stages.get(name)
+        if not entry or entry["status"] != DONE:
+            return False
+        for key in entry["outputs"]:
+            path = key if os.path.isabs(key) else os.path.join(self.exp_dir, key)
+            if not os.path.exists(path):
+                return False
+        if not check_inputs:
+            return True
+        if entry.get("params") != (params or {}):
+            return False
+        recorded = entry["inputs"]
+        current = self._hashes(inputs)
+        if set(recorded) != set(current):
+            return False
+        for key, digest in current.items():
+            if digest is None or digest != entry["outputs"].get(key, recorded[key]):
+                return False
+        return True
+
+    def run(self, name, fn, inputs=(), outputs=(), params=None, force=False):
+        """
+        Runs fn() unless the stage is fresh. outputs may be a list of paths
+        or a callable taking fn's result (for outputs only known after the
+        stage ran). fn's result must be JSON serialisable; it is stored and
+        returned again when the stage is skipped. Returns (result, ran).
+        """
+        if not force and self.is_fresh(name, inputs, params):
+            return self.result(name), False
+
+        entry = {"status": RUNNING, "inputs": self._hashes(inputs), "outputs": {},
+                 "params": params or {}, "result": None, "error": None,
+                 "started": datetime.now().isoformat(timespec="seconds"), "finished": None}
+        self.stages[name] = entry
+        self.save()
+        try:
+            result = fn()
+        except Exception as e:
+            entry.update(status=FAILED, error=str(e),
+                         finished=datetime.now().isoformat(timespec="seconds"))
+            self.save()
+            raise
+        out_paths = outputs(result) if callable(outputs) else outputs
+        entry.update(status=DONE, result=result, outputs=self._hashes(out_paths),
+                     finished=datetime.now().isoformat(timespec="seconds"))
+        self.save()
+        return result, True
+
+    def adopt(self, name, outputs, result=None):
+        """
+        Records as done a stage that ran outside the manifest (e.g. a run
+        made by listener.sh) if all its outputs exist. Returns True if adopted.
+        """
+        if not all(os.path.exists(p) for p in outputs):
+            return False
+        self.stages[name] = {"status": DONE, "inputs": {}, "outputs": self._hashes(outputs),
+                             "params": {}, "result": result, "error": None,
+                             "started": None, "finished": None, "adopted": True}
+        self.save()
+        return True
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 run_manifest.py <exp_dir>")
+        sys.exit(1)
+    manifest_file = os.path.join(sys.argv[1], MANIFEST_NAME)
+    if not os.path.exists(manifest_file):
+        print(f"Error: '{manifest_file}' not found.")
+        sys.exit(1)
+    manifest = RunManifest(sys.argv[1])
+    for name, entry in manifest.stages.items():
+        line = f"{name:10s} {entry['status']:8s} {entry.get('finished') or '-'}"
+        if entry.get("error"):
+            line += f"  {entry['error']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Seekable compressed format for ue0.log ("<name>.frames").
+
+The log is cut, at line boundaries, into frames of about FRAME_SIZE bytes
+and every frame is compressed on its own (zstd, or zlib when the zstandard
+module is not available). A frame index at the end of the file stores, for
+each frame, the first and last log timestamp, the MCS value in force at the
+start of the frame and its uncompressed/compressed byte offsets. Reading a
+time window only decompresses the frames that cover it.
+
+Layout:
+  header   MAGIC, codec (u8), frame_size (u32)
+  frames   compressed frames, back to back
+  index    n_frames entries of INDEX_ENTRY
+  footer   index offset (u64), n_frames (u32), MAGIC
+
+Usage:
+  seekable_log.py compress <ue0.log> <ue0.log.frames> [frame_size]
+  seekable_log.py window <ue0.log.frames> <HH:MM:SS[.mmm]> <HH:MM:SS[.mmm]>
+  seekable_log.py decompress <ue0.log.frames> <ue0.log>
+"""
+import re
+import sys
+import zlib
+import struct
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"AMLOGFR1"
+HEADER = struct.Struct("<8sBI")
+# first_ts_ms, last_ts_ms, start_mcs, uncompressed_offset, compressed_offset,
+# compressed_size, uncompressed_size
+INDEX_ENTRY = struct.Struct("<qqhQQII")
+FOOTER = struct.Struct("<QI8s")
+FRAME_SIZE = 1 << 20
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+DAY_MS = 24 * 3600 * 1000
+timestamp_pattern = re.compile(rb"^(\d{2}):(\d{2}):(\d{2})\.(\d{3})")
+mcs_line_pattern = re.compile(rb"^\s*mcs=(\d+)", re.IGNORECASE)
+
+
+def parse_time(value):
+    """'HH:MM:SS[.mmm]' -> milliseconds since midnight."""
+    h, m, s = value.split(":")
+    return int((int(h) * 3600 + int(m) * 60 + float(s)) * 1000 + 0.5)
+
+
+class TimestampTracker:
+    """
+    Converts the time-of-day stamps of the log into a monotonic millisecond
+    counter, adding a day whenever the clock wraps around midnight.
+    """
+    def __init__(self):
+        self.day_offset = 0
+        self.last = None
+
+    def update(self, line):
+        m = timestamp_pattern.match(line)
+        if not m:
+            return None
+        h, mi, s, ms = (int(g) for g in m.groups())
+        ts = ((h * 60 + mi) * 60 + s) * 1000 + ms + self.day_offset
+        if self.last is not None and ts < self.last - DAY_MS // 2:
+            self.day_offset += DAY_MS
+            ts += DAY_MS
+        self.last = ts
+        return ts
+
+
+def _compressor(codec, level):
+    if codec == CODEC_ZSTD:
+        cctx = zstandard.ZstdCompressor(level=level)
+        return cctx.compress
+    return lambda data: zlib.compress(data, min(level * 2, 9))
+
+
+def _decompressor(codec):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+def compress_log(src, dst, frame_size=FRAME_SIZE, level=3):
+    """Writes src as a .frames file. Returns the number of frames."""
+    codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+    compress = _compressor(codec, level)
+    tracker = TimestampTracker()
+    index = []
+    last_mcs = -1
+
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        fout.write(HEADER.pack(MAGIC, codec, frame_size))
+        u_offset = 0
+        buf = []
+        buf_size = 0
+        first_ts = last_ts = None
+        start_mcs = last_mcs
+
+        def flush():
+            nonlocal u_offset, buf, buf_size, first_ts, start_mcs
+            data = b"".join(buf)
+            packed = compress(data)
+            c_offset = fout.tell()
+            fout.write(packed)
+            first = first_ts if first_ts is not None else (last_ts if last_ts is not None else -1)
+            last = last_ts if last_ts is not None else -1
+            index.append((first, last, start_mcs, u_offset, c_offset, len(packed), len(data)))
+            u_offset += len(data)
+            buf, buf_size, first_ts, start_mcs = [], 0, None, last_mcs
+
+        for line in fin:
+            ts = tracker.update(line)
+            if ts is not None:
+                # Cortar frames sólo antes de una línea con timestamp, para
+                # no separar un registro [IP] de su volcado hexadecimal
+                if buf_size >= frame_size:
+                    flush()
+                if first_ts is None:
+                    first_ts = ts
+                last_ts = ts
+            else:
+                m = mcs_line_pattern.match(line)
+                if m:
+                    last_mcs = int(m.group(1))
+            buf.append(line)
+            buf_size += len(line)
+        if buf:
+            flush()
+
+        index_offset = fout.tell()
+        for entry in index:
+            fout.write(INDEX_ENTRY.pack(*entry))
+        fout.write(FOOTER.pack(index_offset, len(index), MAGIC))
+    return len(index)
+
+
+class FramedLogReader:
+    def __init__(self, path):
+        self.f = open(path, "rb")
+        magic, self.codec, self.frame_size = HEADER.unpack(self.f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a framed log")
+        self.f.seek(-FOOTER.size, 2)
+        index_offset, n_frames, magic = FOOTER.unpack(self.f.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' has a truncated frame index")
+        self.f.seek(index_offset)
+        raw = self.f.read(n_frames * INDEX_ENTRY.size)
+        self.index = [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(n_frames)]
+        self.decompress = _decompressor(self.codec)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_frame(self, i):
+        _, _, _, _, c_offset, c_size, _ = self.index[i]
+        self.f.seek(c_offset)
+        return self.decompress(self.f.read(c_size))
+
+    def first_frame_for(self, t_ms):
+        """Index of the first frame whose last timestamp is >= t_ms (binary search)."""
+        lo, hi = 0, len(self.index)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.index[mid][1] < t_ms:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter_lines(self, start_frame=0):
+        for i in range(start_frame, len(self.index)):
+            yield from self.read_frame(i).splitlines(keepends=True)
+
+    def read_window(self, start_ms, end_ms):
+        """
+        Returns (initial_mcs, lines) for the log between start_ms and end_ms
+        (milliseconds since midnight of the first log day, both inclusive).
+        Lines without a timestamp (hex dumps, mcs=) go with the previous
+        timestamped line. initial_mcs is the MCS in force at start_ms, or None.
+        """
+        start_frame = self.first_frame_for(start_ms)
+        if start_frame >= len(self.index):
+            return None, []
+        mcs = self.index[start_frame][2]
+        tracker = TimestampTracker()
+        # El tracker debe arrancar en el mismo "día" que el frame
+        first_ts = self.index[start_frame][0]
+        if first_ts >= 0:
+            tracker.day_offset = (first_ts // DAY_MS) * DAY_MS
+            tracker.last = first_ts
+
+        lines = []
+        in_window = False
+        for line in self.iter_lines(start_frame):
+            ts = tracker.update(line)
+            if ts is not None:
+                if ts > end_ms:
+                    break
+                in_window = ts >= start_ms
+            if in_window:
+                lines.append(line.decode("utf-8", errors="replace"))
+            else:
+                m = mcs_line_pattern.match(line)
+                if m:
+                    mcs = int(m.group(1))
+        return (mcs if mcs >= 0 else None), lines
+
+
+def decompress_log(src, dst):
+    with FramedLogReader(src) as reader, open(dst, "wb") as fout:
+        for i in range(len(reader.index)):
+            fout.write(reader.read_frame(i))
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] not in ("compress", "window", "decompress"):
+        print("Usage: seekable_log.py compress <ue0.log> <ue0.log.frames> [frame_size]\n"
+              "       seekable_log.py window <ue0.log.frames> <start HH:MM:SS> <end HH:MM:SS>\n"
+              "       seekable_log.py decompress <ue0.log.frames> <ue0.log>")
+        sys.exit(1)
+
+    cmd = sys.argv[1]
+    if cmd == "compress":
+        frame_size = int(sys.argv[4]) if len(sys.argv) > 4 else FRAME_SIZE
+        n = compress_log(sys.argv[2], sys.argv[3], frame_size)
+        print(f"{n} frame(s) written to {sys.argv[3]}")
+    elif cmd == "decompress":
+        decompress_log(sys.argv[2], sys.argv[3])
+    else:
+        if len(sys.argv) != 5:
+            print("Usage: seekable_log.py window <ue0.log.frames> <start> <end>")
+            sys.exit(1)
+        with FramedLogReader(sys.argv[2]) as reader:
+            _, lines = reader.read_window(parse_time(sys.argv[3]), parse_time(sys.argv[4]))
+        sys.stdout.writelines(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import sys
+import json
+import heapq
+
+# -------------- Defaults --------------
+# Valores equivalentes al escalonado original de process_json_v2.py:
+# power_on a los 5 s, tráfico 5 s después y un UE nuevo cada 2 s.
+DEFAULT_FIRST_POWER_ON = 5
+DEFAULT_ATTACH_TIME = 5
+DEFAULT_ATTACH_RATE = 0.5      # UEs por segundo
+DEFAULT_MAX_CONCURRENT = None  # sin límite de UEs con tráfico simultáneo
+
+
+def schedule_ues(durations,
+                 attach_rate=DEFAULT_ATTACH_RATE,
+                 max_concurrent=DEFAULT_MAX_CONCURRENT,
+                 first_power_on=DEFAULT_FIRST_POWER_ON,
+                 attach_time=DEFAULT_ATTACH_TIME):
+    """
+    Packs power_on and traffic start times for a list of UE traffic durations.
+
+    Constraints:
+      - consecutive power_on events are at least 1/attach_rate seconds apart
+      - traffic starts attach_time seconds after power_on
+      - at most max_concurrent UEs carry traffic at the same time
+      - every UE gets its full duration (end_time = start_time + duration)
+
+    UEs are placed longest-first (LPT) into the earliest free concurrency slot,
+    which keeps the run length close to the optimum for this kind of packing.
+
+    Returns (slots, run_length) where slots[i] is a dict with power_on,
+    start_time and end_time for durations[i], and run_length is the last
+    end_time of the run.
+    """
+    n = len(durations)
+    if n == 0:
+        return [], 0
+    if attach_rate <= 0:
+        raise ValueError("attach_rate must be > 0")
+    if max_concurrent is not None and max_concurrent < 1:
+        raise ValueError("max_concurrent must be >= 1")
+
+    attach_gap = 1.0 / attach_rate
+    concurrency = n if max_concurrent is None else min(max_concurrent, n)
+
+    # Min-heap with the instant each concurrency slot becomes free
+    free_slots = [first_power_on + attach_time] * concurrency
+    order = sorted(range(n), key=lambda i: durations[i], reverse=True)
+
+    slots = [None] * n
+    next_power_on = first_power_on
+    for i in order:
+        free_at = heapq.heappop(free_slots)
+        # Encender el UE lo más tarde posible para que termine el attach
+        # justo cuando queda libre un hueco, respetando la tasa de attach.
+        power_on = max(next_power_on, free_at - attach_time)
+        start_time = power_on + attach_time
+        end_time = start_time + durations[i]
+        next_power_on = power_on + attach_gap
+        heapq.heappush(free_slots, end_time)
+        slots[i] = {
+            "power_on": round(power_on, 3),
+            "start_time": round(start_time, 3),
+            "end_time": round(end_time, 3),
+        }
+
+    run_length = max(slot["end_time"] for slot in slots)
+    return slots, run_length
+
+
+def schedule_from_request(data):
+    """
+    Builds the schedule for a request dict. Scheduler settings are read from
+    the optional "schedule" key: attach_rate, max_concurrent, first_power_on
+    and attach_time.
+    """
+    cfg = data.get("schedule", {})
+    durations = [cmd["duration"] for cmd in data.get("commands", [])]
+    return schedule_ues(
+        durations,
+        attach_rate=cfg.get("attach_rate", DEFAULT_ATTACH_RATE),
+        max_concurrent=cfg.get("max_concurrent", DEFAULT_MAX_CONCURRENT),
+        first_power_on=cfg.get("first_power_on", DEFAULT_FIRST_POWER_ON),
+        attach_time=cfg.get("attach_time", DEFAULT_ATTACH_TIME),
+    )
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: sim_scheduler.py <json_file>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    try:
+        slots, run_length = schedule_from_request(data)
+    except (KeyError, ValueError) as e:
+        print(f"Error: invalid schedule request - {e}")
+        sys.exit(1)
+
+    print(json.dumps({"run_length": run_length, "ues": slots}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Persistent UE stats poller (replaces the `nc` loop of exe.bash).
+
+One UDP socket to lteue's CLI port sends 't' at a fixed rate; every
+answer is parsed with ue_stats.StatsTableParser straight into a ring
+buffer of typed columns (array.array, one per numeric column), which is
+flushed periodically to a columnar file. There is no process per sample,
+so 10-100 Hz costs little CPU.
+
+Columnar file: a sequence of chunks, each
+  header  <4sII  magic b"UEST", number of rows, length of the JSON header
+  JSON    {"columns": [[name, typecode], ...]}
+  data    the columns one after the other (array.tobytes, native order)
+Chunks are appended with a single write, so a crash loses at most the
+rows not flushed yet; a truncated last chunk is ignored by read_columns().
+
+The columns are taken from the rows: time_ms and ue_id as int64, the
+other numeric columns as float64 (NaN when missing or not a number).
+String columns (RAT, CL, RNTI, ...) are not kept. A row with a number in a
+column the ring does not keep yet (missing or a string until then, or a
+new column of the table) flushes the ring and starts a new chunk with the
+extra column; read_columns() fills it with NaN in the earlier chunks.
+
+Usage:
+  stats_poller.py poll [--host localhost] [--port 9002] [--rate 10] [--flush 5]
+                       [--duration S] <out.cols>
+  stats_poller.py dump <file.cols>    (CSV to stdout)
+"""
+import sys
+import csv
+import math
+import json
+import time
+import array
+import struct
+import signal
+import asyncio
+import argparse
+
+from ue_stats import StatsTableParser
+
+MAGIC = b"UEST"
+CHUNK_HEADER = struct.Struct("<4sII")
+INT_COLUMNS = ("time_ms", "ue_id")
+
+DEFAULT_RATE = 10.0         # Hz
+DEFAULT_FLUSH = 5.0         # s
+DEFAULT_CAPACITY = 65536    # filas en memoria
+
+
+# -------------- Ring buffer --------------
+class ColumnRing:
+    """Fixed-capacity ring of rows stored as one typed array per column."""
+    def __init__(self, columns, capacity=DEFAULT_CAPACITY):
+        self.columns = columns          # [(name, typecode), ...]
+        self.capacity = capacity
+        self.data = {name: array.array(code, [0]) * capacity for name, code in columns}
+        self.start = 0
+        self.count = 0
+        self.dropped = 0
+
+    @classmethod
+    def for_row(cls, row, capacity=DEFAULT_CAPACITY, columns=()):
+        """Ring for the numeric columns of row, after the given ones (those of a previous ring)."""
+        columns = list(columns)
+        known = {name for name, _ in columns}
+        for name, value in row.items():
+            if name in known:
+                continue
+            if name in INT_COLUMNS:
+                columns.append((name, "q"))
+            elif value is None or isinstance(value, (int, float)):
+                columns.append((name, "d"))
+        return cls(columns, capacity)
+
+    def missing(self, row):
+        """True if row has a number in a column this ring does not keep."""
+        return any(name not in self.data and isinstance(value, (int, float))
+                   for name, value in row.items())
+
+    def append(self, row):
+        if self.count == self.capacity:
+            # Lleno: se pierde la fila más antigua
+            self.start = (self.start + 1) % self.capacity
+            self.count -= 1
+            self.dropped += 1
+        i = (self.start + self.count) % self.capacity
+        for name, code in self.columns:
+            value = row.get(name)
+            if code == "q":
+                self.data[name][i] = value if isinstance(value, int) else -1
+            else:
+                self.data[name][i] = value if isinstance(value, (int, float)) else math.nan
+        self.count += 1
+
+    def drain(self):
+        """The buffered rows as {name: array} in arrival order; empties the ring."""
+        end = self.start + self.count
+        out = {}
+        for name, _ in self.columns:
+            col = self.data[name]
+            if end <= self.capacity:
+                out[name] = col[self.start:end]
+            else:
+                out[name] = col[self.start:] + col[:end - self.capacity]
+        self.start = 0
+        self.count = 0
+        return out
+
+
+# -------------- Columnar file --------------
+def write_chunk(f, columns, data):
+    n = len(data[columns[0][0]]) if columns else 0
+    if n == 0:
+        return 0
+    header = json.dumps({"columns": columns}).encode()
+    f.write(CHUNK_HEADER.pack(MAGIC, n, len(header)) + header +
+            b"".join(data[name].tobytes() for name, _ in columns))
+    f.flush()
+    return n
+
+
+def read_columns(path):
+    """All complete chunks of a columnar file as {name: array.array}."""
+    with open(path, "rb") as f:
+        blob = f.read()
+    chunks = []
+    pos = 0
+    while pos + CHUNK_HEADER.size <= len(blob):
+        magic, n, header_len = CHUNK_HEADER.unpack_from(blob, pos)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: bad chunk at offset {pos}")
+        pos += CHUNK_HEADER.size
+        columns = json.loads(blob[pos:pos + header_len])["columns"] \
+            if pos + header_len <= len(blob) else []
+        pos += header_len
+        size = sum(n * array.array(code).itemsize for _, code in columns)
+        if not columns or pos + size > len(blob):
+            break       # último bloque incompleto
+        cols = {}
+        for name, code in columns:
+            cols[name] = array.array(code)
+            cols[name].frombytes(blob[pos:pos + n * cols[name].itemsize])
+            pos += n * cols[name].itemsize
+        chunks.append((n, cols))
+
+    # Columnas de todos los bloques; las que falten en uno quedan vacías
+    types = {}
+    for _, cols in chunks:
+        for name, col in cols.items():
+            types.setdefault(name, col.typecode)
+    out = {name: array.array(code) for name, code in types.items()}
+    for n, cols in chunks:
+        for name, code in types.items():
+            if name in cols:
+                out[name].extend(cols[name])
+            else:
+                out[name].extend(array.array(code, [-1 if code == "q" else math.nan]) * n)
+    return out
+
+
+# -------------- Poller --------------
+class StatsPoller(asyncio.DatagramProtocol):
+    def __init__(self, out_path, rate=DEFAULT_RATE, flush_interval=DEFAULT_FLUSH,
+                 capacity=DEFAULT_CAPACITY, command=b"t"):
+        self.out_path = out_path
+        self.period = 1.0 / rate
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.command = command
+        self.parser = StatsTableParser(self._on_row)
+        self.ring = None
+        self.transport = None
+        self.out = None
+        self.sent = 0
+        self.received = 0
+        self.rows = 0
+        self.written = 0
+
+    # Protocolo UDP
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        for line in data.decode("utf-8", errors="ignore").splitlines():
+            self.parser.feed(line)
+
+    def error_received(self, exc):
+        # ICMP port unreachable mientras lteue no está arrancado
+        pass
+
+    def _on_row(self, row):
+        if self.ring is None:
+            self.ring = ColumnRing.for_row(row, self.capacity)
+        elif self.ring.missing(row):
+            # Columna nueva: se vuelca lo que hay y el siguiente bloque la incluye
+            self.flush()
+            dropped = self.ring.dropped
+            self.ring = ColumnRing.for_row(row, self.capacity, self.ring.columns)
+            self.ring.dropped = dropped
+        self.ring.append(row)
+        self.rows += 1
+        # No esperar al siguiente volcado si el buffer se está llenando
+        if self.ring.count >= self.capacity * 3 // 4:
+            self.flush()
+
+    def flush(self):
+        if self.ring is not None and self.ring.count:
+            self.written += write_chunk(self.out, self.ring.columns, self.ring.drain())
+
+    async def run(self, host="localhost", port=9002, duration=None, stop=None):
+        loop = asyncio.get_running_loop()
+        stop = stop or asyncio.Event()
+        await loop.create_datagram_endpoint(lambda: self, remote_addr=(host, port))
+        with open(self.out_path, "ab") as self.out:
+            start = loop.time()
+            next_flush = start + self.flush_interval
+            k = 0
+            try:
+                while not stop.is_set():
+                    now = loop.time()
+                    if duration is not None and now - start >= duration:
+                        break
+                    self.transport.sendto(self.command)
+                    self.sent += 1
+                    if now >= next_flush:
+                        self.flush()
+                        next_flush = now + self.flush_interval
+                    # Periodo fijo sin deriva: el k-ésimo envío en start + k * period
+                    k += 1
+                    delay = start + k * self.period - loop.time()
+                    if delay < 0:
+                        k += int(-delay / self.period) + 1
+                        delay = start + k * self.period - loop.time()
+                    try:
+                        await asyncio.wait_for(stop.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                # Última respuesta
+                await asyncio.sleep(min(self.period, 0.2))
+            finally:
+                self.transport.close()
+                self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll lteue UE stats into a columnar file")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("poll", help="sample the stats table")
+    p.add_argument("out")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=9002)
+    p.add_argument("--rate", type=float, default=DEFAULT_RATE, help="samples per second")
+    p.add_argument("--flush", type=float, default=DEFAULT_FLUSH, help="seconds between writes")
+    p.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="rows kept in memory")
+    p.add_argument("--duration", type=float, default=None, help="stop after S seconds")
+    p = sub.add_parser("dump", help="print a columnar file as CSV")
+    p.add_argument("path")
+    args = parser.parse_args()
+
+    if args.cmd == "dump":
+        try:
+            data = read_columns(args.path)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        names = list(data)
+        writer = csv.writer(sys.stdout)
+        writer.writerow(names)
+        writer.writerows(zip(*(data[n] for n in names)))
+        return
+
+    if args.rate <= 0:
+        print("Error: --rate must be positive.")
+        sys.exit(1)
+    poller = StatsPoller(args.out, args.rate, args.flush, args.capacity)
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await poller.run(args.host, args.port, args.duration, stop)
+
+    t0 = time.monotonic()
+    asyncio.run(run())
+    print(f"{poller.sent} request(s), {poller.received} answer(s), {poller.written} row(s) "
+          f"written to {args.out} in {time.monotonic() - t0:.1f} s"
+          + (f", {poller.ring.dropped} dropped" if poller.ring and poller.ring.dropped else ""))
+
+
+if __name__ == "__main__":
+    main()
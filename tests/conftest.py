@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los scripts viven en la raíz del repo y se importan entre sí por nombre
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
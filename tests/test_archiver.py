@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import archiver
+
+
+def make_experiment(root):
+    src = root / "exp1"
+    (src / "plots").mkdir(parents=True)
+    (src / "exp1.csv").write_text("Timestamp_log,Source IP\n" +
+                                  "12:00:00.000,10.0.0.2\n" * 200)
+    (src / "plots" / "throughput.png").write_bytes(bytes(range(256)) * 4)
+    (src / "ue0.log").write_text("".join(
+        f"12:00:{i % 60:02d}.{i % 1000:03d} [IP] UL 0001 10.0.0.2:40001 > 10.0.0.1:5201\n"
+        for i in range(500)))
+    return src
+
+
+def test_archive_into_local_destination(tmp_path):
+    src = make_experiment(tmp_path)
+    dest = tmp_path / "nas"
+
+    summary = archiver.archive_directory(str(src), str(dest), workers=2)
+
+    assert summary["archived"] == 3 and summary["skipped"] == 0
+    index = archiver.load_index(str(dest))
+    assert index["exp1.csv"]["stored_as"] == "exp1.csv.zst"
+    assert index["ue0.log"]["stored_as"] == "ue0.log.frames"
+    assert index[os.path.join("plots", "throughput.png")]["stored_as"] == \
+        os.path.join("plots", "throughput.png")
+    for rel_path, entry in index.items():
+        assert (dest / entry["stored_as"]).exists()
+        assert entry["sha256"] == archiver.sha256_file(str(src / rel_path))
+    assert not list(dest.rglob("*.part"))
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    src = make_experiment(tmp_path)
+    dest = tmp_path / "nas"
+    archiver.archive_directory(str(src), str(dest))
+    stored = dest / "exp1.csv.zst"
+    mtime = stored.stat().st_mtime_ns
+
+    summary = archiver.archive_directory(str(src), str(dest))
+
+    assert summary["archived"] == 0 and summary["skipped"] == 3
+    assert stored.stat().st_mtime_ns == mtime
+
+
+def test_modified_file_is_archived_again(tmp_path):
+    src = make_experiment(tmp_path)
+    dest = tmp_path / "nas"
+    archiver.archive_directory(str(src), str(dest))
+    old_hash = archiver.load_index(str(dest))["exp1.csv"]["sha256"]
+
+    with open(src / "exp1.csv", "a") as f:
+        f.write("12:00:01.000,10.0.0.3\n")
+    summary = archiver.archive_directory(str(src), str(dest))
+
+    assert summary["archived"] == 1 and summary["skipped"] == 2
+    entry = archiver.load_index(str(dest))["exp1.csv"]
+    assert entry["sha256"] != old_hash
+    assert entry["sha256"] == archiver.sha256_file(str(dest / "exp1.csv.zst"), compressed=True)
+
+
+def test_corrupted_copy_fails_verification(tmp_path, monkeypatch):
+    src = make_experiment(tmp_path)
+    dest = tmp_path / "nas"
+    copy_hashed = archiver._copy_hashed
+
+    def corrupting_copy(src_path, dst, compress, level):
+        src_hash = copy_hashed(src_path, dst, compress, level)
+        with open(dst, "r+b") as f:
+            f.seek(10)
+            f.write(b"\xff\xff")
+        return src_hash
+
+    monkeypatch.setattr(archiver, "_copy_hashed", corrupting_copy)
+    with pytest.raises(IOError, match="verification failed"):
+        archiver.archive_file(str(src / "exp1.csv"), "exp1.csv", str(dest), None,
+                              compress=False)
+
+    assert not (dest / "exp1.csv").exists()
+    assert not (dest / "exp1.csv.part").exists()
+
+
+@pytest.mark.parametrize("rel_path", ["exp1.csv", "ue0.log",
+                                      os.path.join("plots", "throughput.png")])
+def test_restore_file_is_identical(tmp_path, rel_path):
+    src = make_experiment(tmp_path)
+    dest = tmp_path / "nas"
+    archiver.archive_directory(str(src), str(dest))
+    out = tmp_path / "restored"
+
+    archiver.restore_file(str(dest), rel_path, str(out))
+
+    assert out.read_bytes() == (src / rel_path).read_bytes()
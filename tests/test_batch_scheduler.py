@@ -0,0 +1,30 @@
+import batch_scheduler
+
+
+def request(exp_id, *commands):
+    return {"id": exp_id, "radio_config": {"cell_name": "FLAMINGO_5G_DOT-1", "bandwidth": 100},
+            "commands": [{"command": c, "duration": 5} for c in commands]}
+
+
+def test_flows_on_different_servers_share_a_run():
+    a = request("a", "iperf3 -c 10.45.0.1 -u -b 1M")
+    b = request("b", "iperf3 -c 10.45.0.2 -u -b 1M")
+    assert batch_scheduler.compatible([a], b)
+    assert batch_scheduler.plan_batches([a, b]) == [[a, b]]
+
+
+def test_same_server_and_port_are_not_merged():
+    a = request("a", "iperf3 -c 10.45.0.1 -u -b 1M")
+    b = request("b", "iperf3 -c 10.45.0.1 -u -b 2M -p 5201")
+    assert not batch_scheduler.compatible([a], b)
+
+
+def test_commands_without_a_flow_run_alone():
+    client = request("client", "iperf3 -c 10.45.0.1 -u -b 1M")
+    server = request("server", "iperf3 -s -p 5202")
+    ping = request("ping", "ping -c 5 10.45.0.1")
+    mixed = request("mixed", "iperf3 -c 10.45.0.3 -u -b 1M", "ping -c 5 10.45.0.1")
+    for other in (server, ping, mixed):
+        assert not batch_scheduler.compatible([client], other)
+        assert not batch_scheduler.compatible([other], client)
+    assert batch_scheduler.plan_batches([client, server, ping]) == [[client], [server], [ping]]
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import sqlite3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "validation_tests"))
+import catalog
+
+CSV_HEADER = ("Timestamp_log,Source IP,Source Port,Destination IP,Destination Port,"
+              "IP_Total_Length,Sequence_num_iperf,MCS\n")
+
+
+def make_experiment(root, exp_id="exp1"):
+    exp_dir = root / exp_id
+    exp_dir.mkdir()
+    request = {"id": exp_id,
+               "commands": [{"command": "iperf3 -c 10.45.0.1 -u -t 4 -b 8M", "duration": 4},
+                            {"command": "iperf3 -c 10.45.0.2 -u -t 4 -b 16M", "duration": 4},
+                            {"command": "iperf3 -c 10.45.0.1 -u -t 4 -b 4M -p 5202", "duration": 4},
+                            {"command": "ping -c 4 10.45.0.1", "duration": 4}],
+               "radio_config": {"cell_name": "FLAMINGO_5G_DOT-1", "bandwidth": 100}}
+    (exp_dir / "request.json").write_text(json.dumps(request))
+    rows = []
+    for second in range(4):
+        for i in range(10):
+            stamp = f"12:00:0{second}.{i * 100:03d}"
+            seq = second * 10 + i
+            rows.append(f"{stamp},10.0.0.2,40001,10.45.0.1,5201,1000,{seq},20\n")
+            rows.append(f"{stamp},10.0.0.3,40002,10.45.0.2,5201,2000,{seq},20\n")
+            if i % 2 == 0:
+                rows.append(f"{stamp},10.0.0.4,40003,10.45.0.1,5202,500,{seq // 2},21\n")
+    (exp_dir / f"{exp_id}.csv").write_text(CSV_HEADER + "".join(rows))
+    report = lambda host, port, jitter: {"start": {"connecting_to": {"host": host, "port": port}},
+                                         "end": {"sum": {"jitter_ms": jitter, "lost_packets": 0}}}
+    (exp_dir / "json.log").write_text(json.dumps([report("10.45.0.1", 5201, 0.1),
+                                                  report("10.45.0.2", 5201, 0.2)]))
+    return exp_dir
+
+
+def test_flows_on_the_default_port_are_kept_apart(tmp_path):
+    exp_dir = make_experiment(tmp_path)
+    with catalog.Catalog(str(tmp_path / "catalog.sqlite")) as cat:
+        assert cat.ingest(str(exp_dir)) == "added"
+        rows = cat.query("SELECT server, port, requested_mbps, mean_mbps, packets, jitter_ms "
+                         "FROM port_summary ORDER BY server, port")
+        commands = cat.query("SELECT server, port, requested_mbps FROM commands ORDER BY idx")
+
+    assert [(r["server"], r["port"]) for r in rows] == [
+        ("10.45.0.1", 5201), ("10.45.0.1", 5202), ("10.45.0.2", 5201)]
+    by_flow = {(r["server"], r["port"]): r for r in rows}
+    assert by_flow[("10.45.0.1", 5201)]["requested_mbps"] == 1.0
+    assert by_flow[("10.45.0.2", 5201)]["requested_mbps"] == 2.0
+    assert by_flow[("10.45.0.1", 5201)]["packets"] == 40
+    assert by_flow[("10.45.0.2", 5201)]["jitter_ms"] == 0.2
+    assert by_flow[("10.45.0.1", 5202)]["jitter_ms"] is None
+    assert by_flow[("10.45.0.2", 5201)]["mean_mbps"] > by_flow[("10.45.0.1", 5201)]["mean_mbps"]
+    assert [(c["server"], c["port"], c["requested_mbps"]) for c in commands] == [
+        ("10.45.0.1", 5201, 1.0), ("10.45.0.2", 5201, 2.0), ("10.45.0.1", 5202, 0.5),
+        (None, None, None)]
+
+
+def test_old_catalog_is_migrated_and_reingested(tmp_path):
+    exp_dir = make_experiment(tmp_path)
+    db_path = str(tmp_path / "catalog.sqlite")
+    # Esquema anterior: port_kpis y commands por (exp_id, port)
+    db = sqlite3.connect(db_path)
+    db.executescript(catalog.SCHEMA.replace("server TEXT, ", "").replace("k.server, ", "")
+                     .replace("(exp_id, server, port)", "(exp_id, port)"))
+    db.execute("INSERT INTO experiments (exp_id, sources) VALUES ('exp1', '{\"csv\": null}')")
+    db.commit()
+    db.close()
+
+    with catalog.Catalog(db_path) as cat:
+        assert cat.ingest(str(exp_dir)) == "updated"
+        assert len(cat.query("SELECT * FROM port_summary")) == 3
+        assert cat.ingest(str(exp_dir)) == "unchanged"
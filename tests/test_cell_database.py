@@ -0,0 +1,40 @@
+import os
+import json
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATOR = os.path.join(REPO_DIR, "process_json_v2.py")
+
+
+def cell_request(name, arfcn):
+    return {"id": name,
+            "commands": [{"command": "iperf3 -c 10.45.0.1 -u -t 5 -b 1M -J", "duration": 5}],
+            "radio_config": {"cell_name": name, "band": "B78", "arfcn": arfcn,
+                             "ssb_nr_arfcn": 634080, "plmn": 21405, "bandwidth": 100,
+                             "subcarrier_spacing": 30, "tx_gain": 90, "rx_gain": 60}}
+
+
+def test_concurrent_generators_keep_every_cell(tmp_path):
+    db_path = tmp_path / "cell_database.json"
+    db_path.write_text(json.dumps({"EXISTING": {"bandwidth_info": {}}}))
+    generated = tmp_path / "generated"
+    procs = []
+    for i in range(8):
+        request = tmp_path / f"cell{i}.json"
+        request.write_text(json.dumps(cell_request(f"CELL_{i}", 636666 + i)))
+        procs.append(subprocess.Popen(
+            [sys.executable, GENERATOR, str(request), str(generated),
+             "--cell-db", str(db_path), "--com-port", str(9100 + i),
+             "--log-file", str(tmp_path / f"ue{i}.log")],
+            cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True))
+    for proc in procs:
+        output = proc.communicate()[0]
+        assert proc.returncode == 0, output
+
+    database = json.loads(db_path.read_text())
+    assert set(database) == {"EXISTING"} | {f"CELL_{i}" for i in range(8)}
+    assert database["CELL_3"]["bandwidth_info"]["100"]["arfcn"] == 636669
+    assert not (tmp_path / "cell_database.json.part").exists()
+    for i in range(8):
+        assert (generated / f"CELL_{i}" / "nr-erc.cfg").exists()
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import pipeline_stages as stages
+from experiment_service import ExperimentService, make_handler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LTEUE_STUB = os.path.join(REPO_DIR, "lteue_stub.py")
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("LTEUE_STUB_TIME_SCALE", "0.05")
+    db = tmp_path / "cell_database.json"
+    shutil.copy(os.path.join(REPO_DIR, "cell_database.json"), db)
+    monkeypatch.setattr(stages, "CELL_DATABASE", str(db))
+    service = ExperimentService(output_dir=str(tmp_path / "OUTPUT"),
+                                generated_dir=str(tmp_path / "generated"),
+                                lteue_bin=LTEUE_STUB, archive_dir="", margin=5,
+                                cell_database_path=str(db), devices=["/dev/sdr0"])
+    statuses = []
+    on_update = service.runner.on_update
+
+    def record(job_id, **fields):
+        if "status" in fields:
+            statuses.append((job_id, fields["status"]))
+        on_update(job_id, **fields)
+
+    service.runner.on_update = record
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    service.url = f"http://127.0.0.1:{server.server_address[1]}"
+    service.statuses = statuses
+    yield service
+    server.shutdown()
+    server.server_close()
+    service.runner.join()
+    service.shutdown()
+
+
+def call(service, path, body=None):
+    """(status code, body bytes) of a GET, or of a POST when body is given."""
+    data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode()
+    req = urllib.request.Request(service.url + path, data=data,
+                                 method="POST" if data is not None else "GET")
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def job_request(job_id):
+    with open(os.path.join(REPO_DIR, "test.json")) as f:
+        data = json.load(f)
+    data["id"] = job_id
+    # Con -J el stub imprime el informe y pty_runner para al acabar el tráfico
+    for cmd in data["commands"]:
+        cmd["command"] += " -J"
+    return data
+
+
+def test_invalid_requests_are_rejected(service):
+    code, body = call(service, "/jobs", b"{not json")
+    assert code == 400 and "invalid JSON" in json.loads(body)["errors"][0]
+
+    code, body = call(service, "/jobs", {"commands": []})
+    assert code == 400 and json.loads(body)["errors"]
+
+    code, body = call(service, "/jobs", dict(job_request("x"), id="../escape"))
+    assert code == 400 and json.loads(body)["errors"] == ["id: must not contain '/'"]
+
+    assert call(service, "/jobs")[1] == b"[]"
+    assert call(service, "/jobs/missing")[0] == 404
+    assert call(service, "/jobs/missing/artifacts")[0] == 404
+    assert not os.path.exists(os.path.join(service.output_dir, "..", "escape"))
+
+
+def test_job_runs_to_done_and_serves_artifacts(service):
+    code, body = call(service, "/jobs", job_request("svc1"))
+    assert code == 202
+    job = json.loads(body)
+    assert job["id"] == "svc1" and job["status"] == "queued"
+
+    # Mientras está activo no se acepta otro con el mismo id
+    code, body = call(service, "/jobs", job_request("svc1"))
+    assert code == 400 and "already" in json.loads(body)["errors"][0]
+
+    deadline = time.monotonic() + 120
+    while job["status"] not in ("done", "failed"):
+        assert time.monotonic() < deadline, job
+        time.sleep(0.2)
+        job = json.loads(call(service, "/jobs/svc1")[1])
+    assert job["status"] == "done", job["error"]
+    assert job["device"] == "/dev/sdr0" and job["started"] and job["finished"]
+    # El worker de radio pasa el experimento al pool de post-procesado
+    assert [s for j, s in service.statuses if j == "svc1"] == [
+        "queued", "running", "postprocessing", "done"]
+    assert [j["id"] for j in json.loads(call(service, "/jobs")[1])] == ["svc1"]
+
+    code, body = call(service, "/jobs/svc1/artifacts")
+    artifacts = json.loads(body)
+    assert code == 200
+    for name in ("request.json", "ue0.log", "expect_trace.log", "svc1.csv",
+                 "svc1.throughput_check.json"):
+        assert name in artifacts
+
+    code, body = call(service, "/jobs/svc1/artifacts/svc1.throughput_check.json")
+    assert code == 200
+    with open(os.path.join(job["exp_dir"], "svc1.throughput_check.json"), "rb") as f:
+        assert body == f.read()
+    assert json.loads(body)["flows"][0]["server"] == "10.3.7.11"
+
+    assert call(service, "/jobs/svc1/artifacts/missing.txt")[0] == 404
+    for name in ("../svc1/request.json", "..%2Fsvc1%2Frequest.json", "..", "%2e%2e"):
+        assert call(service, f"/jobs/svc1/artifacts/{name}")[0] == 404
+    assert service.artifact_path("svc1", "../svc1/request.json") is None
+    assert service.artifact_path("svc1", "..") is None
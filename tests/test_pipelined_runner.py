@@ -0,0 +1,51 @@
+import socket
+
+import pipeline_stages as stages
+from pipelined_runner import PipelinedRunner
+from resource_allocator import ResourceAllocator
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(exp_id, server, bandwidth=100):
+    return {"id": exp_id,
+            "commands": [{"command": f"iperf3 -c {server} -u -t 2 -b 1M -J", "duration": 2}],
+            "radio_config": {"cell_name": "FLAMINGO_5G_DOT-1", "bandwidth": bandwidth,
+                             "tx_gain": 90, "rx_gain": 60, "plmn": 21405}}
+
+
+def test_batching_keeps_skipped_jobs_in_queue_order(tmp_path):
+    runner = PipelinedRunner(generated_dir=str(tmp_path / "generated"), archive_dir="",
+                             allocator=ResourceAllocator(["/dev/sdr0"], base_port=free_port()),
+                             batching=True)
+
+    def submit(data):
+        exp_dir = str(tmp_path / data["id"])
+        stages.save_request(exp_dir, data)
+        runner.submit(exp_dir, data["id"])
+
+    def ids(jobs):
+        return [exp_id for _, exp_id in jobs]
+
+    try:
+        # Con la cola bloqueada el worker de radio no toma nada: se prueba la selección
+        with runner.queued:
+            submit(request("a", "10.45.0.1"))
+            submit(request("x", "10.45.0.1", bandwidth=40))
+            submit(request("b", "10.45.0.2"))
+            submit(request("y", "10.45.0.2", bandwidth=40))
+            submit(request("c", "10.45.0.3"))
+            assert ids(runner._next_jobs()) == ["a", "b", "c"]
+            assert ids(runner.queue) == ["x", "y"]
+
+            submit(request("z", "10.45.0.1", bandwidth=80))
+            assert ids(runner.queue) == ["x", "y", "z"]
+            assert ids(runner._next_jobs()) == ["x", "y"]
+            assert ids(runner._next_jobs()) == ["z"]
+            assert not runner.queue
+    finally:
+        runner.shutdown()
@@ -0,0 +1,94 @@
+import os
+import shutil
+import socket
+
+import pytest
+
+import pipeline_stages as stages
+import resume_pipeline
+from pipelined_runner import PipelinedRunner, DONE
+from resource_allocator import ResourceAllocator
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LTEUE_STUB = os.path.join(REPO_DIR, "lteue_stub.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(exp_id, server):
+    return {"id": exp_id,
+            "commands": [{"command": f"iperf3 -c {server} -u -t 2 -b 1M -J", "duration": 2}],
+            "radio_config": {"cell_name": "FLAMINGO_5G_DOT-1", "bandwidth": 100,
+                             "tx_gain": 90, "rx_gain": 60, "plmn": 21405}}
+
+
+@pytest.fixture
+def stub_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LTEUE_STUB_TIME_SCALE", "0.05")
+    db = tmp_path / "cell_database.json"
+    shutil.copy(os.path.join(REPO_DIR, "cell_database.json"), db)
+    monkeypatch.setattr(stages, "CELL_DATABASE", str(db))
+
+
+def run_batch(tmp_path, output_dir, archive_dir):
+    status = {}
+    runner = PipelinedRunner(generated_dir=str(tmp_path / "generated"), lteue_bin=LTEUE_STUB,
+                             archive_dir=str(archive_dir), margin=5,
+                             allocator=ResourceAllocator(["/dev/sdr0"], base_port=free_port()),
+                             on_update=lambda exp_id, **f: status.setdefault(exp_id, {}).update(f),
+                             batching=True)
+    try:
+        # Ambas en cola antes de que el worker de radio tome la primera
+        with runner.queued:
+            for exp_id, server in (("exp_a", "10.45.0.1"), ("exp_b", "10.45.0.2")):
+                exp_dir = str(output_dir / exp_id)
+                stages.save_request(exp_dir, request(exp_id, server))
+                runner.submit(exp_dir, exp_id)
+        runner.join()
+    finally:
+        runner.shutdown()
+    return status
+
+
+def test_batched_run_is_resumed_through_its_batch(tmp_path, stub_env):
+    output_dir = tmp_path / "OUTPUT"
+    archive_dir = tmp_path / "archive"
+    status = run_batch(tmp_path, output_dir, archive_dir)
+    assert {exp_id: s["status"] for exp_id, s in status.items()} == {"exp_a": DONE, "exp_b": DONE}
+
+    batch_dir = output_dir / "_batches" / "batch-exp_a+1"
+    assert (batch_dir / "ue0.log").exists()
+    assert not (output_dir / "exp_a" / "ue0.log").exists()
+    for exp_id in ("exp_a", "exp_b"):
+        assert (output_dir / exp_id / f"{exp_id}.throughput_check.json").exists()
+        assert (archive_dir / exp_id / ".archive_index.json").exists()
+
+    # Los miembros no tienen ejecución propia: se reanudan por su lote, una sola vez
+    found = resume_pipeline.find_experiments([str(output_dir)])
+    assert [os.path.abspath(d) for d in found] == [str(batch_dir)]
+
+    member_a = output_dir / "exp_a"
+    csv_a = member_a / "exp_a.csv"
+    rows = csv_a.read_text()
+    assert rows.count("\n") > 1
+    os.remove(csv_a)
+    os.remove(member_a / "exp_a.throughput_check.json")
+    csv_b_mtime = (output_dir / "exp_b" / "exp_b.csv").stat().st_mtime_ns
+
+    for exp_dir in found:
+        resume_pipeline.resume_experiment(exp_dir, archive_dir=str(archive_dir))
+
+    assert csv_a.read_text() == rows
+    assert (member_a / "exp_a.throughput_check.json").exists()
+    # exp_b vuelve a salir del mismo reparto, con el mismo contenido
+    assert (output_dir / "exp_b" / "exp_b.csv").stat().st_mtime_ns != csv_b_mtime
+
+    # Sin cambios, una segunda reanudación no rehace nada
+    resume_pipeline.resume_experiment(str(batch_dir), archive_dir=str(archive_dir))
+    log = (member_a / "lteue_execution.log").read_text()
+    assert log.rstrip().endswith("[archive] up to date, skipped")
+    assert "[split] up to date, skipped" in log
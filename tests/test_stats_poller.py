@@ -0,0 +1,120 @@
+import os
+import sys
+import math
+import time
+import socket
+import subprocess
+
+from stats_poller import ColumnRing, StatsPoller, write_chunk, read_columns
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LTEUE_STUB = os.path.join(REPO_DIR, "lteue_stub.py")
+STATS_POLLER = os.path.join(REPO_DIR, "stats_poller.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def row(time_ms, ue_id, **values):
+    return {"time_ms": time_ms, "ue_id": ue_id, "rat": "NR", **values}
+
+
+def test_drain_after_wrap_around_keeps_arrival_order():
+    ring = ColumnRing.for_row(row(0, 1, sinr=0.0), capacity=4)
+    assert ring.columns == [("time_ms", "q"), ("ue_id", "q"), ("sinr", "d")]
+    for i in range(6):
+        ring.append(row(i, 1, sinr=i / 2))
+    assert ring.dropped == 2
+
+    data = ring.drain()
+    assert list(data["time_ms"]) == [2, 3, 4, 5]
+    assert list(data["sinr"]) == [1.0, 1.5, 2.0, 2.5]
+    assert ring.count == 0
+
+    # Tras vaciarse vuelve a empezar desde el principio
+    ring.append(row(6, 1, sinr=3.0))
+    assert list(ring.drain()["time_ms"]) == [6]
+
+
+def test_truncated_last_chunk_is_ignored(tmp_path):
+    path = tmp_path / "stats.cols"
+    columns = [("time_ms", "q"), ("sinr", "d")]
+    ring = ColumnRing(columns, capacity=8)
+    with open(path, "wb") as f:
+        for chunk in ((0, 1, 2), (3, 4, 5)):
+            for t in chunk:
+                ring.append({"time_ms": t, "sinr": t * 1.5})
+            write_chunk(f, columns, ring.drain())
+    size = os.path.getsize(path)
+    assert read_columns(path)["time_ms"].tolist() == [0, 1, 2, 3, 4, 5]
+
+    # Corte a mitad de los datos del segundo bloque y después en su cabecera
+    for cut in (size - 10, size // 2 + 20):
+        with open(path, "r+b") as f:
+            f.truncate(cut)
+        data = read_columns(path)
+        assert data["time_ms"].tolist() == [0, 1, 2]
+        assert data["sinr"].tolist() == [0.0, 1.5, 3.0]
+
+
+def test_column_missing_from_first_row_starts_new_chunk(tmp_path):
+    path = tmp_path / "stats.cols"
+    poller = StatsPoller(str(path), capacity=8)
+    poller.out = open(path, "wb")
+    try:
+        poller._on_row(row(0, 1, sinr=None, dl_brate="n/a"))
+        poller._on_row(row(1, 1, sinr=10.0, dl_brate=477e3))
+        poller._on_row(row(2, 1, sinr=11.0, dl_brate=None))
+        poller.flush()
+    finally:
+        poller.out.close()
+
+    data = read_columns(path)
+    assert data["time_ms"].tolist() == [0, 1, 2]
+    assert math.isnan(data["sinr"][0]) and data["sinr"][1:].tolist() == [10.0, 11.0]
+    assert math.isnan(data["dl_brate"][0]) and data["dl_brate"][1] == 477e3
+    assert "rat" not in data
+
+
+def test_poll_stub_udp_responder(tmp_path):
+    port = free_port()
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / "nr-erc.cfg").write_text(
+        "{\n"
+        f'  log_filename: "{config_dir / "ue0.log"}",\n'
+        f'  com_addr: "[::]:{port}",\n'
+        "}\n")
+    (config_dir / "users-scenario.cfg").write_text(
+        '{"ue_list": [{"ue_id": 1, "sim_events": []}, {"ue_id": 2, "sim_events": []}]}')
+
+    stub = subprocess.Popen([sys.executable, LTEUE_STUB, str(config_dir / "nr-erc.cfg")],
+                            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    try:
+        # Espera a que el stub abra el puerto
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            with socket.socket() as s:
+                if s.connect_ex(("127.0.0.1", port)) == 0:
+                    break
+            time.sleep(0.05)
+        out = tmp_path / "stats.cols"
+        result = subprocess.run([sys.executable, STATS_POLLER, "poll", "--host", "127.0.0.1",
+                                 "--port", str(port), "--rate", "20", "--flush", "0.2",
+                                 "--duration", "1", str(out)],
+                                capture_output=True, text=True, timeout=30)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    data = read_columns(out)
+    rows = len(data["time_ms"])
+    assert rows >= 10 and rows % 2 == 0
+    assert set(data["ue_id"]) == {1, 2}
+    assert data["sinr"].tolist() == [33.4] * rows
+    assert "rat" not in data and "rnti" not in data
+    assert list(data["time_ms"]) == sorted(data["time_ms"])
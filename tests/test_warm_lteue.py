@@ -0,0 +1,112 @@
+import os
+import json
+
+import pytest
+
+from mock_remote_api import MockRemoteAPI
+from warm_lteue import WarmLteue
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LTEUE_STUB = os.path.join(REPO_DIR, "lteue_stub.py")
+
+
+def write_config(config_dir, com_port, ue_list, dl_earfcn=632628, ext_app_count=0):
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, "nr-erc.cfg"), "w") as f:
+        f.write("{\n"
+                f'  log_filename: "{os.path.join(config_dir, "ue0.log")}",\n'
+                f'  com_addr: "[::]:{com_port}",\n'
+                f"  cell_groups: [{{ dl_nr_arfcn: {dl_earfcn} }}],\n"
+                "}\n")
+    with open(os.path.join(config_dir, "users-scenario.cfg"), "w") as f:
+        json.dump({"ue_list": ue_list}, f)
+    schedule = {"run_length": 5, "ext_app_count": ext_app_count, "internal_end_time": 0.5}
+    with open(os.path.join(config_dir, "schedule.json"), "w") as f:
+        json.dump(schedule, f)
+    return schedule
+
+
+def ping_ue(ue_id):
+    return {"ue_id": ue_id, "sim_events": [{"event": "power_on", "start_time": 0}]}
+
+
+def run_experiment(warm, config_dir, out_dir, schedule):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, name)
+             for name in ("expect_trace.log", "ue0.log", "exp.log")}
+    warm.run(config_dir, paths["expect_trace.log"], paths["ue0.log"], schedule,
+             paths["exp.log"], margin=5)
+    return paths
+
+
+@pytest.fixture
+def stub_env(monkeypatch):
+    monkeypatch.setenv("LTEUE_STUB_TIME_SCALE", "0.05")
+
+
+def test_warm_instance_reuse_and_cold_restart(tmp_path, stub_env):
+    # El API lo sirve el test: el stub no puede abrir el puerto y lo desactiva
+    api = MockRemoteAPI("127.0.0.1", 0).start()
+    warm = WarmLteue(str(tmp_path / "instance"), LTEUE_STUB, start_timeout=10, grace=0.1)
+    try:
+        config_a = str(tmp_path / "exp_a")
+        schedule = write_config(config_a, api.port, [ping_ue(1), ping_ue(2)])
+        assert warm.ensure(config_a) is True
+        pid = warm.proc.pid
+
+        paths = run_experiment(warm, config_a, str(tmp_path / "out_a"), schedule)
+        names = [m["message"] for m in api.messages]
+        assert names == ["ue_add", "ue_del"]
+        assert [ue["ue_id"] for ue in api.messages[0]["list"]] == [1, 2]
+        assert api.messages[1]["ue_id"] == [1, 2]
+        assert api.ues == {}
+        with open(paths["exp.log"]) as f:
+            assert "reusing warm lteue" in f.read()
+        with open(paths["expect_trace.log"]) as f:
+            trace = f.read()
+        assert "[Expect] milestone traffic_done" in trace
+        assert "All UE traffic finished" in trace
+
+        # Misma radio, otro log_filename: se reutiliza la instancia
+        config_b = str(tmp_path / "exp_b")
+        write_config(config_b, api.port, [ping_ue(3)])
+        assert warm.ensure(config_b) is False
+        assert warm.proc.pid == pid
+
+        # Cambio de radio: arranque en frío
+        config_c = str(tmp_path / "exp_c")
+        schedule = write_config(config_c, api.port, [ping_ue(4)], dl_earfcn=640000)
+        paths = run_experiment(warm, config_c, str(tmp_path / "out_c"), schedule)
+        assert warm.proc.pid != pid
+        with open(paths["exp.log"]) as f:
+            assert "warm lteue started" in f.read()
+        assert [m["message"] for m in api.messages[2:]] == ["ue_add", "ue_del"]
+        assert api.messages[2]["list"][0]["ue_id"] == 4
+    finally:
+        warm.stop()
+        api.stop()
+
+
+def test_experiment_traffic_on_stub_api(tmp_path, stub_env):
+    # El stub sirve su propio API y arranca el tráfico de los UEs añadidos
+    probe = MockRemoteAPI("127.0.0.1", 0)
+    port = probe.port
+    probe.server.server_close()
+    warm = WarmLteue(str(tmp_path / "instance"), LTEUE_STUB, start_timeout=10, grace=0.1)
+    try:
+        config_dir = str(tmp_path / "exp")
+        ue = {"ue_id": 1, "sim_events": [
+            {"event": "ext_app", "start_time": 1, "end_time": 3,
+             "args": ["iperf3", "-c", "10.45.0.1", "-u", "-b", "1M", "-t", "2", "-J"]}]}
+        schedule = write_config(config_dir, port, [ue], ext_app_count=1)
+        paths = run_experiment(warm, config_dir, str(tmp_path / "out"), schedule)
+
+        with open(paths["expect_trace.log"]) as f:
+            trace = f.read()
+        assert "All UE traffic finished" in trace
+        assert '"connecting_to"' in trace
+        with open(paths["ue0.log"]) as f:
+            assert "> 10.45.0.1:5201 UDP" in f.read()
+        assert warm.api.request("ue_get")["ue_list"] == []
+    finally:
+        warm.stop()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Requested vs. achieved throughput per iperf3 flow, computed while the
+packets stream by (no second pass over the CSV, no pandas).
+
+ThroughputCheck parses the iperf3 commands of request.json once
+(request_validator.parse_iperf_command) and keeps, for every requested
+flow, a fixed array of bytes per second sized from the command duration
+(-t, or the entry "duration") plus a margin. A flow is its server
+(ip, port), as in batch_scheduler.py: several clients may use the default
+port 5201 against different servers. A packet belongs to the flow of its
+destination (uplink) or, failing that, of its source (downlink, -R).
+data_extractor_v3.py feeds it every [IP] packet it extracts; at the end
+report() gives, per flow, the requested and achieved MBps and a pass/fail
+verdict:
+
+  pass  if |achieved - requested| <= tolerance * requested
+
+achieved is the bytes of the flow over its active span (first to last
+packet). Bytes are IP_Total_Length, or 1470 when a packet has none, as in
+validation_tests/throughput_bins.py. The per-second arrays give the worst
+full second and how many full seconds were within tolerance.
+
+Packets falling after the end of a flow's array (a run longer than
+requested) are still counted in the mean and reported as overflow.
+
+Usage: throughput_check.py <exp.csv> <request.json> [--tolerance FRACTION]
+"""
+import csv
+import sys
+import json
+import os
+from array import array
+
+from request_validator import parse_iperf_command
+
+PACKET_SIZE = 1470          # bytes, si el paquete no trae IP_Total_Length
+DEFAULT_TOLERANCE = 0.10    # fracción del throughput pedido
+IPERF_DEFAULT_TIME = 10     # s, -t de iperf3 por defecto
+MARGIN_S = 30               # s extra en cada array (arranque, colas)
+DAY_MS = 86400000
+
+
+def clock_ms(stamp):
+    """'HH:MM:SS.mmm' -> milliseconds since midnight (fixed-width stamps of ue0.log)."""
+    return (int(stamp[0:2]) * 3600000 + int(stamp[3:5]) * 60000 +
+            int(stamp[6:8]) * 1000 + int(stamp[9:12] or 0))
+
+
+def requested_flows(data):
+    """
+    (server ip, port) -> (requested bits/s, duration s) of the iperf3 client
+    commands of a request; commands to the same server and port add up.
+    """
+    flows = {}
+    for entry in data.get("commands", []):
+        command = entry.get("command", "")
+        if command.split()[:1] != ["iperf3"]:
+            continue
+        opts = parse_iperf_command(command)
+        if opts["client"] is None or opts["bitrate_bps"] is None:
+            continue
+        duration = opts.get("time") or entry.get("duration") or IPERF_DEFAULT_TIME
+        key = (opts["client"], opts["port"])
+        bps, longest = flows.get(key, (0.0, 0))
+        flows[key] = (bps + opts["bitrate_bps"], max(longest, int(duration)))
+    return flows
+
+
+class FlowSeconds:
+    """Bytes per second of one flow, in a fixed array starting at its first packet."""
+    def __init__(self, seconds):
+        self.bytes = array('q', bytes(8 * seconds))
+        self.first_ms = None        # inicio del segundo del primer paquete
+        self.start_ms = None
+        self.last_ms = None
+        self.packets = 0
+        self.total = 0
+        self.overflow = 0
+
+    def add(self, t_ms, size):
+        if self.first_ms is None:
+            self.first_ms = t_ms - t_ms % 1000
+            self.start_ms = t_ms
+        elif t_ms < self.first_ms - DAY_MS // 2:
+            # El reloj del log pasó por medianoche
+            t_ms += DAY_MS
+        self.last_ms = t_ms
+        self.packets += 1
+        self.total += size
+        slot = (t_ms - self.first_ms) // 1000
+        if slot < len(self.bytes):
+            self.bytes[slot] += size
+        else:
+            self.overflow += size
+
+
+class ThroughputCheck:
+    """Online requested-vs-achieved accumulator fed packet by packet."""
+    def __init__(self, flows, tolerance=DEFAULT_TOLERANCE):
+        self.flows = flows
+        self.tolerance = tolerance
+        self.seconds = {key: FlowSeconds(duration + MARGIN_S)
+                        for key, (_, duration) in flows.items()}
+
+    @classmethod
+    def from_request(cls, data, tolerance=DEFAULT_TOLERANCE):
+        return cls(requested_flows(data), tolerance)
+
+    def add(self, timestamp_log, src_ip, src_port, dst_ip, dst_port, ip_total_length=None):
+        """One packet: 'HH:MM:SS.mmm', its addresses and IP_Total_Length (or '' / None)."""
+        acc = self.seconds.get((dst_ip, int(dst_port)))
+        if acc is None:
+            acc = self.seconds.get((src_ip, int(src_port)))
+            if acc is None:
+                return
+        size = int(ip_total_length) if ip_total_length else PACKET_SIZE
+        acc.add(clock_ms(timestamp_log), size)
+
+    def flow_report(self, key):
+        bps, duration = self.flows[key]
+        acc = self.seconds[key]
+        requested = bps / 8 / 1e6
+        entry = {"server": key[0], "port": key[1], "requested_MBps": round(requested, 4),
+                 "duration_s": duration, "packets": acc.packets, "bytes": acc.total,
+                 "overflow_bytes": acc.overflow}
+        if acc.packets == 0:
+            entry.update(achieved_MBps=0.0, deviation=-1.0, verdict="fail",
+                         full_seconds=0, seconds_ok=0, worst_second_MBps=None)
+            return entry
+        span_s = max((acc.last_ms - acc.start_ms) / 1000, 1e-3)
+        achieved = acc.total / span_s / 1e6
+        deviation = (achieved - requested) / requested if requested else 0.0
+
+        # Segundos completos: sin el primero y el último (parciales)
+        last_slot = min((acc.last_ms - acc.first_ms) // 1000, len(acc.bytes) - 1)
+        full = acc.bytes[1:last_slot]
+        low = requested * (1 - self.tolerance) * 1e6
+        high = requested * (1 + self.tolerance) * 1e6
+        entry.update(achieved_MBps=round(achieved, 4), deviation=round(deviation, 4),
+                     verdict="pass" if abs(deviation) <= self.tolerance else "fail",
+                     full_seconds=len(full),
+                     seconds_ok=sum(1 for b in full if low <= b <= high),
+                     worst_second_MBps=round(min(full) / 1e6, 4) if full else None)
+        return entry
+
+    def report(self):
+        """{'tolerance', 'verdict', 'flows': [...]}; verdict is None without iperf3 flows."""
+        flows = [self.flow_report(key) for key in sorted(self.flows)]
+        verdict = None
+        if flows:
+            verdict = "pass" if all(f["verdict"] == "pass" for f in flows) else "fail"
+        return {"tolerance": self.tolerance, "verdict": verdict, "flows": flows}
+
+
+def summary_lines(report):
+    if report["verdict"] is None:
+        return ["Throughput check: no iperf3 flows with a bitrate in the request."]
+    lines = []
+    for p in report["flows"]:
+        lines.append(f"Flow {p['server']}:{p['port']}: requested {p['requested_MBps']:.3f} MBps, "
+                     f"achieved {p['achieved_MBps']:.3f} MBps ({p['deviation']:+.1%}), "
+                     f"{p['seconds_ok']}/{p['full_seconds']} full seconds within tolerance "
+                     f"-> {p['verdict'].upper()}")
+    lines.append(f"Throughput check (tolerance {report['tolerance']:.0%}): {report['verdict'].upper()}")
+    return lines
+
+
+def check_path(csv_file):
+    return os.path.splitext(csv_file)[0] + ".throughput_check.json"
+
+
+def save_report(path, report):
+    tmp = path + ".part"
+    with open(tmp, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    args = sys.argv[1:]
+    tolerance = DEFAULT_TOLERANCE
+    if "--tolerance" in args:
+        i = args.index("--tolerance")
+        try:
+            tolerance = float(args[i + 1])
+        except (IndexError, ValueError):
+            print("Error: --tolerance expects a fraction, e.g. 0.1")
+            sys.exit(1)
+        del args[i:i + 2]
+    if len(args) != 2:
+        print("Usage: python3 throughput_check.py <exp.csv> <request.json> [--tolerance FRACTION]")
+        sys.exit(1)
+    csv_file, json_file = args
+
+    try:
+        with open(json_file) as f:
+            check = ThroughputCheck.from_request(json.load(f), tolerance)
+    except (OSError, ValueError) as e:
+        print(f"Error reading request: {e}")
+        sys.exit(1)
+
+    with open(csv_file, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        cols = [header.index(c) for c in ("Timestamp_log", "Source IP", "Source Port",
+                                          "Destination IP", "Destination Port")]
+        len_col = header.index("IP_Total_Length") if "IP_Total_Length" in header else None
+        for row in reader:
+            check.add(*(row[c] for c in cols), row[len_col] if len_col is not None else None)
+
+    report = check.report()
+    save_report(check_path(csv_file), report)
+    print("\n".join(summary_lines(report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Per-experiment timing and resource timeline (timeline.json).
+
+Every pipeline stage appends one record with:
+  - monotonic start/end and duration, plus the wall-clock start
+  - user/system CPU time of the stage thread and of its child processes
+  - peak RSS of the child processes (KiB)
+  - bytes read and written (rchar/wchar of /proc/<pid>/io for children and
+    /proc/thread-self/io for work done in-process)
+  - status: done, failed or skipped (up to date in the manifest)
+
+Child usage is collected per process with wait4(), so stages running
+concurrently in different threads (pipelined_runner.py) do not mix.
+Milestones of the radio run are parsed from its trace: SDR init time
+reported by lteue ("/dev/sdr0 initialized (12s)") and the "[Expect]
+milestone <name> <epoch ms>" lines written by the runner (pty_runner.py,
+warm_lteue.py), which also collects them while the run is going on.
+
+Usage:
+  timeline.py exec <exp_dir> <stage> -- <command> [args...]
+  timeline.py milestones <exp_dir> <expect_trace.log>
+  timeline.py report [--json] <dir> [<dir> ...]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+import threading
+import subprocess
+from datetime import datetime
+from contextlib import contextmanager
+
+TIMELINE_NAME = "timeline.json"
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+milestone_pattern = re.compile(r"\[Expect\] milestone (\w+) (\d+)")
+sdr_init_pattern = re.compile(r"(/dev/\S+) initialized \((\d+)s\)")
+
+
+# -------------- Resource usage --------------
+def _read_io(path):
+    """rchar/wchar of a /proc io file ({} if not available)."""
+    try:
+        with open(path, "r") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except (OSError, ValueError):
+        return {}
+
+
+def _thread_usage():
+    who = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+    ru = resource.getrusage(who)
+    io = _read_io("/proc/thread-self/io")
+    return ru.ru_utime, ru.ru_stime, io.get("rchar", 0), io.get("wchar", 0)
+
+
+def wait_child(proc):
+    """
+    Reaps a subprocess.Popen child with wait4() and adds its CPU time, peak
+    RSS and I/O to the stage running in this thread. Returns the exit code.
+    """
+    io = {}
+    try:
+        # Esperar sin recoger al hijo para poder leer su /proc/<pid>/io
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        io = _read_io(f"/proc/{proc.pid}/io")
+    except (OSError, AttributeError):
+        pass
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["children"] += 1
+        record["cpu_user_s"] += ru.ru_utime
+        record["cpu_sys_s"] += ru.ru_stime
+        record["max_rss_kb"] = max(record["max_rss_kb"], ru.ru_maxrss)
+        record["bytes_read"] += io.get("rchar", 0)
+        record["bytes_written"] += io.get("wchar", 0)
+    return proc.returncode
+
+
+def add_io(bytes_read, bytes_written):
+    """
+    Adds I/O done on behalf of the current stage by other threads (e.g. the
+    archiver's pool), which /proc/thread-self/io does not see.
+    """
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["bytes_read"] += bytes_read
+        record["bytes_written"] += bytes_written
+
+
+# -------------- Timeline file --------------
+def load(exp_dir):
+    path = os.path.join(exp_dir, TIMELINE_NAME)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": [], "milestones": []}
+
+
+def _update(exp_dir, fn):
+    with _file_lock:
+        data = load(exp_dir)
+        fn(data)
+        path = os.path.join(exp_dir, TIMELINE_NAME)
+        tmp = path + ".part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+
+
+def record_skipped(exp_dir, name):
+    now = time.monotonic()
+    _update(exp_dir, lambda data: data["stages"].append({
+        "name": name, "status": "skipped", "started": datetime.now().isoformat(),
+        "start_mono": now, "end_mono": now, "duration_s": 0.0}))
+
+
+@contextmanager
+def stage(exp_dir, name):
+    """Records the block as one stage of the experiment's timeline."""
+    record = {"name": name, "status": "done",
+              "started": datetime.now().isoformat(), "start_mono": time.monotonic(),
+              "end_mono": None, "duration_s": None, "children": 0,
+              "cpu_user_s": 0.0, "cpu_sys_s": 0.0, "max_rss_kb": 0,
+              "bytes_read": 0, "bytes_written": 0}
+    previous = getattr(_local, "record", None)
+    _local.record = record
+    u0 = _thread_usage()
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "failed"
+        raise
+    finally:
+        u1 = _thread_usage()
+        _local.record = previous
+        record["end_mono"] = time.monotonic()
+        record["duration_s"] = round(record["end_mono"] - record["start_mono"], 6)
+        record["cpu_user_s"] = round(record["cpu_user_s"] + u1[0] - u0[0], 6)
+        record["cpu_sys_s"] = round(record["cpu_sys_s"] + u1[1] - u0[1], 6)
+        record["bytes_read"] += u1[2] - u0[2]
+        record["bytes_written"] += u1[3] - u0[3]
+        if os.path.isdir(exp_dir):
+            _update(exp_dir, lambda data: data["stages"].append(record))
+
+
+# -------------- Milestones --------------
+def milestone_from_line(line):
+    """The milestone a trace line reports, or None."""
+    m = milestone_pattern.search(line)
+    if m:
+        return {"name": m.group(1), "wall_ms": int(m.group(2))}
+    m = sdr_init_pattern.search(line)
+    if m:
+        return {"name": "sdr_init", "device": m.group(1), "value_s": int(m.group(2))}
+    return None
+
+
+def parse_milestones(expect_log):
+    """Milestones of a radio run found in its expect trace."""
+    milestones = []
+    with open(expect_log, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = milestone_from_line(line)
+            if m:
+                milestones.append(m)
+    return milestones
+
+
+def record_milestones(exp_dir, expect_log=None, milestones=None):
+    """Stores the milestones given, or those parsed from expect_log."""
+    if milestones is None:
+        milestones = parse_milestones(expect_log)
+    _update(exp_dir, lambda data: data.update(milestones=milestones))
+    return milestones
+
+
+def milestone_intervals(milestones):
+    """Derived durations (s): sdr_init, time_to_sib, traffic, shutdown."""
+    wall = {m["name"]: m["wall_ms"] for m in milestones if "wall_ms" in m}
+    out = {}
+    for m in milestones:
+        if m["name"] == "sdr_init":
+            out["sdr_init"] = max(out.get("sdr_init", 0), m["value_s"])
+    for name, start, end in (("time_to_sib", "spawn", "sib_found"),
+                             ("traffic", "sib_found", "traffic_done"),
+                             ("shutdown", "traffic_done", "terminate")):
+        if start in wall and end in wall:
+            out[name] = (wall[end] - wall[start]) / 1000.0
+    return out
+
+
+# -------------- Aggregate report --------------
+def find_timelines(paths):
+    found = []
+    for path in paths:
+        if os.path.isfile(os.path.join(path, TIMELINE_NAME)):
+            found.append(path)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.isfile(os.path.join(path, name, TIMELINE_NAME)):
+                    found.append(os.path.join(path, name))
+    return found
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def aggregate(exp_dirs):
+    """
+    Per-stage and per-milestone statistics over several experiments. Stages
+    are sorted by total time, so the first one is the one to attack first.
+    """
+    per_stage = {}
+    per_milestone = {}
+    for exp_dir in exp_dirs:
+        data = load(exp_dir)
+        for rec in data["stages"]:
+            if rec["status"] == "skipped":
+                continue
+            per_stage.setdefault(rec["name"], []).append(rec)
+        for name, value in milestone_intervals(data.get("milestones", [])).items():
+            per_milestone.setdefault(name, []).append(value)
+
+    total = sum(rec["duration_s"] for recs in per_stage.values() for rec in recs) or 1.0
+    stages = []
+    for name, recs in per_stage.items():
+        durations = [rec["duration_s"] for rec in recs]
+        stages.append({
+            "stage": name,
+            "runs": len(recs),
+            "failed": sum(rec["status"] == "failed" for rec in recs),
+            "total_s": round(sum(durations), 3),
+            "share": round(sum(durations) / total, 4),
+            "mean_s": round(sum(durations) / len(durations), 3),
+            "p50_s": round(_percentile(durations, 0.5), 3),
+            "p95_s": round(_percentile(durations, 0.95), 3),
+            "cpu_s": round(sum(rec["cpu_user_s"] + rec["cpu_sys_s"] for rec in recs) / len(recs), 3),
+            "max_rss_kb": max(rec["max_rss_kb"] for rec in recs),
+            "read_mb": round(sum(rec["bytes_read"] for rec in recs) / len(recs) / 1e6, 2),
+            "written_mb": round(sum(rec["bytes_written"] for rec in recs) / len(recs) / 1e6, 2),
+        })
+    stages.sort(key=lambda s: s["total_s"], reverse=True)
+
+    milestones = {name: {"n": len(values),
+                         "mean_s": round(sum(values) / len(values), 3),
+                         "p95_s": round(_percentile(values, 0.95), 3)}
+                  for name, values in per_milestone.items()}
+    return {"experiments": len(exp_dirs), "stages": stages, "milestones": milestones}
+
+
+def print_report(report):
+    print(f"{report['experiments']} experiment(s)\n")
+    print(f"{'stage':10s} {'runs':>5s} {'fail':>4s} {'total s':>9s} {'share':>6s} {'mean s':>8s} "
+          f"{'p95 s':>8s} {'cpu s':>7s} {'rss MB':>7s} {'read MB':>8s} {'write MB':>8s}")
+    for s in report["stages"]:
+        print(f"{s['stage']:10s} {s['runs']:5d} {s['failed']:4d} {s['total_s']:9.1f} "
+              f"{s['share'] * 100:5.1f}% {s['mean_s']:8.2f} {s['p95_s']:8.2f} {s['cpu_s']:7.2f} "
+              f"{s['max_rss_kb'] / 1024:7.1f} {s['read_mb']:8.1f} {s['written_mb']:8.1f}")
+    if report["milestones"]:
+        print()
+        for name, m in report["milestones"].items():
+            print(f"{name:12s} mean {m['mean_s']:7.2f} s   p95 {m['p95_s']:7.2f} s   (n={m['n']})")
+
+
+# -------------- CLI --------------
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "exec":
+        # timeline.py exec <exp_dir> <stage> -- cmd...
+        if len(sys.argv) < 6 or sys.argv[4] != "--":
+            print("Usage: timeline.py exec <exp_dir> <stage> -- <command> [args...]")
+            sys.exit(1)
+        exp_dir, name, cmd = sys.argv[2], sys.argv[3], sys.argv[5:]
+        code = 1
+        try:
+            with stage(exp_dir, name) as record:
+                proc = subprocess.Popen(cmd)
+                code = wait_child(proc)
+                if code != 0:
+                    record["status"] = "failed"
+        except OSError as e:
+            print(f"Error running {cmd[0]}: {e}")
+        sys.exit(code)
+
+    parser = argparse.ArgumentParser(description="Experiment timelines")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("milestones", help="parse milestones from an expect trace")
+    p.add_argument("exp_dir")
+    p.add_argument("expect_log")
+    p = sub.add_parser("report", help="aggregate report over experiments")
+    p.add_argument("dirs", nargs="+")
+    p.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.cmd == "milestones":
+        if not os.path.isfile(args.expect_log):
+            print(f"Error: '{args.expect_log}' not found.")
+            sys.exit(1)
+        for m in record_milestones(args.exp_dir, args.expect_log):
+            print(m)
+        return
+
+    exp_dirs = find_timelines(args.dirs)
+    if not exp_dirs:
+        print("Error: no timeline.json found.")
+        sys.exit(1)
+    report = aggregate(exp_dirs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Parser for the UE statistics table lteue prints once per second after 't':
+
+  ----------------------Hz---ppm----dB----dBm------------DL---------- ---------UL-
+  UE_ID  RAT CL RNTI   CFO   SRO  SINR   RSRP  mcs retx rxko rxok brate     #its  mcs  ta retx   tx brate
+      1   NR 00 5501   400   0.1  33.4  -95.8 20.0    0    0    1  477k  1/1.0/1 12.8  84    1    7 4.29M
+
+Column names come from the header line. Names that appear twice (mcs,
+retx, brate) are the DL and then the UL column and get a dl_/ul_ prefix;
+'#' is dropped. Numbers are parsed, bit rates with their k/M/G suffix are
+converted to bit/s, and anything else (e.g. "1/1.0/1") is kept as a string,
+as are RAT, CL and the hexadecimal RNTI.
+
+StatsTableParser is fed lines as they arrive (pty_runner.py) and calls
+on_row(row) for every table row, with time_ms = clock() (by default the
+wall-clock time in ms when the row was parsed; the trace itself has no
+timestamps, so rows parsed from a finished trace have none).
+
+Usage: ue_stats.py <expect_trace.log> <ue_stats.csv>
+"""
+import os
+import re
+import sys
+import csv
+import time
+
+header_pattern = re.compile(r"^\s*UE_ID\s")
+rate_pattern = re.compile(r"^(-?\d+(?:\.\d+)?)([kMG])$")
+RATE_SCALE = {"k": 1e3, "M": 1e6, "G": 1e9}
+# Columnas que no son números (RNTI en hexadecimal, índice de celda "00")
+STRING_COLUMNS = {"rat", "cl", "rnti"}
+
+
+def parse_value(token):
+    """'20.0' -> 20.0, '477k' -> 477000.0, '-' -> None, '1/1.0/1' -> '1/1.0/1'."""
+    if token == "-":
+        return None
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    m = rate_pattern.match(token)
+    if m:
+        return float(m.group(1)) * RATE_SCALE[m.group(2)]
+    return token
+
+
+def wall_ms():
+    return int(time.time() * 1000)
+
+
+def column_names(header):
+    """Header line -> column names, with dl_/ul_ for the repeated ones."""
+    tokens = [t.lstrip("#").lower() for t in header.split()]
+    repeated = {t for t in tokens if tokens.count(t) > 1}
+    seen = {}
+    names = []
+    for t in tokens:
+        if t in repeated:
+            seen[t] = seen.get(t, 0) + 1
+            names.append(("dl_" if seen[t] == 1 else "ul_") + t)
+        else:
+            names.append(t)
+    return names
+
+
+class StatsTableParser:
+    def __init__(self, on_row, clock=wall_ms):
+        self.on_row = on_row
+        self.clock = clock
+        self.columns = None
+        self.rows = 0
+
+    def feed(self, line):
+        if header_pattern.match(line):
+            self.columns = column_names(line)
+            return
+        if self.columns is None:
+            return
+        tokens = line.split()
+        # Una fila tiene tantos campos como la cabecera y empieza por el UE_ID
+        if len(tokens) != len(self.columns) or not tokens[0].isdigit():
+            if tokens and not tokens[0].isdigit():
+                self.columns = None
+            return
+        row = {"time_ms": self.clock()}
+        for name, token in zip(self.columns, tokens):
+            row[name] = token if name in STRING_COLUMNS else parse_value(token)
+        self.rows += 1
+        self.on_row(row)
+
+
+class StatsCsvWriter:
+    """on_row sink writing the rows to a CSV; the columns are fixed by the first row."""
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = None
+
+    def __call__(self, row):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(row), extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python3 ue_stats.py <expect_trace.log> <ue_stats.csv>")
+        sys.exit(1)
+    if not os.path.isfile(sys.argv[1]):
+        print(f"Error: input file '{sys.argv[1]}' not found.")
+        sys.exit(1)
+    writer = StatsCsvWriter(sys.argv[2])
+    parser = StatsTableParser(writer, clock=lambda: None)
+    with open(sys.argv[1], "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parser.feed(line)
+    writer.close()
+    print(f"{parser.rows} row(s) saved to {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Catalog of experiments and their KPIs (SQLite), for sweep analysis over
+many runs without re-reading every request.json and CSV.
+
+Tables:
+  experiments  one row per experiment: radio_config and channel_params
+               fields as columns, the whole request.json (for json_extract),
+               packets, duration and the keys of the files it came from
+  commands     the commands of the request; for iperf3 clients the server
+               ip, port (5201 without -p) and requested MBps
+  port_kpis    per flow, i.e. server (destination ip) and 52XX port, as in
+               throughput_check.py: requested MBps, mean and p5/p50/p95
+               MBps over 1 s bins (throughput_bins.py, as validationv4.py),
+               loss from gaps in the iperf sequence numbers, and jitter and
+               lost packets from the iperf3 -J report in json.log
+  mcs          packets per MCS value (MCS in force when each packet was sent)
+  flow_sketches  per flow and metric (latency_ms, throughput_MBps): the
+               quantile sketch the extractor wrote to <exp>.sketches.json
+               (quantile_sketch.py), as JSON
+  port_summary view joining experiments and port_kpis (one row per flow)
+
+quantiles() merges the sketches of every flow matching a condition, per
+group (e.g. per bandwidth or per port), so latency and throughput
+percentiles across UEs and experiments come from the sketches alone.
+
+Ingest is incremental: an experiment is re-read only when its CSV,
+request.json, json.log or sketches changed (size, mtime and SHA-256, as
+the cache of validationv4.py). A catalog written with an older schema is
+migrated on open: its KPI tables are rebuilt and every experiment is
+re-read on the next ingest.
+
+Example: mean throughput vs requested for 100 MHz runs with channel_sim
+  catalog.py query "SELECT exp_id, server, port, mean_mbps, requested_mbps FROM port_summary
+                    WHERE bandwidth = 100 AND channel_sim = 1"
+
+Usage:
+  catalog.py ingest [--db FILE] <dir> [<dir> ...]   (experiment dirs or dirs of them)
+  catalog.py query [--db FILE] "<SQL>" [--param V ...]
+  catalog.py sweep [--db FILE] [--where "<SQL condition>"]
+  catalog.py quantiles [--db FILE] [--metric latency_ms|throughput_MBps]
+                       [--where "<SQL condition>"] [--by COLUMN]
+"""
+import os
+import sys
+import csv
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from throughput_bins import CSV_COLUMNS, USER_PORTS, clock_ms, packet_sizes, throughput_bins
+from validationv4 import file_key
+
+# quantile_sketch.py y throughput_check.py viven junto al extractor, un nivel por encima
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantile_sketch import METRICS, QUANTILES, QuantileSketch, load_flows, merge_all
+from request_validator import parse_iperf_command
+from throughput_check import requested_flows
+
+DEFAULT_DB = '/root/Desktop/validation_tests/catalog.sqlite'
+PERCENTILES = (5, 50, 95)
+KPI_COLUMNS = CSV_COLUMNS + ('Destination IP', 'Sequence_num_iperf', 'MCS')
+SCHEMA_VERSION = 2      # 2: commands y port_kpis por (server, port)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    exp_id TEXT PRIMARY KEY,
+    path TEXT,
+    cell_name TEXT, band TEXT, arfcn INTEGER, ssb_nr_arfcn INTEGER, plmn INTEGER,
+    bandwidth REAL, subcarrier_spacing REAL, tx_gain REAL, rx_gain REAL,
+    channel_sim INTEGER, channel_type TEXT, speed REAL,
+    min_distance REAL, max_distance REAL, noise_spd REAL,
+    n_commands INTEGER, packets INTEGER, duration_s REAL,
+    request TEXT,
+    sources TEXT,
+    ingested TEXT
+);
+CREATE TABLE IF NOT EXISTS commands (
+    exp_id TEXT, idx INTEGER, command TEXT, server TEXT, port INTEGER,
+    requested_mbps REAL, duration REAL,
+    PRIMARY KEY (exp_id, idx)
+);
+CREATE TABLE IF NOT EXISTS port_kpis (
+    exp_id TEXT, server TEXT, port INTEGER,
+    requested_mbps REAL, mean_mbps REAL, p5_mbps REAL, p50_mbps REAL, p95_mbps REAL,
+    packets INTEGER, bytes INTEGER,
+    seq_expected INTEGER, seq_received INTEGER, loss_pct REAL,
+    jitter_ms REAL, iperf_lost_packets INTEGER,
+    PRIMARY KEY (exp_id, server, port)
+);
+CREATE TABLE IF NOT EXISTS mcs (
+    exp_id TEXT, mcs INTEGER, packets INTEGER,
+    PRIMARY KEY (exp_id, mcs)
+);
+CREATE TABLE IF NOT EXISTS flow_sketches (
+    exp_id TEXT, src_ip TEXT, src_port INTEGER, dst_ip TEXT, dst_port INTEGER,
+    metric TEXT, count INTEGER, sketch TEXT,
+    PRIMARY KEY (exp_id, src_ip, src_port, dst_ip, dst_port, metric)
+);
+CREATE VIEW IF NOT EXISTS port_summary AS
+    SELECT e.exp_id, e.cell_name, e.band, e.bandwidth, e.subcarrier_spacing,
+           e.tx_gain, e.rx_gain, e.channel_sim, e.channel_type, e.speed,
+           k.server, k.port, k.requested_mbps, k.mean_mbps, k.p5_mbps, k.p50_mbps, k.p95_mbps,
+           k.mean_mbps / k.requested_mbps AS achieved_ratio,
+           k.packets, k.loss_pct, k.jitter_ms
+    FROM experiments e JOIN port_kpis k ON k.exp_id = e.exp_id;
+"""
+
+
+# -------------- KPIs --------------
+def iperf_reports(json_log):
+    """(server, port) -> (jitter_ms, lost_packets) of the iperf3 -J reports in json.log."""
+    out = {}
+    if not os.path.isfile(json_log):
+        return out
+    try:
+        with open(json_log, 'r', encoding='utf-8') as f:
+            reports = json.load(f)
+    except (OSError, ValueError):
+        return out
+    if isinstance(reports, dict):
+        reports = [reports]
+    for rep in reports:
+        if not isinstance(rep, dict):
+            continue
+        to = rep.get('start', {}).get('connecting_to', {})
+        end = rep.get('end', {})
+        total = end.get('sum') or end.get('sum_received') or {}
+        if to.get('port') is not None:
+            out[(str(to.get('host')), int(to['port']))] = (total.get('jitter_ms'),
+                                                          total.get('lost_packets'))
+    return out
+
+
+def requested_mbps(request):
+    """(server, port) -> requested MBps of the iperf3 clients of a request (throughput_check.py)."""
+    try:
+        flows = requested_flows(request)
+    except ValueError:
+        return {}
+    return {key: bps / 8 / 1e6 for key, (bps, _) in flows.items()}
+
+
+def command_flow(text):
+    """(server, port, requested MBps) of an iperf3 client command, Nones otherwise."""
+    if text.split()[:1] != ['iperf3']:
+        return None, None, None
+    try:
+        opts = parse_iperf_command(text)
+    except ValueError:
+        return None, None, None
+    if opts['client'] is None:
+        return None, None, None
+    bps = opts['bitrate_bps']
+    return opts['client'], opts['port'], bps / 8 / 1e6 if bps is not None else None
+
+
+def experiment_kpis(csv_file):
+    """
+    ({(server, port): KPI dict}, {mcs: packets}, packets, duration_s) of an
+    extracted CSV. A flow is the destination ip and 52XX port of a packet.
+    """
+    df = pd.read_csv(csv_file, usecols=lambda c: c in KPI_COLUMNS)
+    ports = pd.to_numeric(df['Destination Port'], errors='coerce').fillna(-1).to_numpy(np.int64)
+    servers = (df['Destination IP'].astype(str).to_numpy() if 'Destination IP' in df
+               else np.full(len(df), ''))
+    t_ms = clock_ms(df['Timestamp_log'].to_numpy())
+
+    # Índice denso de flujo (server, port): throughput_bins lo trata como un puerto
+    user = (ports >= USER_PORTS[0]) & (ports <= USER_PORTS[1])
+    codes, flow_keys = pd.MultiIndex.from_arrays([servers[user], ports[user]]).factorize()
+    flows = np.full(len(df), -1, dtype=np.int64)
+    flows[user] = codes
+    res = throughput_bins(t_ms, flows, packet_sizes(df), port_range=(0, len(flow_keys) - 1))
+
+    mb = np.where(res.active_mask(), res.mbytes_per_s, np.nan)
+    with np.errstate(invalid='ignore'):
+        pct = (np.nanpercentile(mb, PERCENTILES, axis=1) if mb.size
+               else np.full((len(PERCENTILES), res.ports.size), np.nan))
+    means = res.mean_mbps()
+    kpis = {}
+    for i, code in enumerate(res.ports):
+        kpis[int(code)] = {'mean_mbps': float(means[i]),
+                           'p5_mbps': float(pct[0, i]), 'p50_mbps': float(pct[1, i]),
+                           'p95_mbps': float(pct[2, i]),
+                           'packets': int(res.packets[i].sum()), 'bytes': int(res.bytes[i].sum())}
+
+    # Pérdidas por huecos en los números de secuencia de iperf
+    if 'Sequence_num_iperf' in df:
+        seq = pd.DataFrame({'flow': flows,
+                            'seq': pd.to_numeric(df['Sequence_num_iperf'], errors='coerce')})
+        seq = seq[seq['flow'].isin(res.ports)].dropna()
+        for code, g in seq.groupby('flow')['seq'].agg(['min', 'max', 'nunique']).iterrows():
+            expected = int(g['max'] - g['min'] + 1)
+            kpis[int(code)].update(seq_expected=expected, seq_received=int(g['nunique']),
+                                   loss_pct=100.0 * (1 - g['nunique'] / expected))
+
+    mcs = {}
+    if 'MCS' in df:
+        values = pd.to_numeric(df['MCS'], errors='coerce').dropna().to_numpy(np.int64)
+        counts = np.bincount(values[values >= 0]) if values.size else np.zeros(0, dtype=np.int64)
+        mcs = {int(m): int(n) for m, n in enumerate(counts) if n}
+    duration_s = float(t_ms.max() - t_ms.min()) / 1000.0 if t_ms.size else 0.0
+    kpis = {(str(flow_keys[code][0]), int(flow_keys[code][1])): k for code, k in kpis.items()}
+    return kpis, mcs, len(df), duration_s
+
+
+# -------------- Catalog --------------
+def experiment_files(exp_dir):
+    exp = os.path.basename(os.path.normpath(exp_dir))
+    return {'csv': os.path.join(exp_dir, f'{exp}.csv'),
+            'request': os.path.join(exp_dir, 'request.json'),
+            'json_log': os.path.join(exp_dir, 'json.log'),
+            'sketches': os.path.join(exp_dir, f'{exp}.sketches.json')}
+
+
+def same_sources(a, b):
+    if set(a) != set(b):
+        return False
+    for name in a:
+        if (a[name] is None) != (b[name] is None):
+            return False
+        if a[name] is not None and (a[name]['size'], a[name]['sha256']) != (b[name]['size'], b[name]['sha256']):
+            return False
+    return True
+
+
+class Catalog:
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self._migrate()
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate(self):
+        """Rebuilds the tables whose key changed; their experiments are re-read on the next ingest."""
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        has_tables = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'experiments'").fetchone()
+        if version >= SCHEMA_VERSION or not has_tables:
+            return
+        with self.db:
+            self.db.execute("DROP VIEW IF EXISTS port_summary")
+            self.db.execute("DROP TABLE IF EXISTS commands")
+            self.db.execute("DROP TABLE IF EXISTS port_kpis")
+            self.db.execute("UPDATE experiments SET sources = '{}'")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------- Ingest --------------
+    def ingest(self, exp_dir, force=False):
+        """
+        Adds or refreshes one experiment directory (<exp>/<exp>.csv).
+        Returns 'added', 'updated', 'unchanged' or 'skipped' (no CSV).
+        """
+        exp_dir = os.path.abspath(exp_dir)
+        exp = os.path.basename(exp_dir)
+        files = experiment_files(exp_dir)
+        if not os.path.isfile(files['csv']):
+            return 'skipped'
+        row = self.db.execute("SELECT sources FROM experiments WHERE exp_id = ?", (exp,)).fetchone()
+        old = json.loads(row['sources']) if row else {}
+        sources = {name: file_key(path, old.get(name)) for name, path in files.items()}
+        if row and not force and same_sources(sources, old):
+            if sources != old:
+                # Sólo cambió el mtime
+                with self.db:
+                    self.db.execute("UPDATE experiments SET sources = ? WHERE exp_id = ?",
+                                    (json.dumps(sources), exp))
+            return 'unchanged'
+
+        request = {}
+        if sources['request']:
+            with open(files['request'], 'r', encoding='utf-8') as f:
+                request = json.load(f)
+        radio = request.get('radio_config', {})
+        channel = request.get('channel_params', {})
+        requested = requested_mbps(request)
+        kpis, mcs, packets, duration_s = experiment_kpis(files['csv'])
+        iperf = iperf_reports(files['json_log'])
+        flows = []
+        if sources['sketches']:
+            try:
+                flows = load_flows(files['sketches'])
+            except (ValueError, KeyError):
+                flows = []
+
+        with self.db:
+            for table in ('experiments', 'commands', 'port_kpis', 'mcs', 'flow_sketches'):
+                self.db.execute(f"DELETE FROM {table} WHERE exp_id = ?", (exp,))
+            self.db.execute(
+                "INSERT INTO experiments VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                (exp, exp_dir, radio.get('cell_name'), radio.get('band'), radio.get('arfcn'),
+                 radio.get('ssb_nr_arfcn'), radio.get('plmn'), radio.get('bandwidth'),
+                 radio.get('subcarrier_spacing'), radio.get('tx_gain'), radio.get('rx_gain'),
+                 int(bool(request.get('channel_sim'))), channel.get('channel', {}).get('type'),
+                 channel.get('speed'), channel.get('min_distance'), channel.get('max_distance'),
+                 channel.get('noise_spd'), len(request.get('commands', [])), packets, duration_s,
+                 json.dumps(request), json.dumps(sources),
+                 datetime.now().isoformat(timespec='seconds')))
+            for idx, cmd in enumerate(request.get('commands', [])):
+                text = cmd.get('command', '')
+                server, port, mbps = command_flow(text)
+                self.db.execute("INSERT INTO commands VALUES (?,?,?,?,?,?,?)",
+                                (exp, idx, text, server, port, mbps, cmd.get('duration')))
+            for (server, port), k in kpis.items():
+                jitter, lost = iperf.get((server, port), (None, None))
+                self.db.execute(
+                    "INSERT INTO port_kpis VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                    (exp, server, port, requested.get((server, port)), k['mean_mbps'], k['p5_mbps'], k['p50_mbps'],
+                     k['p95_mbps'], k['packets'], k['bytes'], k.get('seq_expected'),
+                     k.get('seq_received'), k.get('loss_pct'), jitter, lost))
+            self.db.executemany("INSERT INTO mcs VALUES (?,?,?)",
+                                [(exp, m, n) for m, n in mcs.items()])
+            self.db.executemany(
+                "INSERT INTO flow_sketches VALUES (?,?,?,?,?,?,?,?)",
+                [(exp, f['src_ip'], f['src_port'], f['dst_ip'], f['dst_port'], m,
+                  f[m].count, json.dumps(f[m].to_dict())) for f in flows for m in METRICS])
+        return 'updated' if row else 'added'
+
+    def ingest_tree(self, root, force=False):
+        """Ingests root if it is an experiment directory, else each of its subdirectories."""
+        dirs = [root] if os.path.isfile(experiment_files(root)['csv']) else sorted(
+            os.path.join(root, d) for d in os.listdir(root)
+            if os.path.isdir(os.path.join(root, d)))
+        counts = {}
+        for d in dirs:
+            status = self.ingest(d, force)
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    # -------------- Queries --------------
+    def query(self, sql, params=()):
+        """Runs a SELECT and returns the rows as dicts."""
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def sweep(self, where=None, params=()):
+        """Per experiment: total achieved vs requested MBps, with the radio fields."""
+        sql = ("SELECT exp_id, bandwidth, subcarrier_spacing, tx_gain, channel_sim, channel_type, speed, "
+               "COUNT(port) AS users, SUM(mean_mbps) AS mean_mbps, SUM(requested_mbps) AS requested_mbps, "
+               "AVG(loss_pct) AS loss_pct, AVG(jitter_ms) AS jitter_ms FROM port_summary")
+        if where:
+            sql += f" WHERE {where}"
+        sql += " GROUP BY exp_id ORDER BY bandwidth, tx_gain, exp_id"
+        return self.query(sql, params)
+
+    def quantiles(self, metric='latency_ms', where=None, params=(), by=None, qs=QUANTILES):
+        """
+        Merges the flow sketches of metric that match where (columns of
+        experiments and flow_sketches) into one sketch per value of by
+        (a column, e.g. 'bandwidth' or 'dst_port'; None for a single group).
+        Returns one dict per group with count, mean, max and the quantiles.
+        """
+        group = by or "'all'"
+        sql = (f"SELECT {group} AS grp, sketch FROM flow_sketches JOIN experiments USING (exp_id) "
+               "WHERE metric = ?")
+        if where:
+            sql += f" AND ({where})"
+        groups = {}
+        for row in self.db.execute(sql, (metric, *params)):
+            sketch = QuantileSketch.from_dict(json.loads(row['sketch']))
+            groups.setdefault(row['grp'], []).append(sketch)
+
+        rows = []
+        for key in sorted(groups, key=lambda k: (k is None, k)):
+            merged = merge_all(groups[key])
+            values = merged.quantiles(qs)
+            rows.append({by or 'group': key, 'flows': len(groups[key]), 'count': merged.count,
+                         'mean': merged.mean, **{f'p{q * 100:g}': v for q, v in values.items()},
+                         'max': merged.max if merged.count else None})
+        return rows
+
+    def mcs_distribution(self, exp_id):
+        return {row['mcs']: row['packets'] for row in
+                self.db.execute("SELECT mcs, packets FROM mcs WHERE exp_id = ? ORDER BY mcs", (exp_id,))}
+
+
+def print_rows(rows):
+    if not rows:
+        print("(no rows)", file=sys.stderr)
+        return
+    writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog of experiments and KPIs")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("ingest", help="add or refresh experiments")
+    p.add_argument("dirs", nargs="+")
+    p.add_argument("--force", action="store_true", help="re-read unchanged experiments too")
+    p = sub.add_parser("query", help="run a SELECT, print CSV")
+    p.add_argument("sql")
+    p.add_argument("--param", action="append", default=[], help="value for a ? placeholder")
+    p = sub.add_parser("sweep", help="achieved vs requested per experiment, print CSV")
+    p.add_argument("--where", default=None, help='e.g. "bandwidth = 100 AND channel_sim = 1"')
+    p = sub.add_parser("quantiles", help="merged latency/throughput quantiles, print CSV")
+    p.add_argument("--metric", default="latency_ms", choices=METRICS)
+    p.add_argument("--where", default=None, help='e.g. "bandwidth = 100 AND dst_port = 5201"')
+    p.add_argument("--by", default=None, help="group column, e.g. bandwidth or dst_port")
+    args = parser.parse_args()
+
+    with Catalog(args.db) as catalog:
+        try:
+            if args.cmd == "ingest":
+                for d in args.dirs:
+                    if not os.path.isdir(d):
+                        print(f"Error: '{d}' is not a directory.")
+                        sys.exit(1)
+                    counts = catalog.ingest_tree(d, args.force)
+                    print(f"{d}: " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+            elif args.cmd == "query":
+                print_rows(catalog.query(args.sql, args.param))
+            elif args.cmd == "quantiles":
+                print_rows(catalog.quantiles(args.metric, args.where, by=args.by))
+            else:
+                print_rows(catalog.sweep(args.where))
+        except sqlite3.Error as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Cross-check of the throughput seen in ue0.log (extracted CSV) against
+iperf3's own interval reports (intervals[].sum.bits_per_second in
+json.log), per flow and interval, flagging the intervals where the two
+disagree. A flow is the server of the report (start.connecting_to host
+and port): several clients may share the default port 5201 against
+different servers.
+
+Alignment: an iperf3 report starts at start.timestamp.timesecs (epoch,
+whole seconds), mapped to the log clock (local time of day, ms; --offset-ms
+corrects a clock difference). As timesecs is truncated to the second, the
+real start is taken from the flow's first packet in the log at or after
+it (forward as-of join, within ALIGN_WINDOW_MS); each interval is then
+[start + interval.start, start + interval.end).
+
+Log bytes per interval: packets are sorted by time once, a running byte
+count is kept per flow, and every interval boundary is matched to the last
+packet before it with a backward as-of join (pandas.merge_asof, by flow).
+Bytes in an interval are the difference of the two counts, so all flows
+and intervals are handled in a few vectorized operations, whatever the
+interval length. Uplink flows are matched on the destination IP and port,
+-R (reverse) reports on the source IP and port. iperf3 counts UDP payload, so the IP
+and UDP headers (28 bytes) are taken off IP_Total_Length (1470 when missing,
+as throughput_bins.py).
+
+An interval is flagged when |log - iperf| > tolerance * max(log, iperf)
+and one of them is above MIN_MBITS. Omitted intervals (-O) are skipped.
+
+Output: <exp>.iperf_crosscheck.csv next to the experiment, one row per
+interval, and a per-flow summary on stdout.
+
+Usage: iperf_crosscheck.py <exp_dir | exp.csv> [--json-log FILE] [--out FILE]
+                           [--tolerance FRACTION] [--offset-ms MS]
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from throughput_bins import PACKET_SIZE, clock_ms, packet_sizes
+
+DEFAULT_TOLERANCE = 0.10    # fracción del mayor de los dos
+ALIGN_WINDOW_MS = 1500      # timesecs truncado a segundos (+ margen)
+MIN_MBITS = 0.01            # por debajo no se marca divergencia
+HEADER_BYTES = 28           # IP + UDP, iperf3 cuenta sólo el payload
+DAY_MS = 86400000
+FLOW_KEY = ('reverse', 'server', 'port')
+CROSSCHECK_COLUMNS = ('Timestamp_log', 'Source IP', 'Source Port', 'Destination IP',
+                      'Destination Port', 'IP_Total_Length')
+RESULT_COLUMNS = ['server', 'port', 'reverse', 'interval_start_s', 'interval_end_s', 'log_time',
+                  'iperf_mbits', 'log_mbits', 'diff_pct', 'diverges']
+
+
+def crosscheck_path(csv_file):
+    return os.path.splitext(csv_file)[0] + '.iperf_crosscheck.csv'
+
+
+def load_reports(json_log):
+    """The iperf3 -J reports of json.log as a list (empty if missing or unreadable)."""
+    if not os.path.isfile(json_log):
+        return []
+    try:
+        with open(json_log, 'r', encoding='utf-8') as f:
+            reports = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if isinstance(reports, dict):
+        reports = [reports]
+    return [r for r in reports if isinstance(r, dict) and r.get('intervals')]
+
+
+def iperf_intervals(reports):
+    """
+    One row per report interval: report, server, port, reverse, timesecs,
+    start/end (s), bps, omitted.
+    """
+    if not reports:
+        return pd.DataFrame(columns=['report', 'server', 'port', 'reverse', 'timesecs',
+                                     'start_s', 'end_s', 'iperf_bps', 'omitted'])
+    df = pd.json_normalize([dict(rep, _report=i) for i, rep in enumerate(reports)],
+                           record_path='intervals', errors='ignore',
+                           meta=['_report', ['start', 'connecting_to', 'host'],
+                                 ['start', 'connecting_to', 'port'],
+                                 ['start', 'timestamp', 'timesecs'],
+                                 ['start', 'test_start', 'reverse']])
+    get = lambda c: df[c] if c in df else pd.Series(np.nan, index=df.index)
+    return pd.DataFrame({
+        'report': df['_report'].astype(np.int64),
+        'server': get('start.connecting_to.host'),
+        'port': pd.to_numeric(get('start.connecting_to.port'), errors='coerce'),
+        'reverse': pd.to_numeric(get('start.test_start.reverse'), errors='coerce').fillna(0).astype(bool),
+        'timesecs': pd.to_numeric(get('start.timestamp.timesecs'), errors='coerce'),
+        'start_s': pd.to_numeric(get('sum.start'), errors='coerce'),
+        'end_s': pd.to_numeric(get('sum.end'), errors='coerce'),
+        'iperf_bps': pd.to_numeric(get('sum.bits_per_second'), errors='coerce'),
+        'omitted': get('sum.omitted').fillna(False).astype(bool),
+    }).dropna(subset=['server', 'port', 'timesecs', 'start_s', 'end_s'])
+
+
+def log_clock(timesecs, offset_ms=0):
+    """Epoch seconds -> ms since local midnight (the clock of ue0.log)."""
+    t = np.asarray(timesecs, dtype=np.int64)
+    # Desfase local de cada instante (cambia con el horario de verano)
+    utc_offset = np.array([datetime.fromtimestamp(int(s)).astimezone().utcoffset().total_seconds()
+                           for s in np.unique(t)], dtype=np.int64)
+    local = t + utc_offset[np.searchsorted(np.unique(t), t)]
+    return (local % 86400) * 1000 + offset_ms
+
+
+def unwrap_midnight(t_ms):
+    """Adds a day to the stamps after each wrap of the log clock past midnight."""
+    wraps = np.concatenate(([0], np.cumsum(np.diff(t_ms) < -DAY_MS // 2)))
+    return t_ms + wraps * DAY_MS
+
+
+def packet_table(csv_file, reverse_flows=False):
+    """
+    Packets sorted by time: t_ms, flow (reverse, server, port), payload
+    bytes and the running byte count per flow. Uplink packets belong to
+    their destination; with reverse_flows every packet is also counted for
+    its source (the server of a -R flow).
+    """
+    df = pd.read_csv(csv_file, usecols=lambda c: c in CROSSCHECK_COLUMNS)
+    t_ms = unwrap_midnight(clock_ms(df['Timestamp_log'].to_numpy()))
+    sizes = packet_sizes(df)
+    if sizes is None:
+        sizes = np.full(len(df), float(PACKET_SIZE))
+    payload = np.where(sizes > 0, sizes, PACKET_SIZE) - HEADER_BYTES
+
+    parts = [pd.DataFrame({'reverse': False, 't_ms': t_ms, 'payload': payload,
+                           'server': df['Destination IP'].astype(str),
+                           'port': pd.to_numeric(df['Destination Port'], errors='coerce')})]
+    if reverse_flows and 'Source Port' in df and 'Source IP' in df:
+        parts.append(pd.DataFrame({'reverse': True, 't_ms': t_ms, 'payload': payload,
+                                   'server': df['Source IP'].astype(str),
+                                   'port': pd.to_numeric(df['Source Port'], errors='coerce')}))
+    packets = pd.concat(parts, ignore_index=True).dropna(subset=['port'])
+    packets['port'] = packets['port'].astype(np.int64)
+    packets = packets.sort_values('t_ms', kind='stable', ignore_index=True)
+    packets['cum_bytes'] = packets.groupby(list(FLOW_KEY))['payload'].cumsum()
+    return packets
+
+
+def crosscheck(csv_file, json_log, tolerance=DEFAULT_TOLERANCE, offset_ms=0):
+    """Per-interval comparison (DataFrame with RESULT_COLUMNS)."""
+    iv = iperf_intervals(load_reports(json_log))
+    iv = iv[~iv['omitted']]
+    if iv.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    iv = iv.assign(server=iv['server'].astype(str), port=iv['port'].astype(np.int64))
+    packets = packet_table(csv_file, reverse_flows=bool(iv['reverse'].any()))
+    by = list(FLOW_KEY)
+    if packets.empty:
+        packets = pd.DataFrame({'reverse': pd.Series(dtype=bool), 't_ms': pd.Series(dtype=np.int64),
+                                'server': pd.Series(dtype=str), 'port': pd.Series(dtype=np.int64),
+                                'cum_bytes': pd.Series(dtype=float)})
+
+    # Inicio de cada informe en el reloj del log, ajustado al primer paquete del flujo
+    starts = iv.drop_duplicates('report')[['report', *by, 'timesecs']].copy()
+    starts['t_ms'] = log_clock(starts['timesecs'], offset_ms)
+    if len(packets):
+        t0 = packets['t_ms'].iloc[0]
+        starts['t_ms'] += np.where(starts['t_ms'] < t0 - DAY_MS // 2, DAY_MS, 0)
+    first = packets[by + ['t_ms']].rename(columns={'t_ms': 'first_ms'})
+    first['t_ms'] = first['first_ms']
+    starts = pd.merge_asof(starts.sort_values('t_ms'), first, on='t_ms', by=by,
+                           direction='forward', tolerance=ALIGN_WINDOW_MS)
+    starts['origin_ms'] = starts['first_ms'].fillna(starts['t_ms'])
+    iv = iv.merge(starts[['report', 'origin_ms']], on='report')
+
+    # Bytes del log en cada intervalo: contador acumulado justo antes de cada borde
+    iv['from_ms'] = (iv['origin_ms'] + iv['start_s'] * 1000).round().astype(np.int64)
+    iv['to_ms'] = (iv['origin_ms'] + iv['end_s'] * 1000).round().astype(np.int64)
+    counts = packets[by + ['t_ms', 'cum_bytes']]
+    edges = []
+    for col in ('from_ms', 'to_ms'):
+        e = iv[by + [col]].rename(columns={col: 't_ms'}).reset_index()
+        e = pd.merge_asof(e.sort_values('t_ms'), counts, on='t_ms', by=by,
+                          direction='backward', allow_exact_matches=False)
+        edges.append(e.set_index('index')['cum_bytes'].reindex(iv.index).fillna(0.0))
+    log_bytes = edges[1] - edges[0]
+
+    seconds = (iv['end_s'] - iv['start_s']).clip(lower=1e-3)
+    iperf_mbits = iv['iperf_bps'].fillna(0.0) / 1e6
+    log_mbits = log_bytes * 8 / seconds / 1e6
+    peak = np.maximum(iperf_mbits, log_mbits)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diff_pct = np.where(iperf_mbits > 0, 100.0 * (log_mbits - iperf_mbits) / iperf_mbits, np.nan)
+    diverges = ((log_mbits - iperf_mbits).abs() > tolerance * peak) & (peak > MIN_MBITS)
+
+    return pd.DataFrame({
+        'server': iv['server'], 'port': iv['port'], 'reverse': iv['reverse'],
+        'interval_start_s': iv['start_s'], 'interval_end_s': iv['end_s'],
+        'log_time': pd.to_datetime(iv['from_ms'] % DAY_MS, unit='ms').dt.strftime('%H:%M:%S.%f').str[:-3],
+        'iperf_mbits': iperf_mbits.round(6), 'log_mbits': log_mbits.round(6),
+        'diff_pct': np.round(diff_pct, 2), 'diverges': diverges,
+    }).sort_values(['server', 'port', 'reverse', 'interval_start_s'], ignore_index=True)
+
+
+def summary(result):
+    """Per flow: intervals, diverging intervals and mean iperf/log Mbit/s."""
+    return (result.groupby(['server', 'port', 'reverse'])
+            .agg(intervals=('diverges', 'size'), diverging=('diverges', 'sum'),
+                 iperf_mbits=('iperf_mbits', 'mean'), log_mbits=('log_mbits', 'mean'))
+            .reset_index())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare log throughput with iperf3 interval reports")
+    parser.add_argument("path", help="experiment dir (<exp>/<exp>.csv) or the CSV")
+    parser.add_argument("--json-log", default=None, help="default: json.log next to the CSV")
+    parser.add_argument("--out", default=None, help="default: <exp>.iperf_crosscheck.csv")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--offset-ms", type=int, default=0, help="added to the iperf3 times")
+    args = parser.parse_args()
+
+    csv_file = args.path
+    if os.path.isdir(csv_file):
+        exp = os.path.basename(os.path.normpath(csv_file))
+        csv_file = os.path.join(csv_file, f'{exp}.csv')
+    if not os.path.isfile(csv_file):
+        print(f"Error: '{csv_file}' not found.")
+        sys.exit(1)
+    json_log = args.json_log or os.path.join(os.path.dirname(os.path.abspath(csv_file)), 'json.log')
+    out = args.out or crosscheck_path(csv_file)
+
+    result = crosscheck(csv_file, json_log, args.tolerance, args.offset_ms)
+    tmp = out + '.part'
+    result.to_csv(tmp, index=False)
+    os.replace(tmp, out)
+
+    if result.empty:
+        print(f"No iperf3 interval reports in {json_log}.")
+    for _, row in summary(result).iterrows():
+        direction = 'DL' if row['reverse'] else 'UL'
+        print(f"Flow {row['server']}:{row['port']} {direction}: {row['diverging']}/{row['intervals']} interval(s) "
+              f"diverge > {args.tolerance:.0%}, iperf {row['iperf_mbits']:.3f} Mbit/s, "
+              f"log {row['log_mbits']:.3f} Mbit/s")
+    print(f"-> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Packets of all experiments as one columnar dataset, partitioned by
+experiment and destination port:
+
+  <root>/exp=<id>/port=<port>/part.parquet
+  <root>/_manifest.json     per file: rows and min/max of every column,
+                            also per row group
+
+Columns are typed (IPs as uint32, ports uint16, time as ms since midnight
+int64, MCS int16 with -1 when unknown, IP_Total_Length 0 when unknown) and
+each partition is sorted by time and cut into row groups of ROW_GROUP_ROWS
+rows, so the min/max statistics of time are tight.
+
+read() prunes in three steps: files by experiment, port and the
+manifest's min/max of time and MCS; row groups by their min/max; rows
+by the exact predicate. Only the projected and predicate columns are read.
+
+Writing an experiment replaces its partitions, so re-running the writer
+after a new extraction is safe. pyarrow is optional: without it the
+partitions are written as .npz (one array per column, same row groups and
+statistics) and read back the same way.
+
+Usage:
+  packet_dataset.py write <root> <exp_dir | exp.csv> [...]
+  packet_dataset.py read <root> [--columns c1,c2] [--exp ID] [--port P]
+                         [--start HH:MM:SS] [--end HH:MM:SS] [--mcs-min N] [--mcs-max N] [--count]
+  packet_dataset.py info <root>
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+from throughput_bins import clock_ms
+
+MANIFEST_NAME = '_manifest.json'
+ROW_GROUP_ROWS = 65536
+
+# Columna del dataset -> (columna del CSV, tipo, valor si falta)
+COLUMNS = {
+    'time_ms':   ('Timestamp_log', np.int64, None),
+    'src_ip':    ('Source IP', np.uint32, 0),
+    'dst_ip':    ('Destination IP', np.uint32, 0),
+    'src_port':  ('Source Port', np.uint16, 0),
+    'dst_port':  ('Destination Port', np.uint16, 0),
+    'ip_id':     ('IP_ID_dec', np.uint16, 0),
+    'ip_len':    ('IP_Total_Length', np.uint16, 0),
+    'mcs':       ('MCS', np.int16, -1),
+    'seq':       ('Sequence_num_iperf', np.uint32, 0),
+    'ts_iperf':  ('Timestamp_iperf', np.uint32, 0),
+}
+
+
+# -------------- Conversión --------------
+def ip_to_u32(values):
+    """Dotted IPv4 strings -> uint32 (0 when missing or malformed)."""
+    # Hay pocas IPs distintas: convertir sólo las únicas
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=False)
+    table = np.zeros(len(uniques), dtype=np.uint32)
+    for i, ip in enumerate(uniques):
+        parts = str(ip).split('.')
+        if len(parts) == 4 and all(p.isdigit() and int(p) < 256 for p in parts):
+            table[i] = (int(parts[0]) << 24) | (int(parts[1]) << 16) | (int(parts[2]) << 8) | int(parts[3])
+    return table[codes]
+
+
+def u32_to_ip(values):
+    values = np.asarray(values, dtype=np.uint32)
+    return ['.'.join(str(int(v) >> s & 0xFF) for s in (24, 16, 8, 0)) for v in values]
+
+
+def csv_columns(csv_file):
+    """An extracted CSV as {column: typed array}."""
+    df = pd.read_csv(csv_file, usecols=lambda c: c in {src for src, _, _ in COLUMNS.values()})
+    cols = {}
+    for name, (src, dtype, missing) in COLUMNS.items():
+        if name == 'time_ms':
+            cols[name] = clock_ms(df[src].to_numpy())
+        elif src not in df:
+            cols[name] = np.full(len(df), missing, dtype=dtype)
+        elif name in ('src_ip', 'dst_ip'):
+            cols[name] = ip_to_u32(df[src])
+        else:
+            cols[name] = pd.to_numeric(df[src], errors='coerce').fillna(missing).to_numpy(dtype)
+    return cols
+
+
+def column_stats(cols, start=0, end=None):
+    return {name: [int(col[start:end].min()), int(col[start:end].max())]
+            for name, col in cols.items() if len(col[start:end])}
+
+
+# -------------- Manifest --------------
+def load_manifest(root):
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'files': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp = path + '.part'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+# -------------- Escritura --------------
+def write_partition(path, cols):
+    """Writes one partition; returns its file name."""
+    if pyarrow is not None:
+        table = pyarrow.table({name: col for name, col in cols.items()})
+        pq.write_table(table, path + '.parquet', row_group_size=ROW_GROUP_ROWS,
+                       write_statistics=True, compression='zstd')
+        return os.path.basename(path) + '.parquet'
+    np.savez(path + '.npz', **cols)
+    return os.path.basename(path) + '.npz'
+
+
+def write_experiment(root, exp_id, csv_file):
+    """Replaces the partitions of exp_id with the packets of csv_file. Returns the rows written."""
+    cols = csv_columns(csv_file)
+    exp_dir = os.path.join(root, f'exp={exp_id}')
+    if os.path.isdir(exp_dir):
+        shutil.rmtree(exp_dir)
+    manifest = load_manifest(root)
+    manifest['files'] = [f for f in manifest['files'] if f['exp'] != exp_id]
+
+    # Agrupar por puerto: ordenar por (puerto, tiempo) una sola vez
+    order = np.lexsort((cols['time_ms'], cols['dst_port']))
+    cols = {name: col[order] for name, col in cols.items()}
+    ports, starts = np.unique(cols['dst_port'], return_index=True)
+    bounds = list(starts) + [len(order)]
+    for port, lo, hi in zip(ports, bounds[:-1], bounds[1:]):
+        part = {name: col[lo:hi] for name, col in cols.items()}
+        part_dir = os.path.join(exp_dir, f'port={int(port)}')
+        os.makedirs(part_dir, exist_ok=True)
+        name = write_partition(os.path.join(part_dir, 'part'), part)
+        n = hi - lo
+        manifest['files'].append({
+            'path': os.path.relpath(os.path.join(part_dir, name), root),
+            'exp': exp_id, 'port': int(port), 'rows': int(n),
+            'stats': column_stats(part),
+            'row_groups': [{'rows': int(min(ROW_GROUP_ROWS, n - s)),
+                            'stats': column_stats(part, s, s + ROW_GROUP_ROWS)}
+                           for s in range(0, n, ROW_GROUP_ROWS)],
+        })
+    manifest['files'].sort(key=lambda f: (f['exp'], f['port']))
+    save_manifest(root, manifest)
+    return len(order)
+
+
+# -------------- Lectura --------------
+def overlaps(stats, name, lo, hi):
+    """False only if the [min, max] of column name cannot intersect [lo, hi]."""
+    if name not in stats:
+        return True
+    cmin, cmax = stats[name]
+    return not ((lo is not None and cmax < lo) or (hi is not None and cmin > hi))
+
+
+def read(root, columns=None, exps=None, ports=None, time_range=None, mcs_range=None):
+    """
+    Packets matching all predicates as {column: array}, plus an 'exp'
+    array with the experiment of every row. time_range and mcs_range are
+    inclusive (lo, hi) pairs, either end None for open.
+    """
+    columns = list(columns or COLUMNS)
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown column(s): {', '.join(unknown)}")
+    preds = [(name, rng) for name, rng in (('time_ms', time_range), ('mcs', mcs_range)) if rng]
+    needed = list(dict.fromkeys(columns + [name for name, _ in preds]))
+    exps = set(exps) if exps is not None else None
+    ports = set(int(p) for p in ports) if ports is not None else None
+
+    chunks = {name: [] for name in columns}
+    chunks['exp'] = []
+    for entry in load_manifest(root)['files']:
+        # 1) Ficheros
+        if exps is not None and entry['exp'] not in exps:
+            continue
+        if ports is not None and entry['port'] not in ports:
+            continue
+        if not all(overlaps(entry['stats'], name, *rng) for name, rng in preds):
+            continue
+        # 2) Grupos de filas
+        groups = [i for i, rg in enumerate(entry['row_groups'])
+                  if all(overlaps(rg['stats'], name, *rng) for name, rng in preds)]
+        if not groups:
+            continue
+        data = read_row_groups(os.path.join(root, entry['path']), entry, groups, needed)
+        # 3) Filas
+        mask = np.ones(len(data[needed[0]]), dtype=bool)
+        for name, (lo, hi) in preds:
+            if lo is not None:
+                mask &= data[name] >= lo
+            if hi is not None:
+                mask &= data[name] <= hi
+        for name in columns:
+            chunks[name].append(data[name][mask])
+        chunks['exp'].append(np.full(int(mask.sum()), entry['exp'], dtype=object))
+
+    return {name: (np.concatenate(parts) if parts else
+                   np.zeros(0, dtype=object if name == 'exp' else COLUMNS[name][1]))
+            for name, parts in chunks.items()}
+
+
+def read_row_groups(path, entry, groups, columns):
+    if path.endswith('.parquet'):
+        if pyarrow is None:
+            raise RuntimeError(f"{path}: reading Parquet needs pyarrow")
+        table = pq.ParquetFile(path).read_row_groups(groups, columns=columns)
+        return {name: table.column(name).to_numpy() for name in columns}
+    # .npz: cada columna se carga entera y se cortan los grupos pedidos
+    offsets = np.cumsum([0] + [rg['rows'] for rg in entry['row_groups']])
+    with np.load(path) as data:
+        return {name: np.concatenate([data[name][offsets[g]:offsets[g + 1]] for g in groups])
+                for name in columns}
+
+
+def parse_clock(value):
+    """'HH:MM:SS[.mmm]' -> ms since midnight."""
+    h, m, s = value.split(':')
+    return int((int(h) * 3600 + int(m) * 60 + float(s)) * 1000 + 0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned packet dataset")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("write", help="add or replace experiments")
+    p.add_argument("root")
+    p.add_argument("inputs", nargs="+", help="experiment dirs (<id>/<id>.csv) or CSV files")
+    p = sub.add_parser("read", help="print matching packets as CSV")
+    p.add_argument("root")
+    p.add_argument("--columns", default=None, help="comma-separated, default all")
+    p.add_argument("--exp", action="append", default=None)
+    p.add_argument("--port", type=int, action="append", default=None)
+    p.add_argument("--start", default=None, help="HH:MM:SS[.mmm]")
+    p.add_argument("--end", default=None, help="HH:MM:SS[.mmm]")
+    p.add_argument("--mcs-min", type=int, default=None)
+    p.add_argument("--mcs-max", type=int, default=None)
+    p.add_argument("--count", action="store_true", help="only print the number of packets")
+    p = sub.add_parser("info", help="partitions and their statistics")
+    p.add_argument("root")
+    args = parser.parse_args()
+
+    if args.cmd == "write":
+        os.makedirs(args.root, exist_ok=True)
+        for path in args.inputs:
+            if os.path.isdir(path):
+                exp_id = os.path.basename(os.path.normpath(path))
+                csv_file = os.path.join(path, f"{exp_id}.csv")
+            else:
+                csv_file = path
+                exp_id = os.path.splitext(os.path.basename(path))[0]
+            if not os.path.isfile(csv_file):
+                print(f"Error: '{csv_file}' not found.")
+                sys.exit(1)
+            rows = write_experiment(args.root, exp_id, csv_file)
+            print(f"{exp_id}: {rows} packet(s)")
+        return
+
+    if args.cmd == "info":
+        for f in load_manifest(args.root)['files']:
+            t = f['stats'].get('time_ms', [0, 0])
+            print(f"{f['path']}: {f['rows']} rows, {len(f['row_groups'])} row group(s), "
+                  f"time {t[0]}-{t[1]} ms, mcs {f['stats'].get('mcs')}")
+        return
+
+    time_range = None
+    if args.start or args.end:
+        time_range = (parse_clock(args.start) if args.start else None,
+                      parse_clock(args.end) if args.end else None)
+    mcs_range = (args.mcs_min, args.mcs_max) if args.mcs_min is not None or args.mcs_max is not None else None
+    try:
+        data = read(args.root, args.columns.split(',') if args.columns else None,
+                    args.exp, args.port, time_range, mcs_range)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.count:
+        print(len(data['exp']))
+        return
+    names = [n for n in data if n != 'exp']
+    out = {'exp': data['exp']}
+    for name in names:
+        out[name] = u32_to_ip(data[name]) if name in ('src_ip', 'dst_ip') else data[name]
+    pd.DataFrame(out).to_csv(sys.stdout, index=False)
+
+
+if __name__ == "__main__":
+    main()
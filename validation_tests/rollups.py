@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Multi-resolution per-flow rollups of an extracted CSV, stored next to
+the experiment as <id>.rollups.npz.
+
+For every flow (source IP:port -> destination IP:port) it holds packet
+and byte counts per bin at 1 ms, 10 ms, 100 ms, 1 s and 10 s. The packets
+are read and sorted once by (flow, time): the 1 ms level is the sum of
+each run of equal (flow, ms) keys, and every coarser level is reduced
+from the previous one, so the raw rows are touched only once.
+
+Levels are sparse (only non-empty bins are stored), which keeps the 1 ms
+level small for many flows and long runs; level() returns them dense for
+plotting. Bytes are IP_Total_Length, or 1470 when a packet has none
+(as throughput_bins.py).
+
+npz contents:
+  flows_src_ip, flows_src_port, flows_dst_ip, flows_dst_port
+  <level>_flow, <level>_bin_ms, <level>_packets, <level>_bytes
+  (level = 1, 10, 100, 1000, 10000 ms; bin_ms = start of the bin in ms since midnight)
+
+Usage:
+  rollups.py build <exp_dir | exp.csv> [out.rollups.npz]
+  rollups.py show <file.rollups.npz> <level_ms> [dst_port]
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from throughput_bins import PACKET_SIZE, clock_ms, packet_sizes
+
+LEVELS_MS = (1, 10, 100, 1000, 10000)
+ROLLUP_COLUMNS = ('Timestamp_log', 'Source IP', 'Source Port', 'Destination IP',
+                  'Destination Port', 'IP_Total_Length')
+FLOW_COLUMNS = ('src_ip', 'src_port', 'dst_ip', 'dst_port')
+
+
+def rollup_path(csv_file):
+    return os.path.splitext(csv_file)[0] + '.rollups.npz'
+
+
+def _reduce(flow, bins, packets, nbytes):
+    """Sums runs of equal (flow, bin); the input is sorted by (flow, bin)."""
+    if flow.size == 0:
+        return flow, bins, packets, nbytes
+    change = np.flatnonzero((flow[1:] != flow[:-1]) | (bins[1:] != bins[:-1])) + 1
+    starts = np.concatenate(([0], change))
+    return (flow[starts], bins[starts],
+            np.add.reduceat(packets, starts), np.add.reduceat(nbytes, starts))
+
+
+def build(csv_file, levels_ms=LEVELS_MS):
+    """(flows DataFrame, {level: (flow, bin_ms, packets, bytes)}) of an extracted CSV."""
+    df = pd.read_csv(csv_file, usecols=lambda c: c in ROLLUP_COLUMNS)
+    t_ms = clock_ms(df['Timestamp_log'].to_numpy())
+    sizes = packet_sizes(df)
+    if sizes is None:
+        nbytes = np.full(len(df), PACKET_SIZE, dtype=np.int64)
+    else:
+        nbytes = np.where(sizes > 0, sizes, PACKET_SIZE).astype(np.int64)
+
+    keys = pd.DataFrame({name: df[src] if src in df else -1
+                         for name, src in zip(FLOW_COLUMNS, ROLLUP_COLUMNS[1:5])})
+    flow = keys.groupby(list(FLOW_COLUMNS), sort=True, dropna=False).ngroup().to_numpy(np.int64)
+    flows = (keys.assign(_id=flow).drop_duplicates('_id').sort_values('_id')
+             .drop(columns='_id').reset_index(drop=True))
+
+    # Una sola ordenación por (flujo, ms)
+    order = np.lexsort((t_ms, flow))
+    flow, t_ms, nbytes = flow[order], t_ms[order], nbytes[order]
+
+    out = {}
+    cur = (flow, t_ms, np.ones(len(flow), dtype=np.int64), nbytes)
+    for level in sorted(levels_ms):
+        # Cada nivel sale del anterior: los bins siguen ordenados dentro de cada flujo
+        cur = _reduce(cur[0], cur[1] // level * level, cur[2], cur[3])
+        out[level] = cur
+    return flows, out
+
+
+def save(path, flows, levels):
+    arrays = {f'flows_{c}': flows[c].astype(str).to_numpy(dtype=str) if 'ip' in c
+              else pd.to_numeric(flows[c], errors='coerce').fillna(-1).to_numpy(np.int32)
+              for c in FLOW_COLUMNS}
+    for level, (flow, bins, packets, nbytes) in levels.items():
+        arrays.update({f'{level}_flow': flow.astype(np.uint32), f'{level}_bin_ms': bins,
+                       f'{level}_packets': packets.astype(np.uint32),
+                       f'{level}_bytes': nbytes.astype(np.uint64)})
+    tmp = path + '.part.npz'
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+class Rollups:
+    """Reader for a .rollups.npz; arrays are loaded on first use."""
+    def __init__(self, path):
+        self.data = np.load(path, allow_pickle=False)
+        self.flows = pd.DataFrame({c: self.data[f'flows_{c}'] for c in FLOW_COLUMNS})
+        self.levels = sorted(int(k.split('_')[0]) for k in self.data.files if k.endswith('_bin_ms'))
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def best_level(self, span_ms, points):
+        """Coarsest level giving at least `points` bins over span_ms (e.g. the plot width)."""
+        fine = [lv for lv in self.levels if span_ms / lv >= points]
+        return max(fine) if fine else min(self.levels)
+
+    def flow_ids(self, dst_port=None):
+        if dst_port is None:
+            return np.arange(len(self.flows))
+        return np.flatnonzero(self.flows['dst_port'].to_numpy() == int(dst_port))
+
+    def sparse(self, level_ms, flows=None, time_range=None):
+        """(flow, bin_ms, packets, bytes) of the non-empty bins of a level."""
+        flow = self.data[f'{level_ms}_flow']
+        bins = self.data[f'{level_ms}_bin_ms']
+        mask = np.ones(len(flow), dtype=bool)
+        if flows is not None:
+            mask &= np.isin(flow, flows)
+        if time_range is not None:
+            mask &= (bins >= time_range[0]) & (bins < time_range[1])
+        return (flow[mask], bins[mask], self.data[f'{level_ms}_packets'][mask],
+                self.data[f'{level_ms}_bytes'][mask])
+
+    def level(self, level_ms, flows=None, time_range=None):
+        """
+        Dense view: (flow ids, bin_ms, packets (F, B), bytes (F, B)) with one
+        column per bin between the first and last non-empty one.
+        """
+        flow, bins, packets, nbytes = self.sparse(level_ms, flows, time_range)
+        ids = np.unique(flow if flows is None else flows)
+        if bins.size == 0:
+            empty = np.zeros((len(ids), 0), dtype=np.int64)
+            return ids, np.zeros(0, dtype=np.int64), empty, empty
+        first = bins.min() if time_range is None else time_range[0] // level_ms * level_ms
+        last = bins.max() if time_range is None else (time_range[1] - 1) // level_ms * level_ms
+        n_bins = (last - first) // level_ms + 1
+        key = np.searchsorted(ids, flow) * n_bins + (bins - first) // level_ms
+        size = len(ids) * n_bins
+        dense_p = np.bincount(key, weights=packets, minlength=size).astype(np.int64)
+        dense_b = np.bincount(key, weights=nbytes, minlength=size).astype(np.int64)
+        bin_ms = first + np.arange(n_bins, dtype=np.int64) * level_ms
+        return ids, bin_ms, dense_p.reshape(len(ids), n_bins), dense_b.reshape(len(ids), n_bins)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'show'):
+        print("Usage: python3 rollups.py build <exp_dir | exp.csv> [out.rollups.npz]")
+        print("       python3 rollups.py show <file.rollups.npz> <level_ms> [dst_port]")
+        sys.exit(1)
+
+    if sys.argv[1] == 'build':
+        path = sys.argv[2]
+        if os.path.isdir(path):
+            exp_id = os.path.basename(os.path.normpath(path))
+            path = os.path.join(path, f'{exp_id}.csv')
+        if not os.path.isfile(path):
+            print(f"Error: '{path}' not found.")
+            sys.exit(1)
+        out = sys.argv[3] if len(sys.argv) > 3 else rollup_path(path)
+        flows, levels = build(path)
+        save(out, flows, levels)
+        print(f"{len(flows)} flow(s), " +
+              ", ".join(f"{lv} ms: {len(levels[lv][0])} bins" for lv in sorted(levels)) +
+              f" -> {out}")
+        return
+
+    if len(sys.argv) < 4:
+        print("Error: missing level_ms.")
+        sys.exit(1)
+    with Rollups(sys.argv[2]) as r:
+        level_ms = int(sys.argv[3])
+        if level_ms not in r.levels:
+            print(f"Error: level {level_ms} ms not in {r.levels}.")
+            sys.exit(1)
+        flows = r.flow_ids(sys.argv[4]) if len(sys.argv) > 4 else None
+        ids, bin_ms, packets, nbytes = r.level(level_ms, flows)
+        for i, fid in enumerate(ids):
+            f = r.flows.iloc[fid]
+            print(f"flow {fid} {f['src_ip']}:{f['src_port']} > {f['dst_ip']}:{f['dst_port']}: "
+                  f"{packets[i].sum()} packets, {nbytes[i].sum()} bytes, "
+                  f"peak {nbytes[i].max(initial=0) * 8 / level_ms / 1e3:.3f} Mbit/s over {level_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
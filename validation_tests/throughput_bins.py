@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Per-port throughput in fixed time bins, in one vectorized pass.
+
+validationv4.py used to filter the DataFrame once per port and bin each
+port with pd.cut().value_counts(), with the bin occupancy computed in a
+Python loop over pd.Timestamp objects. Here the timestamps become int64
+milliseconds, every packet gets a (port, bin) key and np.bincount counts
+packets and sums bytes for all pairs at once.
+
+The bins are the ones validationv4.py used: from floor(t_min) to
+ceil(t_max) in steps of bin_ms, closed on the left (a packet exactly at
+ceil(t_max) falls outside, as with pd.cut(right=False)). The first and
+last bins are only partially covered by the experiment, so throughput is
+bytes / occupancy with occupancy = min(end, t_max) - max(start, t_min).
+
+Bytes are the IP_Total_Length of every packet when the CSV has that column
+(data_extractor_v3.py); packets without it, and older CSVs, count as
+packet_size (1470, the iperf default).
+
+Usage: throughput_bins.py <exp.csv> [--bin-ms 1000] [--packet-size 1470]
+       (prints the mean MBps per 52XX port)
+"""
+import sys
+import argparse
+
+import numpy as np
+
+PACKET_SIZE = 1470              # bytes, tamaño fijo de los datagramas iperf
+USER_PORTS = (5200, 5299)       # puertos destino de los usuarios (52XX)
+CSV_COLUMNS = ("Timestamp_log", "Destination Port", "IP_Total_Length")
+CLOCK_DIGITS = [0, 1, 3, 4, 6, 7, 9, 10, 11]
+CLOCK_WEIGHTS = np.array([36000000, 3600000, 600000, 60000, 10000, 1000, 100, 10, 1], dtype=np.int64)
+
+
+def clock_ms(values):
+    """
+    "HH:MM:SS.mmm" strings (Timestamp_log) -> int64 ms since midnight.
+    Fixed-width strings are parsed as a digit matrix without a Python loop.
+    """
+    raw = np.asarray(values)
+    if raw.dtype.kind not in "SU":
+        raw = raw.astype("U")
+    width = raw.dtype.itemsize // (4 if raw.dtype.kind == "U" else 1)
+    if raw.size and width == 12:
+        # Un carácter por columna (UCS4 o bytes): HH:MM:SS.mmm -> dígitos x pesos
+        chars = raw.view(np.uint32 if raw.dtype.kind == "U" else np.uint8).reshape(-1, 12)
+        return (chars[:, CLOCK_DIGITS].astype(np.int64) - ord("0")) @ CLOCK_WEIGHTS
+    # Anchura variable (p. ej. microsegundos): más lento, pero correcto
+    out = np.empty(raw.size, dtype=np.int64)
+    for i, s in enumerate(raw):
+        s = s.decode() if isinstance(s, bytes) else str(s)
+        hms, _, frac = s.partition(".")
+        h, m, sec = (int(x) for x in hms.split(":"))
+        out[i] = (h * 3600 + m * 60 + sec) * 1000 + int((frac + "000")[:3])
+    return out
+
+
+def packet_sizes(df):
+    """IP_Total_Length of a CSV DataFrame as float64 (NaN if unknown), or None."""
+    if "IP_Total_Length" not in df:
+        return None
+    return df["IP_Total_Length"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class ThroughputBins:
+    """
+    Result of throughput_bins(): one row per port, one column per bin.
+      ports         int64 (P,)     destination ports, ascending
+      bin_start_ms  int64 (B,)     start of each bin
+      packets       int64 (P, B)   packets per (port, bin)
+      bytes         int64 (P, B)   bytes per (port, bin)
+      occupancy_s   float64 (B,)   part of each bin inside [t_min, t_max]
+    """
+    def __init__(self, ports, bin_start_ms, packets, nbytes, occupancy_s):
+        self.ports = ports
+        self.bin_start_ms = bin_start_ms
+        self.packets = packets
+        self.bytes = nbytes
+        self.occupancy_s = occupancy_s
+
+    @property
+    def mbytes_per_s(self):
+        """(P, B) throughput in MBps (10^6 bytes per second)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.bytes / self.occupancy_s / 1e6
+
+    @property
+    def first_active(self):
+        """Index of the first non-empty bin of each port (0 if it has none)."""
+        active = self.bytes > 0
+        if active.shape[1] == 0:
+            return np.zeros(active.shape[0], dtype=np.int64)
+        return np.where(active.any(axis=1), active.argmax(axis=1), 0)
+
+    def active_mask(self):
+        """(P, B) True from each port's first non-empty bin on."""
+        return np.arange(self.bin_start_ms.size) >= self.first_active[:, None]
+
+    def mean_mbps(self):
+        """Mean MBps per port over its bins from the first non-empty one on."""
+        mb = np.where(self.active_mask(), self.mbytes_per_s, np.nan)
+        with np.errstate(invalid="ignore"):
+            return np.nanmean(mb, axis=1) if mb.size else np.zeros(self.ports.size)
+
+    def series(self, i):
+        """(bin_start_ms, MBps) of the i-th port, leading empty bins trimmed."""
+        start = self.first_active[i]
+        return self.bin_start_ms[start:], self.mbytes_per_s[i, start:]
+
+
+def throughput_bins(t_ms, ports, sizes=None, bin_ms=1000, packet_size=PACKET_SIZE,
+                    port_range=USER_PORTS):
+    """
+    Bins all packets of an experiment by (destination port, time).
+
+    t_ms: int64 timestamps in ms; ports: destination ports; sizes: bytes of
+    each packet, NaN or 0 where unknown (None: packet_size for all). Only ports within port_range
+    (inclusive, None for all) are kept, but t_min/t_max are the ones of the
+    whole experiment, as in validationv4.py.
+    """
+    t_ms = np.asarray(t_ms, dtype=np.int64)
+    ports = np.asarray(ports, dtype=np.int64)
+    if t_ms.size == 0:
+        empty = np.zeros((0, 0), dtype=np.int64)
+        return ThroughputBins(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                              empty, empty, np.zeros(0))
+
+    t_min, t_max = int(t_ms.min()), int(t_ms.max())
+    first = t_min // bin_ms * bin_ms
+    n_bins = (-(-t_max // bin_ms) * bin_ms - first) // bin_ms
+    bin_start_ms = first + np.arange(n_bins, dtype=np.int64) * bin_ms
+    occupancy_s = (np.minimum(bin_start_ms + bin_ms, t_max) -
+                   np.maximum(bin_start_ms, t_min)) / 1000.0
+
+    b = (t_ms - first) // bin_ms
+    keep = b < n_bins
+    if port_range is not None:
+        keep &= (ports >= port_range[0]) & (ports <= port_range[1])
+    b, p = b[keep], ports[keep]
+
+    # Índice denso de puerto sin ordenar: los puertos son de 16 bits
+    if p.size:
+        offset = p - p.min()
+        present = np.bincount(offset) > 0
+        port_list = np.flatnonzero(present) + p.min()
+        p = (np.cumsum(present) - 1)[offset]
+    else:
+        port_list = np.zeros(0, dtype=np.int64)
+    n_ports = port_list.size
+
+    key = p * n_bins + b
+    packets = np.bincount(key, minlength=n_ports * n_bins).reshape(n_ports, n_bins)
+    if sizes is None:
+        nbytes = packets * packet_size
+    else:
+        weights = np.asarray(sizes, dtype=np.float64)[keep]
+        weights[~(weights > 0)] = packet_size
+        nbytes = np.rint(np.bincount(key, weights=weights, minlength=n_ports * n_bins))
+        nbytes = nbytes.astype(np.int64).reshape(n_ports, n_bins)
+    return ThroughputBins(port_list, bin_start_ms, packets, nbytes, occupancy_s)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-port throughput of an extracted CSV")
+    parser.add_argument("csv")
+    parser.add_argument("--bin-ms", type=int, default=1000)
+    parser.add_argument("--packet-size", type=int, default=PACKET_SIZE)
+    args = parser.parse_args()
+
+    import pandas as pd
+    try:
+        df = pd.read_csv(args.csv, usecols=lambda c: c in CSV_COLUMNS)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    res = throughput_bins(clock_ms(df["Timestamp_log"].to_numpy()),
+                          df["Destination Port"].to_numpy(),
+                          packet_sizes(df),
+                          bin_ms=args.bin_ms, packet_size=args.packet_size)
+    for port, mean in zip(res.ports, res.mean_mbps()):
+        print(f"Mean thr user {port}: {mean:.2f} MBps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Throughput plots (full and zoom view) for validationv4.py.
+
+  - matplotlib is imported the first time a plot is drawn, with the Agg
+    backend (no display needed); analysis-only runs never load it
+  - one Figure per process is reused for every experiment: the axes are
+    cleared instead of building new figures
+  - each series is reduced with LTTB (Largest-Triangle-Three-Buckets) to
+    about one point per horizontal pixel, so a 10-hour run draws no more
+    points than a 20-minute one; short series are drawn as they are, with
+    their markers
+  - the lines are drawn once: the full view is saved, then the y limits
+    (5-95 percentiles of all values, as before) and the title are changed
+    and the zoom view is saved from the same artists
+
+Processes of validationv4.py --jobs each keep their own figure.
+
+Usage: throughput_plots.py <exp.csv> <out_dir>
+"""
+import os
+import sys
+
+import numpy as np
+
+FIGSIZE = (12, 6)           # pulgadas
+DPI = 100                   # 1200 px de ancho
+MARKER_MAX_POINTS = 200     # con más puntos no se dibujan marcadores
+
+_figure = None              # (Figure, Axes) reutilizada en el proceso
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets: the
+    first and last points plus, per bucket, the one forming the largest
+    triangle with the previous kept point and the mean of the next bucket.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Límites de los threshold-2 cubos intermedios
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    # Media de cada cubo (para el cubo siguiente), con sumas acumuladas
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    mean_x = np.append((cx[ends] - cx[starts]) / counts, x[-1])
+    mean_y = np.append((cy[ends] - cy[starts]) / counts, y[-1])
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = starts[i], ends[i]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - mean_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (mean_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _get_figure():
+    global _figure
+    if _figure is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=FIGSIZE, dpi=DPI)
+        FigureCanvasAgg(fig)
+        _figure = (fig, fig.add_subplot())
+    return _figure
+
+
+def plot_width_px():
+    return int(FIGSIZE[0] * DPI)
+
+
+def render(exp, series, save_path):
+    """
+    series: {port: (bin_start_ms, MBps)} arrays. Writes
+    <exp>_throughput.png and, if there are values, <exp>_throughput_zoom.png.
+    Returns the files written.
+    """
+    fig, ax = _get_figure()
+    ax.clear()
+    width = plot_width_px()
+    for port, (t_ms, mb) in series.items():
+        valid = ~np.isnan(mb)
+        t_ms, mb = t_ms[valid], mb[valid]
+        idx = lttb(t_ms, mb, width)
+        marker = 'o' if len(idx) <= MARKER_MAX_POINTS else None
+        ax.plot(t_ms[idx].astype('datetime64[ms]'), mb[idx], marker=marker, label=f'Puerto {port}')
+    ax.set_xlabel('Tiempo')
+    ax.set_ylabel('Throughput (MBps)')
+    ax.set_title(f'Throughput por segundo – Experimento {exp}')
+    ax.legend()
+    fig.tight_layout()
+    full = os.path.join(save_path, f'{exp}_throughput.png')
+    fig.savefig(full)
+    written = [full]
+
+    # Zoom sobre los mismos trazos: percentiles 5-95 de todos los valores
+    all_mb = np.hstack([mb for _, mb in series.values()]) if series else np.zeros(0)
+    all_mb = all_mb[~np.isnan(all_mb)]
+    if all_mb.size:
+        p_low, p_high = np.percentile(all_mb, [5, 95])
+        margin = (p_high - p_low) * 0.1
+        low_lim  = p_low - margin
+        high_lim = p_high + margin
+        ax.set_title(f'Throughput con zoom – Experimento {exp}')
+        if low_lim < high_lim:
+            ax.set_ylim(low_lim, high_lim)
+        zoom = os.path.join(save_path, f'{exp}_throughput_zoom.png')
+        fig.savefig(zoom)
+        written.append(zoom)
+    return written
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python3 throughput_plots.py <exp.csv> <out_dir>")
+        sys.exit(1)
+    import pandas as pd
+    from throughput_bins import CSV_COLUMNS, clock_ms, packet_sizes, throughput_bins
+    df = pd.read_csv(sys.argv[1], usecols=lambda c: c in CSV_COLUMNS)
+    res = throughput_bins(clock_ms(df['Timestamp_log'].to_numpy()),
+                          df['Destination Port'].to_numpy(), packet_sizes(df))
+    exp = os.path.splitext(os.path.basename(sys.argv[1]))[0]
+    os.makedirs(sys.argv[2], exist_ok=True)
+    for path in render(exp, {int(p): res.series(i) for i, p in enumerate(res.ports)}, sys.argv[2]):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
-
+"""
+Throughput per user port (MBps) of every experiment under base_dir, with
+the full and zoom plots and a summary against the requested bandwidth.
+
+Batch mode: experiments are processed in a process pool (--jobs) and each
+one keeps a cache in its output folder (<exp>_bins.npz) with the binned
+series and the summary. The cache is keyed on the size, mtime and SHA-256
+of the CSV and of request.json; when size and mtime are unchanged the file
+is not read again, and when only the mtime changed the hash decides. Only
+stale experiments are re-read and re-plotted.
+
+Plots are drawn by throughput_plots.py (headless, imported only when a
+plot has to be drawn, downsampled to the pixel width); in batch mode every
+worker process renders the plots of its own experiments.
+
+Usage: validationv4.py [--base-dir DIR] [--save-dir DIR] [--jobs N] [--no-cache]
+"""
 import os
+import sys
 import json
+import hashlib
+import argparse
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from throughput_bins import CSV_COLUMNS, ThroughputBins, clock_ms, packet_sizes, throughput_bins
 
 # 0) Suprimir warnings innecesarios
 warnings.filterwarnings('ignore', category=FutureWarning)
@@ -16,142 +37,209 @@ warnings.filterwarnings('ignore', category=UserWarning)
 base_dir = '/root/Desktop/OUTPUT/MBps'
 save_dir = '/root/Desktop/validation_tests/MBps_MB_exp'
 
-# 2) Iterar sobre cada experimento (subcarpeta)
-for exp in os.listdir(base_dir):
-    exp_path  = os.path.join(base_dir, exp)
-    save_path = os.path.join(save_dir, exp)
+CACHE_VERSION = 1           # cambiar si cambia el cálculo
+BIN_ARRAYS = ('ports', 'bin_start_ms', 'packets', 'bytes', 'occupancy_s')
 
-    # Asegurar que exista carpeta de salida
-    os.makedirs(save_path, exist_ok=True)
 
-    # Saltar si no es carpeta
-    if not os.path.isdir(exp_path):
-        continue
+# -------------- Cache --------------
+def sha256_file(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
 
-    # Archivos de entrada
-    csv_file  = os.path.join(exp_path, f"{exp}.csv")
-    json_file = os.path.join(exp_path, 'request.json')
 
-    if not os.path.isfile(csv_file):
-        print(f"CSV para el experimento '{exp}' no encontrado, omitiendo.")
-        continue
+def file_key(path, cached=None):
+    """{size, mtime, sha256} of path (None if missing); reuses cached's hash if size/mtime match."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if cached and cached['size'] == st.st_size and cached['mtime'] == st.st_mtime_ns:
+        return cached
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns, 'sha256': sha256_file(path)}
+
+
+def cache_path(save_path, exp):
+    return os.path.join(save_path, f'{exp}_bins.npz')
 
-    # 3) Leer JSON de request para extraer BW solicitada (convertida a MBps)
+
+def load_cache(path):
+    """(meta, ThroughputBins) of a cache file, or (None, None)."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            res = ThroughputBins(*(data[name] for name in BIN_ARRAYS))
+    except (OSError, ValueError, KeyError):
+        return None, None
+    if meta.get('version') != CACHE_VERSION:
+        return None, None
+    return meta, res
+
+
+def save_cache(path, meta, res):
+    tmp = path + '.part.npz'
+    np.savez(tmp, meta=np.array(json.dumps(meta)),
+             **{name: getattr(res, name) for name in BIN_ARRAYS})
+    os.replace(tmp, path)
+
+
+def same_key(a, b):
+    return a is not None and b is not None and a['size'] == b['size'] and a['sha256'] == b['sha256']
+
+
+# -------------- Análisis --------------
+def requested_bandwidth(json_file):
+    """Port -> requested bandwidth in MBps, from the -b/-p of the request commands."""
     requested_bw = {}
-    if os.path.isfile(json_file):
-        with open(json_file) as f:
-            req = json.load(f)
-        for cmd in req.get('commands', []):
-            cmd_str = cmd.get('command', '')
-            parts = cmd_str.split()
-            if '-b' in parts and '-p' in parts:
-                bw_str = parts[parts.index('-b') + 1]
-                port_val = int(parts[parts.index('-p') + 1])
-                # Interpretar megabits (iperf usa bits)
-                if bw_str.lower().endswith('m'):
-                    mbits = float(bw_str[:-1])
-                elif bw_str.lower().endswith('k'):
-                    mbits = float(bw_str[:-1]) / 1024
-                else:
-                    mbits = float(bw_str)
-                # Convertir a MBps: (Mbit/s) / 8
-                requested_bw[port_val] = mbits / 8.0
-
-    # 4) Leer CSV y parsear timestamp
-    df = pd.read_csv(csv_file)
-    df['timestamp'] = pd.to_datetime(df['Timestamp_log'], format='%H:%M:%S.%f')
-    df = df.set_index('timestamp')
-
-    # 5) Parámetro tamaño paquete
+    if not os.path.isfile(json_file):
+        return requested_bw
+    with open(json_file) as f:
+        req = json.load(f)
+    for cmd in req.get('commands', []):
+        cmd_str = cmd.get('command', '')
+        parts = cmd_str.split()
+        if '-b' in parts and '-p' in parts:
+            bw_str = parts[parts.index('-b') + 1]
+            port_val = int(parts[parts.index('-p') + 1])
+            # Interpretar megabits (iperf usa bits)
+            if bw_str.lower().endswith('m'):
+                mbits = float(bw_str[:-1])
+            elif bw_str.lower().endswith('k'):
+                mbits = float(bw_str[:-1]) / 1024
+            else:
+                mbits = float(bw_str)
+            # Convertir a MBps: (Mbit/s) / 8
+            requested_bw[port_val] = mbits / 8.0
+    return requested_bw
+
+
+def analyze(csv_file):
+    """Bins of 1 s for every 52XX port of a CSV, in one pass."""
+    # Leer sólo las columnas necesarias; timestamp a ms enteros
+    df = pd.read_csv(csv_file, usecols=lambda c: c in CSV_COLUMNS)
+    t_ms  = clock_ms(df['Timestamp_log'].to_numpy())
+    ports = pd.to_numeric(df['Destination Port'], errors='coerce').fillna(-1).to_numpy(np.int64)
+
+    # Tamaño de paquete: IP_Total_Length real; 1470 si el CSV no lo tiene
     packet_size_bytes = 1470
+    sizes = packet_sizes(df)
+
+    # Ocupación corregida en el primer y último bin
+    return throughput_bins(t_ms, ports, sizes, bin_ms=1000, packet_size=packet_size_bytes,
+                           port_range=(5200, 5299))
+
 
-    # 6) Tiempo inicio/fin experimento
-    t_min = df.index.min()
-    t_max = df.index.max()
-
-    # 7) Bins de 1 segundo (minúscula 's')
-    bin_start = t_min.floor('s')
-    bin_end   = t_max.ceil('s')
-    bins      = pd.date_range(bin_start, bin_end, freq='s')
-
-    # 8) Filtrar puertos de usuario 52XX
-    user_ports = sorted(
-        int(port) for port in df['Destination Port'].unique()
-        if isinstance(port, (int, np.integer)) and 5200 <= int(port) <= 5299
-    )
-    throughputs = {}
-
-    # 9) Calcular throughput por puerto en MBps
-    for port in user_ports:
-        df_port = df[df['Destination Port'] == port]
-        counts  = pd.cut(df_port.index, bins=bins, right=False).value_counts().sort_index()
-        bin_starts = bins[:-1]
-
-        occupancy = [(min(bs + pd.Timedelta(seconds=1), t_max) - max(bs, t_min)).total_seconds()
-                     for bs in bin_starts]
-        occupancy = np.array(occupancy)
-
-        bits = counts.values * packet_size_bytes * 8
-        with np.errstate(divide='ignore', invalid='ignore'):
-            bps = bits / occupancy
-        # Convertir bits/s a MBps: bits/s /8 /1e6
-        series_mb = pd.Series(bps / 8.0 / 1e6, index=bin_starts)
-        # Recortar ceros iniciales
-        nonzero = series_mb[series_mb > 0]
-        if not nonzero.empty:
-            series_mb = series_mb.loc[nonzero.index[0]:]
-        throughputs[port] = series_mb
-
-    # 10) Generar y guardar gráficas
-    if throughputs:
-        # Gráfica completa
-        plt.figure(figsize=(12, 6))
-        for port, series in throughputs.items():
-            plt.plot(series.index, series.values,
-                     marker='o', label=f'Puerto {port}')
-        plt.xlabel('Tiempo')
-        plt.ylabel('Throughput (MBps)')
-        plt.title(f'Throughput por segundo – Experimento {exp}')
-        plt.legend()
-        plt.tight_layout()
-        plt.savefig(os.path.join(save_path, f'{exp}_throughput.png'))
-        plt.close()
-
-        # Gráfica con zoom
-        all_mb = np.hstack([s.values for s in throughputs.values()])
-        all_mb = all_mb[~np.isnan(all_mb)]
-        if all_mb.size:
-            p_low, p_high = np.percentile(all_mb, [5, 95])
-            margin = (p_high - p_low) * 0.1
-            low_lim  = p_low - margin
-            high_lim = p_high + margin
-
-            plt.figure(figsize=(12, 6))
-            for port, series in throughputs.items():
-                plt.plot(series.index, series.values,
-                         marker='o', label=f'Puerto {port}')
-            plt.xlabel('Tiempo')
-            plt.ylabel('Throughput (MBps)')
-            plt.title(f'Throughput con zoom – Experimento {exp}')
-            if low_lim < high_lim:
-                plt.ylim(low_lim, high_lim)
-            plt.legend()
-            plt.tight_layout()
-            plt.savefig(os.path.join(save_path, f'{exp}_throughput_zoom.png'))
-            plt.close()
-
-        # 11) Resumen de throughput y solicitado
-        num_users   = len(user_ports)
-        means       = {port: series.mean() for port, series in throughputs.items()}
-        total_mean  = sum(means.values())
-        total_req   = sum(requested_bw.get(p, 0) for p in user_ports)
-
-        print(f"Experimento '{exp}': gráficas guardadas para puertos {user_ports}.")
-        print(f"Number of users: {num_users}")
-        for port, m in means.items():
-            req = requested_bw.get(port)
-            req_str = f"Requested: {req:.2f} MBps" if req is not None else ""
-            print(f"Mean thr user {port}: {m:.2f} MBps  {req_str}")
-        print(f"Total thr all users Mean: {total_mean:.2f} MBps    Requested: {total_req:.2f} MBps")
+def port_series(res):
+    """Port -> (bin_start_ms, MBps) with leading empty bins trimmed."""
+    return {int(port): res.series(i) for i, port in enumerate(res.ports)}
+
+
+def summarize(exp, res, requested_bw):
+    """Summary lines printed for an experiment."""
+    user_ports = [int(p) for p in res.ports]
+    if not user_ports:
+        return [f"Experimento '{exp}': no se encontraron puertos 52XX."]
+    means      = dict(zip(user_ports, res.mean_mbps()))
+    total_mean = sum(means.values())
+    total_req  = sum(requested_bw.get(p, 0) for p in user_ports)
+
+    lines = [f"Experimento '{exp}': gráficas guardadas para puertos {user_ports}.",
+             f"Number of users: {len(user_ports)}"]
+    for port, m in means.items():
+        req = requested_bw.get(port)
+        req_str = f"Requested: {req:.2f} MBps" if req is not None else ""
+        lines.append(f"Mean thr user {port}: {m:.2f} MBps  {req_str}")
+    lines.append(f"Total thr all users Mean: {total_mean:.2f} MBps    Requested: {total_req:.2f} MBps")
+    return lines
+
+
+# -------------- Gráficas --------------
+def plot_throughputs(exp, res, save_path):
+    """Full and zoom plots (throughput_plots.py, matplotlib loaded only here)."""
+    import throughput_plots
+    return throughput_plots.render(exp, port_series(res), save_path)
+
+
+def plot_files(exp, save_path):
+    return [os.path.join(save_path, f'{exp}_throughput.png'),
+            os.path.join(save_path, f'{exp}_throughput_zoom.png')]
+
+
+# -------------- Experimento --------------
+def process_experiment(exp, base_dir=base_dir, save_dir=save_dir, use_cache=True):
+    """
+    Validates one experiment folder. Returns (exp, summary lines, status)
+    with status 'cached', 'computed' or 'skipped'.
+    """
+    exp_path  = os.path.join(base_dir, exp)
+    save_path = os.path.join(save_dir, exp)
+    csv_file  = os.path.join(exp_path, f"{exp}.csv")
+    json_file = os.path.join(exp_path, 'request.json')
+
+    if not os.path.isfile(csv_file):
+        return exp, [f"CSV para el experimento '{exp}' no encontrado, omitiendo."], 'skipped'
+    os.makedirs(save_path, exist_ok=True)
+
+    cache_file = cache_path(save_path, exp)
+    meta, res = load_cache(cache_file) if use_cache else (None, None)
+    old_keys = meta['keys'] if meta else {}
+    keys = {'csv': file_key(csv_file, old_keys.get('csv')),
+            'request': file_key(json_file, old_keys.get('request'))}
+
+    fresh = (meta is not None and same_key(keys['csv'], old_keys.get('csv')) and
+             (keys['request'] is None) == (old_keys.get('request') is None) and
+             (keys['request'] is None or same_key(keys['request'], old_keys['request'])))
+    if fresh:
+        if res.ports.size and not all(os.path.exists(p) for p in plot_files(exp, save_path)):
+            plot_throughputs(exp, res, save_path)
+        if keys != old_keys:
+            # Sólo cambió el mtime: guardar el nuevo para no volver a calcular el hash
+            meta['keys'] = keys
+            save_cache(cache_file, meta, res)
+        return exp, meta['summary'], 'cached'
+
+    res = analyze(csv_file)
+    summary = summarize(exp, res, requested_bandwidth(json_file))
+    if res.ports.size:
+        plot_throughputs(exp, res, save_path)
+    if use_cache:
+        save_cache(cache_file, {'version': CACHE_VERSION, 'keys': keys, 'summary': summary}, res)
+    return exp, summary, 'computed'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the throughput of every experiment")
+    parser.add_argument("--base-dir", default=base_dir, help="folders <exp>/<exp>.csv")
+    parser.add_argument("--save-dir", default=save_dir, help="plots and caches go to <save-dir>/<exp>")
+    parser.add_argument("--jobs", type=int, default=1, help="experiments processed in parallel")
+    parser.add_argument("--no-cache", action="store_true", help="recompute everything")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.base_dir):
+        print(f"Error: '{args.base_dir}' not found.")
+        sys.exit(1)
+
+    # 2) Iterar sobre cada experimento (subcarpeta)
+    exps = sorted(e for e in os.listdir(args.base_dir)
+                  if os.path.isdir(os.path.join(args.base_dir, e)))
+    jobs = [(exp, args.base_dir, args.save_dir, not args.no_cache) for exp in exps]
+    counts = {'cached': 0, 'computed': 0, 'skipped': 0}
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = pool.map(process_experiment, *zip(*jobs))
+            for exp, lines, status in results:
+                counts[status] += 1
+                print("\n".join(lines), flush=True)
     else:
-        print(f"Experimento '{exp}': no se encontraron puertos 52XX.")
+        for job in jobs:
+            exp, lines, status = process_experiment(*job)
+            counts[status] += 1
+            print("\n".join(lines), flush=True)
+    print(f"{len(exps)} experiment(s): {counts['computed']} computed, "
+          f"{counts['cached']} from cache, {counts['skipped']} skipped", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Warm lteue instances reused between experiments.
+
+A cold run (pty_runner.py) starts lteue for every experiment and pays the
+SDR initialisation and cell search each time. A WarmLteue keeps
+one lteue running on a slot with an empty UE list. For each experiment it:
+  - adds the UEs of the generated users-scenario.cfg, with their
+    sim_events, through the remote API on com_addr (ue_add)
+  - waits for their traffic the way pty_runner.py does: one iperf3 -J
+    report per ext_app, then the end of the internal events plus a grace
+    period, with run_length + margin as safety cap
+  - removes them again (ue_del)
+lteue is only restarted when nr-erc.cfg changes in anything but its
+log_filename (the radio config, SDR device or com port), or when it died.
+
+The instance lives in its own directory (a copy of the generated config
+with an empty UE list) and writes its own ue0.log; the lteue output and
+the ue0.log bytes produced during an experiment are written to that
+experiment's expect_trace.log and ue0.log, with the same "[Expect]
+milestone" lines as a cold run so timeline.py works unchanged.
+
+sim_events times are relative to the ue_add of the experiment's UEs.
+
+Usage: warm_lteue.py <config_dir> [<config_dir> ...]
+         runs generated configs back to back on one instance (testing)
+"""
+import os
+import re
+import pty
+import sys
+import json
+import time
+import shutil
+import signal
+import hashlib
+import argparse
+import threading
+import subprocess
+
+import pipeline_stages as stages
+from remote_api import RemoteAPI, RemoteAPIError, parse_address
+
+sib_pattern = re.compile(rb"\(ue\) Cell \d+: SIB found")
+log_filename_pattern = re.compile(r'log_filename:\s*"[^"]*"')
+com_addr_pattern = re.compile(r'com_addr:\s*"([^"]*)"')
+
+START_TIMEOUT = 120     # s hasta "SIB found" en un arranque en frío
+STOP_TIMEOUT = 10       # s entre SIGTERM y SIGKILL
+GRACE = 2               # s tras el último informe para que lteue vuelque ue0.log
+INSTANCE_FILES = ("nr-erc.cfg", "users-scenario.cfg", "schedule.json")
+
+
+def radio_key(cfg_text):
+    """Identifies the radio config of an nr-erc.cfg, ignoring its log_filename."""
+    return hashlib.sha256(log_filename_pattern.sub('log_filename: ""', cfg_text).encode()).hexdigest()
+
+
+class WarmLteue:
+    def __init__(self, instance_dir, lteue_bin=stages.LTEUE_BIN,
+                 start_timeout=START_TIMEOUT, grace=GRACE):
+        self.instance_dir = os.path.abspath(instance_dir)
+        self.lteue_bin = lteue_bin
+        self.start_timeout = start_timeout
+        self.grace = grace
+        self.cfg_path = os.path.join(self.instance_dir, "nr-erc.cfg")
+        self.amari_log = os.path.join(self.instance_dir, "ue0.log")
+        self.trace_file = os.path.join(self.instance_dir, "trace.log")
+
+        self.proc = None
+        self.master = None
+        self.reader = None
+        self.api = None
+        self.key = None
+        # Estado compartido con el hilo lector
+        self.cond = threading.Condition()
+        self.sink = None
+        self.line_start = True
+        self.reports = 0
+        self.sib_found = False
+        self.eof = False
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    # -------------- Output --------------
+    def _read_output(self):
+        """Copies lteue's output to the current sink and counts reports."""
+        buf = b""
+        with open(self.trace_file, "wb") as trace:
+            while True:
+                try:
+                    data = os.read(self.master, 65536)
+                except OSError:
+                    data = b""
+                if not data:
+                    break
+                with self.cond:
+                    (self.sink or trace).write(data)
+                    self.line_start = data.endswith(b"\n")
+                    lines = (buf + data).split(b"\n")
+                    buf = lines.pop()
+                    for line in lines:
+                        # Cada informe iperf3 -J termina con una llave en la columna 0
+                        if line.rstrip(b"\r") == b"}":
+                            self.reports += 1
+                        elif not self.sib_found and sib_pattern.search(line):
+                            self.sib_found = True
+                    self.cond.notify_all()
+        with self.cond:
+            self.eof = True
+            self.cond.notify_all()
+
+    def _emit(self, text):
+        with self.cond:
+            if self.sink:
+                self.sink.write((text if self.line_start else "\n" + text).encode())
+                self.line_start = True
+                self.sink.flush()
+
+    def _milestone(self, name):
+        self._emit(f"[Expect] milestone {name} {int(time.time() * 1000)}\n")
+
+    # -------------- Process --------------
+    def _prepare(self, config_dir, cfg_text):
+        """Instance copy of a generated config: own ue0.log, no UEs."""
+        os.makedirs(self.instance_dir, exist_ok=True)
+        for name in os.listdir(config_dir):
+            src = os.path.join(config_dir, name)
+            if name not in INSTANCE_FILES and os.path.isfile(src):
+                shutil.copy2(src, self.instance_dir)
+        with open(self.cfg_path, "w", encoding="utf-8") as f:
+            f.write(log_filename_pattern.sub(f'log_filename: "{self.amari_log}"', cfg_text))
+        with open(os.path.join(self.instance_dir, "users-scenario.cfg"), "w", encoding="utf-8") as f:
+            json.dump({"ue_list": []}, f, indent=2)
+        if os.path.exists(self.amari_log):
+            os.remove(self.amari_log)
+
+    def _start(self, com_addr):
+        master, slave = pty.openpty()
+        try:
+            self.proc = subprocess.Popen([self.lteue_bin, self.cfg_path],
+                                         stdin=slave, stdout=slave, stderr=slave,
+                                         cwd=self.instance_dir, start_new_session=True)
+        except OSError as e:
+            os.close(master)
+            raise stages.StageError(f"run: {e}")
+        finally:
+            os.close(slave)
+        self.master = master
+        with self.cond:
+            self.reports, self.sib_found, self.eof = 0, False, False
+        self.reader = threading.Thread(target=self._read_output, name="warm-lteue", daemon=True)
+        self.reader.start()
+
+        with self.cond:
+            self.cond.wait_for(lambda: self.sib_found or self.eof, self.start_timeout)
+            found = self.sib_found
+        if not found:
+            self.stop()
+            raise stages.StageError(f"run: warm lteue found no cell within {self.start_timeout} s")
+        os.write(self.master, b"t\r")
+
+        # El puerto del API puede tardar un poco más que el SIB
+        host, port = parse_address(com_addr)
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                self.api = RemoteAPI(host, port).connect()
+                break
+            except RemoteAPIError as e:
+                if time.monotonic() > deadline or not self.alive():
+                    self.stop()
+                    raise stages.StageError(f"run: remote API: {e}")
+                time.sleep(0.2)
+
+    def ensure(self, config_dir):
+        """
+        Starts lteue with config_dir's radio config unless a matching
+        instance is already running. Returns True if lteue was (re)started.
+        """
+        with open(os.path.join(config_dir, "nr-erc.cfg"), "r", encoding="utf-8") as f:
+            cfg_text = f.read()
+        key = radio_key(cfg_text)
+        if self.alive() and key == self.key:
+            return False
+        self.stop()
+        m = com_addr_pattern.search(cfg_text)
+        if not m:
+            raise stages.StageError("run: nr-erc.cfg has no com_addr, warm mode needs the remote API")
+        self._prepare(config_dir, cfg_text)
+        self._start(m.group(1))
+        self.key = key
+        return True
+
+    def stop(self):
+        if self.api:
+            self.api.close()
+            self.api = None
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                os.killpg(self.proc.pid, signal.SIGTERM)
+                try:
+                    self.proc.wait(STOP_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    os.killpg(self.proc.pid, signal.SIGKILL)
+                    self.proc.wait()
+            self.proc = None
+        if self.reader:
+            self.reader.join(5)
+            self.reader = None
+        if self.master is not None:
+            os.close(self.master)
+            self.master = None
+        self.key = None
+
+    # -------------- Experiments --------------
+    def _wait_traffic(self, schedule, margin, t_add, reports0):
+        """Returns the reason the experiment ended, like pty_runner.py."""
+        n_apps = schedule.get("ext_app_count", -1)
+        min_end = schedule.get("internal_end_time", 0)
+        deadline = t_add + schedule["run_length"] + margin
+        finish_at = None
+        if n_apps == 0:
+            self._milestone("traffic_done")
+            finish_at = t_add + min_end + self.grace
+        while True:
+            with self.cond:
+                self.cond.wait(0.2)
+                done, eof = self.reports - reports0, self.eof
+            if eof:
+                raise stages.StageError("run: warm lteue exited during the experiment")
+            now = time.monotonic()
+            if finish_at is None and n_apps > 0 and done >= n_apps:
+                self._milestone("traffic_done")
+                finish_at = max(t_add + min_end, now) + self.grace
+            if finish_at is not None and now >= finish_at:
+                return "All UE traffic finished"
+            if now >= deadline:
+                return "Timeout reached"
+
+    def run(self, config_dir, expect_log, amari_log, schedule, log_file, margin=stages.DEFAULT_MARGIN):
+        """Runs one generated experiment on the instance."""
+        with open(os.path.join(config_dir, "users-scenario.cfg"), "r", encoding="utf-8") as f:
+            ue_list = json.load(f)["ue_list"]
+        ue_ids = [ue["ue_id"] for ue in ue_list]
+
+        with open(expect_log, "ab") as sink:
+            with self.cond:
+                self.sink = sink
+            try:
+                self._milestone("spawn")
+                if self.ensure(config_dir):
+                    stages.log(log_file, f"[run] warm lteue started in {self.instance_dir}")
+                else:
+                    stages.log(log_file, f"[run] reusing warm lteue in {self.instance_dir}")
+                start = os.path.getsize(self.amari_log) if os.path.exists(self.amari_log) else 0
+                with self.cond:
+                    reports0 = self.reports
+                self._milestone("sib_found")
+                t_add = time.monotonic()
+                try:
+                    self.api.request("ue_add", list=ue_list)
+                    reason = self._wait_traffic(schedule, margin, t_add, reports0)
+                    self._milestone("terminate")
+                    self._emit(f"[Expect] {reason}; removing UEs {ue_ids}\n")
+                    self.api.request("ue_del", ue_id=ue_ids)
+                except RemoteAPIError as e:
+                    # Estado desconocido: el siguiente experimento arranca en frío
+                    self.stop()
+                    raise stages.StageError(f"run: {e}")
+                except stages.StageError:
+                    self.stop()
+                    raise
+            finally:
+                with self.cond:
+                    self.sink = None
+
+        # El tramo de ue0.log escrito durante el experimento
+        if not os.path.exists(self.amari_log):
+            raise stages.StageError(f"run: lteue did not write '{self.amari_log}'")
+        with open(self.amari_log, "rb") as src, open(amari_log, "wb") as dst:
+            src.seek(start)
+            shutil.copyfileobj(src, dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run generated configs on one warm lteue")
+    parser.add_argument("config_dirs", nargs="+", help="directories written by process_json_v2.py")
+    parser.add_argument("--instance-dir", default=os.path.join(stages.GENERATED_DIR, "_warm", "cli"))
+    parser.add_argument("--output-dir", default=".", help="where <config name>/ue0.log etc. go")
+    parser.add_argument("--lteue", default=stages.LTEUE_BIN)
+    parser.add_argument("--margin", type=int, default=stages.DEFAULT_MARGIN)
+    args = parser.parse_args()
+
+    warm = WarmLteue(args.instance_dir, args.lteue)
+    try:
+        for config_dir in args.config_dirs:
+            with open(os.path.join(config_dir, "schedule.json"), "r", encoding="utf-8") as f:
+                schedule = json.load(f)
+            name = os.path.basename(os.path.normpath(config_dir))
+            out = os.path.join(args.output_dir, name)
+            os.makedirs(out, exist_ok=True)
+            paths = stages.experiment_paths(out, name)
+            t0 = time.monotonic()
+            warm.run(config_dir, paths["expect_log"], paths["amari_log"], schedule,
+                     paths["log"], args.margin)
+            print(f"{config_dir}: {time.monotonic() - t0:.1f} s -> {out}", flush=True)
+    except stages.StageError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        warm.stop()
+
+
+if __name__ == "__main__":
+    main()